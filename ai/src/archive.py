@@ -0,0 +1,263 @@
+# ai/src/archive.py
+# Local full-text archive of everything the pipeline has read or published.
+#
+# Feed entries (rss_tool), scraped articles (scrape_tool) and published stories are
+# stored in SQLite with an FTS5 index, so the researcher can look up past coverage of
+# a company or topic with BM25 ranking and date filters instead of a web search.
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from .checkpoints import RUNS_DIR
+from .replay import as_of, current_time
+
+ARCHIVE_PATH = os.getenv("NEWSLETTER_ARCHIVE_PATH", os.path.join(RUNS_DIR, "archive.sqlite3"))
+
+# Document kinds stored in the archive
+KIND_FEED_ENTRY = "feed_entry"
+KIND_ARTICLE = "article"
+KIND_STORY = "story"
+
+# Scraped articles are stored truncated; search snippets come from this text
+MAX_BODY_CHARS = 12000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    body TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    published REAL NOT NULL,
+    UNIQUE(kind, url)
+);
+CREATE INDEX IF NOT EXISTS docs_published ON docs(published);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
+    title, body, content='docs', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS docs_ai AFTER INSERT ON docs BEGIN
+    INSERT INTO docs_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS docs_ad AFTER DELETE ON docs BEGIN
+    INSERT INTO docs_fts(docs_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS docs_au AFTER UPDATE ON docs BEGIN
+    INSERT INTO docs_fts(docs_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    INSERT INTO docs_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+END;
+-- Feed entries the relevance filter passed to the researcher, with their training weight
+CREATE TABLE IF NOT EXISTS shown_entries (
+    url TEXT PRIMARY KEY,
+    shown_at REAL NOT NULL,
+    weight REAL NOT NULL DEFAULT 1
+);
+"""
+
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()
+
+
+def _get_connection() -> sqlite3.Connection:
+    """Get or create the shared archive connection (guarded by _lock for tool threads)."""
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(ARCHIVE_PATH) or ".", exist_ok=True)
+        _conn = sqlite3.connect(ARCHIVE_PATH, check_same_thread=False)
+        _conn.executescript(_SCHEMA)
+        _conn.commit()
+    return _conn
+
+
+def index_documents(kind: str, documents: List[dict]) -> int:
+    """
+    Insert or update documents in the archive.
+
+    Args:
+        kind: One of KIND_FEED_ENTRY, KIND_ARTICLE, KIND_STORY
+        documents: Dicts with 'url' and optionally 'title', 'body', 'source', 'published' (epoch seconds)
+
+    Returns:
+        Number of documents written
+    """
+    now = time.time()
+    rows = [
+        (
+            kind,
+            doc["url"],
+            doc.get("title") or "",
+            (doc.get("body") or "")[:MAX_BODY_CHARS],
+            doc.get("source") or "",
+            doc.get("published") or now,
+        )
+        for doc in documents
+        if doc.get("url")
+    ]
+    if not rows:
+        return 0
+    try:
+        with _lock:
+            conn = _get_connection()
+            conn.executemany(
+                "INSERT INTO docs (kind, url, title, body, source, published) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(kind, url) DO UPDATE SET title = excluded.title, body = excluded.body, "
+                "source = excluded.source",
+                rows,
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        # The archive is a convenience: never let it break feed reading or publishing
+        print(f"⚠️ Archive indexing error: {e}")
+        return 0
+    return len(rows)
+
+
+def index_published_stories(stories: List[dict], published: Optional[float] = None) -> int:
+    """Index newsletter stories ({'title', 'body', 'source': {'name', 'url'}}) as published coverage."""
+    return index_documents(KIND_STORY, [
+        {
+            "url": story.get("source", {}).get("url", "") or f"story:{story.get('title', '')}",
+            "title": story.get("title", ""),
+            "body": story.get("body", ""),
+            "source": story.get("source", {}).get("name", ""),
+            "published": published,
+        }
+        for story in stories
+    ])
+
+
+def record_shown(entries: List[Tuple[str, float]]) -> int:
+    """
+    Remember feed entries that reached the researcher, so only they are used as relevance labels.
+
+    Args:
+        entries: (url, weight) pairs; weight > 1 marks entries let through below the threshold
+
+    Returns:
+        Number of entries written
+    """
+    now = time.time()
+    rows = [(url, now, weight) for url, weight in entries if url]
+    if not rows:
+        return 0
+    try:
+        with _lock:
+            conn = _get_connection()
+            # An entry seen through the normal filter keeps weight 1
+            conn.executemany(
+                "INSERT INTO shown_entries (url, shown_at, weight) VALUES (?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET weight = MIN(weight, excluded.weight)",
+                rows,
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"⚠️ Archive indexing error: {e}")
+        return 0
+    return len(rows)
+
+
+def feed_entries_between(source: str, start: float, end: float, limit: int) -> List[dict]:
+    """
+    Feed entries recorded from one feed and published in [start, end), newest first.
+
+    Returns:
+        Dicts shaped like rss_tool's entry records ('feed', 'title', 'link', 'summary', 'published')
+    """
+    try:
+        with _lock:
+            rows = _get_connection().execute(
+                "SELECT url, title, body, published FROM docs "
+                "WHERE kind = ? AND source = ? AND published >= ? AND published < ? "
+                "ORDER BY published DESC LIMIT ?",
+                (KIND_FEED_ENTRY, source, start, end, limit),
+            ).fetchall()
+    except sqlite3.Error as e:
+        print(f"⚠️ Archive read error: {e}")
+        return []
+    return [
+        {"feed": source, "title": title, "link": url, "summary": body, "published": published}
+        for url, title, body, published in rows
+    ]
+
+
+def _match_expression(query: str, operator: str) -> str:
+    """Turn free text into a safe FTS5 expression of quoted terms."""
+    terms = re.findall(r"[\w.$€£%-]+", query.lower())
+    return f" {operator} ".join(f'"{term}"' for term in terms)
+
+
+def search_archive(
+    query: str,
+    days_back: Optional[int] = 30,
+    kinds: Optional[List[str]] = None,
+    limit: int = 8,
+    snippet_budget: int = 2500
+) -> List[dict]:
+    """
+    BM25-ranked full-text search over the archive.
+
+    All terms must match; if nothing does, any term may match. Results stop once
+    their snippets would exceed snippet_budget characters in total.
+
+    Args:
+        query: Free-text query (company, product, topic)
+        days_back: Only documents published in the last N days (None for no limit);
+            during a backfill run, only documents published before its pinned time
+        kinds: Restrict to these document kinds
+        limit: Maximum number of results
+        snippet_budget: Maximum total snippet characters across results
+
+    Returns:
+        List of dicts with 'kind', 'url', 'title', 'source', 'published', 'snippet'
+    """
+    since = current_time() - days_back * 86400 if days_back else 0
+    filters = ""
+    params_tail: list = [since]
+    if as_of() is not None:
+        filters += " AND d.published < ?"
+        params_tail.append(as_of())
+    if kinds:
+        filters += f" AND d.kind IN ({', '.join('?' for _ in kinds)})"
+        params_tail.extend(kinds)
+
+    sql = (
+        "SELECT d.kind, d.url, d.title, d.source, d.published, "
+        "snippet(docs_fts, 1, '', '', '…', 24) "
+        "FROM docs_fts JOIN docs d ON d.id = docs_fts.rowid "
+        f"WHERE docs_fts MATCH ? AND d.published >= ?{filters} "
+        "ORDER BY bm25(docs_fts, 4.0, 1.0) LIMIT ?"
+    )
+
+    rows = []
+    for operator in ("AND", "OR"):
+        expression = _match_expression(query, operator)
+        if not expression:
+            return []
+        try:
+            with _lock:
+                rows = _get_connection().execute(sql, [expression, *params_tail, limit]).fetchall()
+        except sqlite3.Error as e:
+            print(f"⚠️ Archive search error: {e}")
+            return []
+        if rows:
+            break
+
+    results = []
+    used = 0
+    for kind, url, title, source, published, snippet in rows:
+        used += len(title) + len(snippet)
+        if results and used > snippet_budget:
+            break
+        results.append({
+            "kind": kind,
+            "url": url,
+            "title": title,
+            "source": source,
+            "published": published,
+            "snippet": snippet,
+        })
+    return results
@@ -0,0 +1,142 @@
+# ai/src/backfill.py
+# Regenerate daily editions for a range of past dates, e.g. to compare a prompt or dedup change.
+#
+# Each date runs the daily pipeline as of that date (see replay.py): feed entries are replayed
+# from the archive within each feed's usual window, history lookbacks end at the date, and live
+# search and scraping are left out. Dates run in parallel threads of one process, so they share
+# the OpenAI rate limiter, the LLM response cache and the tool/embedding caches. Each edition is
+# written to <output-dir>/<date>/ (never to web/public), and the story history, coverage filter
+# and weekly pool are left untouched.
+#
+# Usage:
+#   python -m ai.src.backfill 2026-09-01 2026-09-30 --workers 3 --output-dir ai/runs/backfill_output
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import yaml
+from dotenv import load_dotenv
+
+from .main import configure_pipeline, run_daily, CONFIG_PATH
+from .llm_clients import client_metrics
+from .single_flight import cache_stats
+from .replay import pinned_time
+
+DEFAULT_OUTPUT_DIR = "ai/runs/backfill_output"
+
+# Upper bound on dates per job, so a typo in the range can't queue a year of LLM calls
+MAX_DAYS = 31
+
+
+def backfill_dates(start: str, end: str, at: str = "08:30") -> List[datetime]:
+    """
+    Run times for every date from start to end (inclusive).
+
+    Args:
+        start: First date, YYYY-MM-DD
+        end: Last date, YYYY-MM-DD
+        at: Local "HH:MM" each edition is generated as of
+
+    Returns:
+        One datetime per date
+    """
+    hour, minute = (int(part) for part in at.split(":"))
+    first = datetime.strptime(start, "%Y-%m-%d").replace(hour=hour, minute=minute)
+    last = datetime.strptime(end, "%Y-%m-%d").replace(hour=hour, minute=minute)
+    if last < first:
+        raise ValueError(f"End date {end} is before start date {start}")
+    return [first + timedelta(days=i) for i in range((last - first).days + 1)]
+
+
+def run_date(config: Dict, llm_cache, config_path: str, when: datetime, output_dir: str) -> Dict:
+    """Regenerate one date's edition into output_dir/<date>. Failures are reported, not raised."""
+    date = when.strftime("%Y-%m-%d")
+    date_dir = os.path.join(output_dir, date)
+    result = {"date": date, "output_dir": date_dir, "published": None, "error": None}
+    started = time.monotonic()
+    try:
+        with pinned_time(when):
+            result["published"] = run_daily(config, llm_cache, config_path, output_dir=date_dir)
+    except Exception as e:
+        print(f"⚠️ Backfill {date} failed: {e}")
+        result["error"] = str(e)
+    result["seconds"] = round(time.monotonic() - started, 1)
+    return result
+
+
+def backfill(
+    start: str,
+    end: str,
+    workers: int = 3,
+    at: str = "08:30",
+    output_dir: str = DEFAULT_OUTPUT_DIR,
+    config_path: str = CONFIG_PATH,
+    max_days: int = MAX_DAYS
+) -> Dict:
+    """
+    Regenerate the daily edition for each date from start to end.
+
+    Args:
+        start: First date, YYYY-MM-DD
+        end: Last date, YYYY-MM-DD
+        workers: Dates generated at the same time
+        at: Local "HH:MM" each edition is generated as of
+        output_dir: Editions go to output_dir/<date>/, the summary to output_dir/backfill.json
+        config_path: Path to config.yml
+        max_days: Refuse ranges longer than this
+
+    Returns:
+        The summary written to backfill.json
+    """
+    load_dotenv()
+    dates = backfill_dates(start, end, at)
+    if len(dates) > max_days:
+        raise ValueError(f"{len(dates)} dates requested, the limit is {max_days} (see --max-days)")
+
+    with open(config_path, 'r') as file:
+        config = yaml.safe_load(file)
+
+    # Configured once: every date shares the same rate limiter and caches
+    llm_cache = configure_pipeline(config)
+
+    print(f"🔁 Backfilling {len(dates)} editions ({start} to {end}) with {workers} workers into {output_dir}")
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(lambda when: run_date(config, llm_cache, config_path, when, output_dir), dates))
+
+    summary = {
+        "start": start,
+        "end": end,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "seconds": round(time.monotonic() - started, 1),
+        "editions": results,
+        "openai_client": client_metrics(),
+        "caches": cache_stats(),
+        "llm_cache": llm_cache.stats() if llm_cache else None,
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "backfill.json"), "w") as f:
+        json.dump(summary, f, indent=2, default=str)
+
+    done = sum(1 for r in results if r["published"])
+    print(f"✅ Backfill finished: {done} of {len(dates)} editions published in {summary['seconds']:.0f}s "
+          f"(summary in {output_dir}/backfill.json)")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regenerate daily editions for a range of past dates.")
+    parser.add_argument("start", help="First date (YYYY-MM-DD)")
+    parser.add_argument("end", help="Last date (YYYY-MM-DD, inclusive)")
+    parser.add_argument("--workers", type=int, default=3, help="Dates generated at the same time")
+    parser.add_argument("--at", default="08:30", metavar="HH:MM", help="Local time each edition is generated as of")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="Directory for the per-date editions")
+    parser.add_argument("--config", default=CONFIG_PATH, help="Path to config.yml")
+    parser.add_argument("--max-days", type=int, default=MAX_DAYS, help="Refuse longer date ranges")
+    args = parser.parse_args()
+    backfill(args.start, args.end, args.workers, args.at, args.output_dir, args.config, args.max_days)
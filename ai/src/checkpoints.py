@@ -0,0 +1,133 @@
+# ai/src/checkpoints.py
+# Stage checkpointing for the daily and weekly pipelines.
+#
+# Each stage's output is saved as JSON under ai/runs/<pipeline>/<date>-<config hash>/,
+# so a failure late in the run (e.g. an unparseable Writer draft) can be recovered with
+# `--resume-from <stage>` instead of repeating the expensive research phase.
+
+import contextvars
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from .profiling import profile_stage
+from .run_deadline import deadline_stage
+
+RUNS_DIR = os.getenv("NEWSLETTER_RUNS_DIR", "ai/runs")
+
+# Stage order for each pipeline (used to decide what --resume-from reloads)
+DAILY_STAGES = ["research", "parse", "dedup", "write", "edit", "editions"]
+WEEKLY_STAGES = ["research", "write", "edit"]
+
+# A failed stage is retried this many times before the run gives up
+STAGE_RETRIES = 2
+STAGE_RETRY_DELAY = 5  # seconds
+
+# True while a stage is being re-run (a retry, or the --resume-from stage): the LLM response
+# cache then skips lookups, so the same failed response isn't served again (see llm_cache.py)
+_rerun: contextvars.ContextVar[bool] = contextvars.ContextVar("stage_rerun", default=False)
+
+
+def stage_rerun() -> bool:
+    """True inside a retried or resumed stage."""
+    return _rerun.get()
+
+
+def config_hash(config_path: str) -> str:
+    """Short hash of the config file, so runs with different feeds/prompts don't share checkpoints."""
+    with open(config_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:10]
+
+
+class RunCheckpoint:
+    """
+    Saves and reloads stage outputs for a single pipeline run.
+
+    Args:
+        pipeline: "daily" or "weekly" (used in the run directory path)
+        stages: Ordered stage names for this pipeline
+        config_path: Path to config.yml (hashed into the run directory name)
+        resume_from: Stage to resume from; earlier stages are loaded from disk
+        run_date: Date the run is keyed by (defaults to today)
+    """
+
+    def __init__(
+        self,
+        pipeline: str,
+        stages: List[str],
+        config_path: str,
+        resume_from: Optional[str] = None,
+        run_date: Optional[datetime] = None
+    ):
+        if resume_from is not None and resume_from not in stages:
+            raise ValueError(f"Unknown stage '{resume_from}'. Choose one of: {', '.join(stages)}")
+
+        self.stages = stages
+        self.resume_from = resume_from
+        run_key = f"{(run_date or datetime.now()).strftime('%Y-%m-%d')}-{config_hash(config_path)}"
+        self.run_dir = os.path.join(RUNS_DIR, pipeline, run_key)
+        os.makedirs(self.run_dir, exist_ok=True)
+
+    def _path(self, stage: str) -> str:
+        return os.path.join(self.run_dir, f"{stage}.json")
+
+    def _should_reload(self, stage: str) -> bool:
+        """Stages before --resume-from are reloaded from disk when a checkpoint exists."""
+        if self.resume_from is None:
+            return False
+        return self.stages.index(stage) < self.stages.index(self.resume_from) and os.path.exists(self._path(stage))
+
+    def load(self, stage: str) -> Any:
+        with open(self._path(stage), 'r') as f:
+            return json.load(f)
+
+    def save(self, stage: str, data: Any) -> None:
+        """Write a stage checkpoint (temp file + rename so a crash never leaves a partial file)."""
+        tmp_path = self._path(stage) + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self._path(stage))
+
+    def write_report(self, section: str, data: Dict) -> None:
+        """Add a section (e.g. cache statistics) to the run's report.json."""
+        report_path = os.path.join(self.run_dir, "report.json")
+        report = {}
+        if os.path.exists(report_path):
+            with open(report_path, 'r') as f:
+                report = json.load(f)
+        report[section] = data
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    def run_stage(self, stage: str, fn: Callable[[], Dict]) -> Dict:
+        """
+        Run a stage, or reload it from its checkpoint when resuming past it.
+
+        Failed stages are retried on their own (earlier stage outputs are kept),
+        and the successful output is checkpointed for later resumes.
+        """
+        if self._should_reload(stage):
+            print(f"♻️ Loaded '{stage}' stage from checkpoint ({self._path(stage)})")
+            return self.load(stage)
+
+        for attempt in range(STAGE_RETRIES + 1):
+            token = _rerun.set(attempt > 0 or stage == self.resume_from)
+            try:
+                with profile_stage(stage), deadline_stage(stage):
+                    result = fn()
+                break
+            except Exception as e:
+                if attempt == STAGE_RETRIES:
+                    print(f"\n❌ Stage '{stage}' failed after {STAGE_RETRIES + 1} attempts: {e}")
+                    print(f"   Fix the issue and re-run with --resume-from {stage} to keep earlier stages")
+                    raise
+                print(f"⚠️ Stage '{stage}' failed ({e}), retrying in {STAGE_RETRY_DELAY}s...")
+                time.sleep(STAGE_RETRY_DELAY)
+            finally:
+                _rerun.reset(token)
+
+        self.save(stage, result)
+        return result
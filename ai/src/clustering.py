@@ -0,0 +1,151 @@
+# ai/src/clustering.py
+# Groups the week's published stories into themes for the weekly recap prompts.
+#
+# Average-linkage agglomerative clustering over story embeddings (vectorized with NumPy),
+# with shared companies as a small tiebreaker between equally similar merges. The writer
+# gets one compact record per theme instead of a flat list that grows every day.
+
+from collections import Counter
+from typing import List
+
+import numpy as np
+
+from .tools import StoryRecord, _word_similarity, embed_stories
+
+# Stop merging when the best average-linkage similarity drops below this
+CLUSTER_THRESHOLD = 0.5
+
+# Bonus added to pair similarity per unit of company Jaccard overlap (breaks near-ties)
+ENTITY_TIEBREAK = 0.05
+
+# Prompt size stays bounded: at most this many themes, each with a few representative titles
+MAX_CLUSTERS = 8
+MAX_REPRESENTATIVES = 3
+
+
+def _similarity_matrix(stories: List[dict], records: List[StoryRecord]) -> np.ndarray:
+    """Pairwise story similarity: embedding cosine (word Jaccard if an embedding is missing) + entity tiebreak."""
+    n = len(stories)
+    embeddings = embed_stories(stories)
+    vectors = [embeddings.get(s.get('title', '')) for s in stories]
+
+    sim = np.zeros((n, n))
+    have = [i for i, v in enumerate(vectors) if v]
+    if have:
+        matrix = np.array([vectors[i] for i in have], dtype=float)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+        sim[np.ix_(have, have)] = matrix @ matrix.T
+
+    missing = set(range(n)) - set(have)
+    for i in range(n):
+        for j in range(i + 1, n):
+            if i in missing or j in missing:
+                sim[i, j] = sim[j, i] = _word_similarity(records[i].words, records[j].words)
+
+    companies = [record.entities["companies"] for record in records]
+    for i in range(n):
+        for j in range(i + 1, n):
+            union = companies[i] | companies[j]
+            if union:
+                bonus = ENTITY_TIEBREAK * len(companies[i] & companies[j]) / len(union)
+                sim[i, j] += bonus
+                sim[j, i] += bonus
+
+    np.fill_diagonal(sim, -np.inf)
+    return sim
+
+
+def _agglomerate(sim: np.ndarray, threshold: float) -> List[List[int]]:
+    """Average-linkage agglomerative clustering on a similarity matrix (Lance-Williams updates)."""
+    sim = sim.copy()
+    clusters = [[i] for i in range(sim.shape[0])]
+    active = np.ones(sim.shape[0], dtype=bool)
+
+    while active.sum() > 1:
+        masked = np.where(np.outer(active, active), sim, -np.inf)
+        a, b = np.unravel_index(np.argmax(masked), masked.shape)
+        if masked[a, b] < threshold:
+            break
+
+        size_a, size_b = len(clusters[a]), len(clusters[b])
+        merged = (size_a * sim[a] + size_b * sim[b]) / (size_a + size_b)
+        sim[a, :] = merged
+        sim[:, a] = merged
+        sim[a, a] = -np.inf
+        clusters[a].extend(clusters[b])
+        clusters[b] = []
+        active[b] = False
+
+    return [c for c in clusters if c]
+
+
+def cluster_stories(stories: List[dict], threshold: float = CLUSTER_THRESHOLD) -> List[dict]:
+    """
+    Group stories into themes.
+
+    Args:
+        stories: Story dicts with 'title', 'body', 'source' and 'date'
+        threshold: Minimum average-linkage similarity for two groups to merge
+
+    Returns:
+        Cluster records sorted by size (largest first), each with 'size', 'titles'
+        (representatives closest to the cluster centre), 'companies', 'events', 'dates', 'sources'
+    """
+    if not stories:
+        return []
+
+    story_records = [StoryRecord(s) for s in stories]
+    sim = _similarity_matrix(stories, story_records)
+    groups = _agglomerate(sim, threshold)
+
+    records = []
+    for members in groups:
+        # Representatives: members with the highest average similarity to the rest of the cluster
+        if len(members) > 1:
+            block = sim[np.ix_(members, members)]
+            centrality = np.where(np.isfinite(block), block, 0).sum(axis=1)
+            ranked = [members[i] for i in np.argsort(-centrality)]
+        else:
+            ranked = members
+
+        companies = Counter(c for i in members for c in story_records[i].entities["companies"])
+        events = Counter(e for i in members for e in story_records[i].entities["events"])
+        records.append({
+            "size": len(members),
+            "titles": [stories[i].get('title', 'Untitled') for i in ranked[:MAX_REPRESENTATIVES]],
+            "companies": [c for c, _ in companies.most_common(5)],
+            "events": [e for e, _ in events.most_common(3)],
+            "dates": sorted({stories[i].get('date', '') for i in members if stories[i].get('date')}),
+            "sources": sorted({stories[i].get('source', {}).get('name', '') for i in members} - {''}),
+        })
+
+    return sorted(records, key=lambda r: (-r["size"], r["dates"][:1]))
+
+
+def format_clusters_for_prompt(clusters: List[dict]) -> str:
+    """Format cluster records as a compact, bounded-size theme list for the weekly prompts."""
+    if not clusters:
+        return "No stories available from this week."
+
+    formatted = []
+    for i, cluster in enumerate(clusters[:MAX_CLUSTERS], 1):
+        dates = cluster["dates"]
+        span = f"{dates[0]} to {dates[-1]}" if len(dates) > 1 else (dates[0] if dates else "date unknown")
+        formatted.append(f"\n**Theme {i}** ({cluster['size']} {'story' if cluster['size'] == 1 else 'stories'}, {span})")
+        if cluster["companies"]:
+            formatted.append(f"  Companies: {', '.join(cluster['companies'])}")
+        if cluster["events"]:
+            formatted.append(f"  Events: {', '.join(cluster['events'])}")
+        for title in cluster["titles"]:
+            formatted.append(f"  - {title}")
+
+    remaining = clusters[MAX_CLUSTERS:]
+    if remaining:
+        other_companies = Counter(c for cluster in remaining for c in cluster["companies"])
+        count = sum(cluster["size"] for cluster in remaining)
+        line = f"\n**Other coverage:** {count} more stories"
+        if other_companies:
+            line += f" (companies: {', '.join(c for c, _ in other_companies.most_common(6))})"
+        formatted.append(line)
+
+    return "\n".join(formatted)
@@ -0,0 +1,242 @@
+# ai/src/coverage.py
+# Persistent "already covered" filter applied to feed entries at ingestion.
+#
+# Holds an exact set of canonical URLs and a Bloom filter of title fingerprints for every
+# source article we've published. rss_tool drops matching entries before they are formatted
+# for the researcher, so a story we already ran never reaches the agent, the parser or the
+# pairwise history dedup. Title fingerprints catch the same article syndicated under another
+# URL (AMP pages, channel feeds, tracking redirects).
+#
+# Usage:
+#   python -m ai.src.coverage rebuild      # rebuild from the archive
+#   python -m ai.src.coverage check <url> [title]
+
+import argparse
+import base64
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import yaml
+
+from .archive import ARCHIVE_PATH, KIND_FEED_ENTRY, KIND_STORY
+from .checkpoints import RUNS_DIR
+from .replay import replaying
+
+COVERAGE_PATH = os.path.join(RUNS_DIR, "coverage.json")
+
+# Defaults used when config.yml has no 'coverage' section
+DEFAULT_COVERAGE = {
+    "enabled": True,
+    "capacity": 50000,              # fingerprints the Bloom filter is sized for
+    "false_positive_rate": 0.001,
+}
+
+# Query parameters that never change which article a URL points to
+_TRACKING_PARAMS = re.compile(r"^(utm_.*|fbclid|gclid|mc_cid|mc_eid|cmpid|ref|source|ito|cid)$", re.IGNORECASE)
+
+# Titles shorter than this (after normalisation) are too generic to fingerprint
+MIN_FINGERPRINT_WORDS = 4
+
+_STOPWORDS = {"a", "an", "and", "as", "at", "by", "for", "from", "in", "of", "on", "or", "the", "to", "with"}
+
+
+def canonical_url(url: str) -> str:
+    """Normalise a URL: lowercase host without www, no fragment, tracking params or trailing slash."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix("www.")
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if not _TRACKING_PARAMS.match(k)))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("https", host, path, query, ""))
+
+
+def title_fingerprint(title: str) -> Optional[str]:
+    """Fingerprint of a headline's significant words, or None if it is too short to be distinctive."""
+    words = [w for w in re.findall(r"[a-z0-9]+", title.lower()) if w not in _STOPWORDS]
+    if len(words) < MIN_FINGERPRINT_WORDS:
+        return None
+    return hashlib.blake2b(" ".join(words).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class BloomFilter:
+    """Bit-array Bloom filter sized for a capacity and false-positive rate (double hashing)."""
+
+    def __init__(self, capacity: int, false_positive_rate: float, bits: Optional[bytearray] = None, count: int = 0):
+        self.capacity = capacity
+        self.false_positive_rate = false_positive_rate
+        self.size = max(8, int(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = count
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def to_dict(self) -> Dict:
+        return {
+            "capacity": self.capacity,
+            "false_positive_rate": self.false_positive_rate,
+            "count": self.count,
+            "bits": base64.b64encode(bytes(self.bits)).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "BloomFilter":
+        return cls(data["capacity"], data["false_positive_rate"], bytearray(base64.b64decode(data["bits"])), data["count"])
+
+
+_settings = dict(DEFAULT_COVERAGE)
+_urls: Optional[set] = None
+_bloom: Optional[BloomFilter] = None
+_lock = threading.Lock()
+_stats = {"checked": 0, "dropped": 0}
+
+
+def configure_coverage(config: Dict) -> None:
+    """Apply the 'coverage' section of config.yml."""
+    _settings.update(config.get("coverage") or {})
+
+
+def _load() -> Tuple[set, BloomFilter]:
+    global _urls, _bloom
+    if _bloom is None:
+        try:
+            with open(COVERAGE_PATH, 'r') as f:
+                data = json.load(f)
+            _urls, _bloom = set(data["urls"]), BloomFilter.from_dict(data["bloom"])
+        except (OSError, ValueError, KeyError):
+            _urls, _bloom = set(), BloomFilter(_settings["capacity"], _settings["false_positive_rate"])
+    return _urls, _bloom
+
+
+def _save() -> None:
+    os.makedirs(os.path.dirname(COVERAGE_PATH) or ".", exist_ok=True)
+    tmp_path = COVERAGE_PATH + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"urls": sorted(_urls), "bloom": _bloom.to_dict()}, f)
+    os.replace(tmp_path, COVERAGE_PATH)
+
+
+def covered_reason(url: str, title: str) -> Optional[str]:
+    """Why a feed entry counts as already covered, or None if it doesn't."""
+    with _lock:
+        urls, bloom = _load()
+    if url and canonical_url(url) in urls:
+        return "URL already published"
+    fingerprint = title_fingerprint(title or "")
+    if fingerprint and fingerprint in bloom:
+        return "headline already published"
+    return None
+
+
+def filter_covered(entries: List[Dict]) -> List[Dict]:
+    """Drop feed entries ({'link', 'title'}) whose article we've already published."""
+    # A backfill run would find its own date's (and later) stories here, so it skips the filter
+    if not _settings["enabled"] or replaying():
+        return entries
+    kept = [e for e in entries if covered_reason(e.get("link", ""), e.get("title", "")) is None]
+    _stats["checked"] += len(entries)
+    _stats["dropped"] += len(entries) - len(kept)
+    return kept
+
+
+def mark_covered(items: List[Tuple[str, str]]) -> int:
+    """
+    Record published source articles.
+
+    Args:
+        items: (source URL, headline) pairs; the headline should be the source's own title
+            where known, since that is what feed entries will carry
+
+    Returns:
+        Number of items recorded
+    """
+    with _lock:
+        urls, bloom = _load()
+        for url, title in items:
+            if url:
+                urls.add(canonical_url(url))
+            fingerprint = title_fingerprint(title or "")
+            if fingerprint:
+                bloom.add(fingerprint)
+        if bloom.count > bloom.capacity:
+            print(f"⚠️ Coverage filter holds {bloom.count} fingerprints (sized for {bloom.capacity}); "
+                  "raise coverage.capacity and run `python -m ai.src.coverage rebuild`")
+        try:
+            _save()
+        except OSError as e:
+            print(f"⚠️ Could not save the coverage filter: {e}")
+    return len(items)
+
+
+def mark_published_stories(stories: List[Dict], feed_entries: List[Dict]) -> int:
+    """Record a published edition's sources, with the feed's original headline when we read it."""
+    feed_titles = {canonical_url(e["link"]): e.get("title", "") for e in feed_entries if e.get("link")}
+    items = []
+    for story in stories:
+        url = story.get("source", {}).get("url", "")
+        items.append((url, feed_titles.get(canonical_url(url), "") if url else ""))
+        items.append(("", story.get("title", "")))
+    return mark_covered(items)
+
+
+def rebuild_from_archive() -> int:
+    """Rebuild the URL set and Bloom filter from every published story in the archive."""
+    global _urls, _bloom
+    with sqlite3.connect(ARCHIVE_PATH) as conn:
+        story_rows = conn.execute("SELECT url, title FROM docs WHERE kind = ?", (KIND_STORY,)).fetchall()
+        entry_titles = {
+            canonical_url(url): title
+            for url, title in conn.execute("SELECT url, title FROM docs WHERE kind = ?", (KIND_FEED_ENTRY,))
+        }
+    with _lock:
+        capacity = max(_settings["capacity"], 2 * len(story_rows))
+        _urls, _bloom = set(), BloomFilter(capacity, _settings["false_positive_rate"])
+    items = []
+    for url, title in story_rows:
+        if url.startswith("story:"):  # stories indexed without a source URL
+            items.append(("", title))
+            continue
+        items.append((url, entry_titles.get(canonical_url(url), "")))
+        items.append(("", title))
+    return mark_covered(items)
+
+
+def coverage_stats() -> Dict:
+    """Entries checked and dropped during this run."""
+    return dict(_stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the already-covered filter.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="Rebuild from published stories in the archive")
+    check_parser = commands.add_parser("check", help="Check whether an article counts as covered")
+    check_parser.add_argument("url")
+    check_parser.add_argument("title", nargs="?", default="")
+    args = parser.parse_args()
+
+    with open("ai/config.yml", 'r') as f:
+        configure_coverage(yaml.safe_load(f))
+
+    if args.command == "rebuild":
+        count = rebuild_from_archive()
+        print(f"✅ Coverage filter rebuilt from {count} published items ({COVERAGE_PATH})")
+    else:
+        print(covered_reason(args.url, args.title) or "not covered")
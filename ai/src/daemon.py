@@ -0,0 +1,162 @@
+# ai/src/daemon.py
+# Optional long-running worker around the daily and weekly pipelines.
+#
+# A cron run starts cold: imports the LangChain stack, fetches every feed, rebuilds the
+# tool caches and re-reads Supabase history. The daemon keeps one process alive instead:
+# a poller refreshes feeds and recent history (with its embeddings) on a schedule, and a
+# local HTTP endpoint triggers an edition that starts from those warm caches.
+#
+# Usage:
+#   python -m ai.src.daemon --port 8787 --poll-minutes 15
+#   curl -X POST http://127.0.0.1:8787/run/daily
+#   curl http://127.0.0.1:8787/status
+
+import argparse
+import json
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+import yaml
+from dotenv import load_dotenv
+
+from . import main as daily
+from . import weekly_recap
+from .tools import refresh_feed, get_feed_entries, embed_stories
+from .run_deadline import clear_deadline
+
+EDITIONS = {
+    "daily": daily.main,
+    "weekly": weekly_recap.main,
+}
+
+
+class Daemon:
+    """Keeps feeds, embeddings and history warm, and runs one edition at a time on request."""
+
+    def __init__(self, config_path: str, poll_minutes: float):
+        self.config_path = config_path
+        self.poll_seconds = poll_minutes * 60
+        self.status: Dict = {"started_at": datetime.now().isoformat(), "polls": 0, "last_poll": None, "runs": []}
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _feed_urls(self) -> list:
+        with open(self.config_path, 'r') as f:
+            return [source['url'] for source in yaml.safe_load(f)['newsletters']]
+
+    def poll_once(self) -> None:
+        """Refresh every feed and reload recent history (embedding its stories for dedup)."""
+        started = time.monotonic()
+        urls = self._feed_urls()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(refresh_feed, urls))
+
+        # Dedup compares new stories against history, so only history is embedded ahead of a run
+        # (vectors are cached by text)
+        recent = daily.get_recent_stories(days_back=3, refresh=True)
+        embed_stories(recent.get('stories', []))
+
+        self.status["polls"] += 1
+        self.status["last_poll"] = {
+            "at": datetime.now().isoformat(),
+            "feeds": len(urls),
+            "entries": len(get_feed_entries()),
+            "seconds": round(time.monotonic() - started, 1),
+        }
+        print(f"🔄 Poll complete: {len(urls)} feeds, {len(get_feed_entries())} entries in {self.status['last_poll']['seconds']}s")
+
+    def _poll_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"⚠️ Poll failed: {e}")
+            self._stop.wait(self.poll_seconds)
+
+    def start_poller(self) -> None:
+        threading.Thread(target=self._poll_loop, name="feed-poller", daemon=True).start()
+
+    def trigger(self, edition: str) -> bool:
+        """Start an edition in the background. Returns False if one is already running."""
+        if not self._run_lock.acquire(blocking=False):
+            return False
+
+        run = {"edition": edition, "started_at": datetime.now().isoformat(), "status": "running"}
+        self.status["runs"] = (self.status["runs"] + [run])[-20:]
+
+        def worker():
+            try:
+                EDITIONS[edition]()
+                run["status"] = "succeeded"
+            except Exception as e:
+                traceback.print_exc()
+                run["status"] = f"failed: {e}"
+            finally:
+                run["finished_at"] = datetime.now().isoformat()
+                clear_deadline()  # the poller's fetches run without the edition's budget
+                self._run_lock.release()
+
+        threading.Thread(target=worker, name=f"edition-{edition}", daemon=True).start()
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def _make_handler(daemon: Daemon):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code: int, body: Dict) -> None:
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == "/status":
+                self._reply(200, daemon.status)
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            edition = self.path.removeprefix("/run/")
+            if not self.path.startswith("/run/") or edition not in EDITIONS:
+                self._reply(404, {"error": f"unknown edition, use one of: {', '.join(EDITIONS)}"})
+            elif daemon.trigger(edition):
+                self._reply(202, {"edition": edition, "status": "started"})
+            else:
+                self._reply(409, {"error": "an edition is already running"})
+
+    return Handler
+
+
+def serve(host: str, port: int, poll_minutes: float) -> None:
+    """Run the poller and the HTTP trigger endpoint until interrupted."""
+    load_dotenv()
+    daemon = Daemon(daily.CONFIG_PATH, poll_minutes)
+    daemon.start_poller()
+
+    server = ThreadingHTTPServer((host, port), _make_handler(daemon))
+    print(f"🟢 Newsletter daemon listening on http://{host}:{port} (polling every {poll_minutes:g} min)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Shutting down daemon")
+    finally:
+        daemon.stop()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the newsletter pipeline as a resident worker.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: localhost only)")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--poll-minutes", type=float, default=15, help="How often feeds are refreshed")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.poll_minutes)
@@ -0,0 +1,360 @@
+# ai/src/dedup_tuning.py
+# Offline tuning of the hybrid dedup thresholds against labelled story pairs.
+#
+# The input is JSONL, one pair per line (a/b may also be plain strings):
+#   {"a": {"title": "...", "body": "..."}, "b": {"title": "...", "body": "..."}, "duplicate": true}
+#
+# Word, entity, local n-gram and embedding features are computed once per pair with the same
+# functions tools.is_duplicate_hybrid uses. Every threshold combination is then scored as a few
+# vectorised NumPy comparisons, with the grid split across a process pool. The report gives
+# precision/recall for the current and recommended settings, a PR curve per threshold, and
+# how many embedding comparisons each setting makes.
+#
+# Usage:
+#   EMBEDDING_BACKEND=local python -m ai.src.dedup_tuning pairs.jsonl --output tuning.json
+
+import argparse
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+import yaml
+
+from .embeddings import (
+    EmbeddingError, configure_embeddings, get_backend, local_backend, shortlist_threshold
+)
+from .llm_clients import configure_openai_limits
+from .tools import (
+    _calculate_similarity, _entities_overlap, _extract_entities, configure_dedup, dedup_settings,
+    is_duplicate_hybrid
+)
+
+# Thresholds searched: name -> (start, stop, step), stop inclusive
+GRID = {
+    "word_threshold": (0.10, 0.60, 0.025),
+    "embedding_threshold": (0.60, 0.95, 0.01),
+    "word_only_threshold": (0.30, 0.90, 0.025),
+    "shortlist_threshold": (0.00, 0.30, 0.025),
+}
+SAFETY_NET_GRID = (0.30, 0.95, 0.025)
+
+# Hybrid thresholds in grid column order
+PARAMS = list(GRID)
+
+# Threshold combinations evaluated per broadcast (bounds the (combos x pairs) arrays)
+EVAL_BATCH = 256
+
+# Pairs re-checked with is_duplicate_hybrid to confirm the vectorised rules match it
+CONSISTENCY_SAMPLE = 200
+
+
+def _story_text(item) -> str:
+    if isinstance(item, str):
+        return item
+    return item.get('title', '') + ' ' + item.get('body', item.get('summary', ''))
+
+
+def load_pairs(path: str) -> Tuple[List[str], List[str], np.ndarray]:
+    """Read labelled pairs. Returns (texts_a, texts_b, labels as a bool array)."""
+    texts_a, texts_b, labels = [], [], []
+    with open(path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            pair = json.loads(line)
+            texts_a.append(_story_text(pair["a"]))
+            texts_b.append(_story_text(pair["b"]))
+            labels.append(bool(pair["duplicate"]))
+    return texts_a, texts_b, np.array(labels, dtype=bool)
+
+
+def _rowwise_similarity(texts_a: List[str], texts_b: List[str]) -> np.ndarray:
+    """Similarity of each (a, b) pair with the configured backend, falling back to local."""
+    backend = get_backend()
+    unique = list(dict.fromkeys(texts_a + texts_b))
+    try:
+        vectors = dict(zip(unique, backend.embed(unique)))
+    except EmbeddingError as e:
+        print(f"⚠️ Embedding backend '{backend.name}' unavailable ({e}), using the local backend")
+        backend = local_backend()
+        vectors = dict(zip(unique, backend.embed(unique)))
+    return np.array([backend.similarity(vectors[a], vectors[b]) for a, b in zip(texts_a, texts_b)])
+
+
+def compute_features(texts_a: List[str], texts_b: List[str], pool: ProcessPoolExecutor) -> Dict[str, np.ndarray]:
+    """
+    Per-pair features, computed once.
+
+    Returns:
+        Dict of arrays: word, entity_match, high_confidence, local (shortlist similarity)
+        and embedding similarity
+    """
+    unique = list(dict.fromkeys(texts_a + texts_b))
+    entities = dict(zip(unique, pool.map(_extract_entities, unique, chunksize=64)))
+    overlaps = [_entities_overlap(entities[a], entities[b]) for a, b in zip(texts_a, texts_b)]
+
+    local = local_backend()
+    local.fit(unique)
+
+    return {
+        "word": np.array(list(pool.map(_calculate_similarity, texts_a, texts_b, chunksize=256))),
+        "entity_match": np.array([match for match, _, _ in overlaps], dtype=bool),
+        "high_confidence": np.array([high for _, _, high in overlaps], dtype=bool),
+        "local": np.einsum("ij,ij->i", local.dense(texts_a), local.dense(texts_b)),
+        "embedding": _rowwise_similarity(texts_a, texts_b),
+    }
+
+
+def decide(features: Dict[str, np.ndarray], thresholds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The is_duplicate_hybrid rules for many threshold combinations at once.
+
+    Args:
+        features: Output of compute_features()
+        thresholds: (combos x 4) array, columns in PARAMS order
+
+    Returns:
+        Tuple of (combos x pairs duplicate decisions, combos x pairs embedding comparisons made)
+    """
+    word_t, emb_t, word_only_t, shortlist_t = (thresholds[:, i, None] for i in range(len(PARAMS)))
+    match, high = features["entity_match"], features["high_confidence"]
+    medium = match & ~high
+
+    word_hit = features["word"] > word_t
+    embedding_checked = medium & ~word_hit & (features["local"] >= shortlist_t)
+    duplicate = (
+        (match & high)
+        | (~match & (features["word"] > word_only_t))
+        | (medium & word_hit)
+        | (embedding_checked & (features["embedding"] > emb_t))
+    )
+    return duplicate, embedding_checked
+
+
+def _evaluate(args: Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray]) -> np.ndarray:
+    """Confusion counts per threshold combination: (combos x 4) of tp, fp, fn, embedding calls."""
+    features, labels, thresholds = args
+    counts = []
+    for start in range(0, len(thresholds), EVAL_BATCH):
+        duplicate, embedding_checked = decide(features, thresholds[start:start + EVAL_BATCH])
+        counts.append(np.stack([
+            (duplicate & labels).sum(axis=1),
+            (duplicate & ~labels).sum(axis=1),
+            (~duplicate & labels).sum(axis=1),
+            embedding_checked.sum(axis=1),
+        ], axis=1))
+    return np.concatenate(counts)
+
+
+def _grid(spec: Tuple[float, float, float]) -> np.ndarray:
+    start, stop, step = spec
+    return np.round(np.arange(start, stop + step / 2, step), 4)
+
+
+def _metrics(counts: np.ndarray, beta: float) -> Dict[str, np.ndarray]:
+    tp, fp, fn, calls = counts.T.astype(float)
+    precision = np.divide(tp, tp + fp, out=np.ones_like(tp), where=(tp + fp) > 0)
+    recall = np.divide(tp, tp + fn, out=np.zeros_like(tp), where=(tp + fn) > 0)
+    b2 = beta ** 2
+    denominator = b2 * precision + recall
+    f_beta = np.divide((1 + b2) * precision * recall, denominator, out=np.zeros_like(tp), where=denominator > 0)
+    return {"precision": precision, "recall": recall, "f_beta": f_beta, "false_positives": fp, "embedding_calls": calls}
+
+
+def _point(thresholds: Dict, metrics: Dict[str, np.ndarray], i: int) -> Dict:
+    return {
+        **thresholds,
+        "precision": round(float(metrics["precision"][i]), 4),
+        "recall": round(float(metrics["recall"][i]), 4),
+        "f_beta": round(float(metrics["f_beta"][i]), 4),
+        "false_positives": int(metrics["false_positives"][i]),
+        "embedding_calls": int(metrics["embedding_calls"][i]),
+    }
+
+
+def _pareto_front(metrics: Dict[str, np.ndarray]) -> np.ndarray:
+    """Indices of combinations no other combination beats on both precision and recall."""
+    order = np.lexsort((-metrics["precision"], -metrics["recall"]))
+    front, best_precision = [], -1.0
+    for i in order:
+        if metrics["precision"][i] > best_precision:
+            front.append(i)
+            best_precision = metrics["precision"][i]
+    return np.array(front[::-1], dtype=int)
+
+
+def check_consistency(texts_a: List[str], texts_b: List[str], features: Dict[str, np.ndarray], thresholds: np.ndarray) -> int:
+    """Re-run is_duplicate_hybrid on a sample of pairs and count disagreements with decide()."""
+    duplicate, _ = decide(features, thresholds)
+    sample = random.Random(0).sample(range(len(texts_a)), min(CONSISTENCY_SAMPLE, len(texts_a)))
+    mismatches = 0
+    for i in sample:
+        is_dup, _ = is_duplicate_hybrid(
+            texts_a[i], texts_b[i],
+            local_similarity=float(features["local"][i]),
+            embedding_similarity=float(features["embedding"][i])
+        )
+        mismatches += is_dup != bool(duplicate[0, i])
+    if mismatches:
+        print(f"⚠️ Vectorised rules disagree with is_duplicate_hybrid on {mismatches}/{len(sample)} sampled pairs")
+    return mismatches
+
+
+def tune(
+    texts_a: List[str],
+    texts_b: List[str],
+    labels: np.ndarray,
+    beta: float = 0.5,
+    min_precision: float = 0.0,
+    workers: int = 0
+) -> Dict:
+    """
+    Grid-search the dedup thresholds.
+
+    Args:
+        texts_a, texts_b: Pair texts (title + body)
+        labels: True where the pair is the same story
+        beta: F-beta weighting; below 1 favours precision (fewer stories wrongly dropped)
+        min_precision: Only recommend settings at least this precise
+        workers: Processes for feature extraction and the grid (0 = one per CPU)
+
+    Returns:
+        Report dict (current and recommended settings, PR curves, Pareto front)
+    """
+    workers = workers or os.cpu_count() or 1
+    grids = [_grid(GRID[name]) for name in PARAMS]
+    combos = np.stack(np.meshgrid(*grids, indexing="ij"), axis=-1).reshape(-1, len(PARAMS))
+
+    current = {**{k: v for k, v in dedup_settings().items() if k in GRID}, "shortlist_threshold": shortlist_threshold()}
+    current_row = np.array([[current[name] for name in PARAMS]])
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        print(f"🔍 Computing features for {len(labels)} pairs ({int(labels.sum())} duplicates)...")
+        features = compute_features(texts_a, texts_b, pool)
+        print(f"📊 Evaluating {len(combos)} threshold combinations on {workers} workers...")
+        chunks = np.array_split(combos, workers * 4)
+        counts = np.concatenate(list(pool.map(_evaluate, [(features, labels, chunk) for chunk in chunks if len(chunk)])))
+
+    metrics = _metrics(counts, beta)
+    eligible = metrics["precision"] >= min_precision
+    if not eligible.any():
+        print(f"⚠️ No setting reaches precision {min_precision:.0%}; recommending the best F-beta instead")
+        eligible[:] = True
+    # Best F-beta, then fewest embedding calls, then fewest wrongly dropped stories
+    ranked = np.lexsort((metrics["false_positives"], metrics["embedding_calls"], -np.where(eligible, metrics["f_beta"], -1.0)))
+    best = int(ranked[0])
+    recommended = {name: float(combos[best, i]) for i, name in enumerate(PARAMS)}
+    current_point = _point(current, _metrics(_evaluate((features, labels, current_row)), beta), 0)
+
+    # One curve per threshold, the others held at their recommended values
+    curves = {}
+    for i, name in enumerate(PARAMS):
+        others = np.all(np.delete(combos, i, axis=1) == np.delete(combos[best], i), axis=1)
+        curves[name] = [_point({name: float(combos[j, i])}, metrics, j) for j in np.flatnonzero(others)]
+
+    # The within-edition safety net is plain word similarity
+    current_safety = dedup_settings()["safety_net_threshold"]
+    safety_grid = _grid(SAFETY_NET_GRID)
+    safety_metrics = _safety_metrics(features, labels, safety_grid, beta)
+    safety_best = int(np.argmax(np.where(safety_metrics["precision"] >= min_precision, safety_metrics["f_beta"], -1.0)))
+    safety_recommended = _point({"safety_net_threshold": float(safety_grid[safety_best])}, safety_metrics, safety_best)
+
+    # With no duplicate found anywhere on the grid every score is 0 and the "best" setting is just
+    # the first (most aggressive) one, so the current settings are kept instead
+    found = bool(metrics["f_beta"][best] > 0)
+    if not found:
+        print("⚠️ No threshold combination finds any duplicate pair; keeping the current dedup settings")
+    safety_found = bool(safety_metrics["f_beta"][safety_best] > 0)
+    if not safety_found:
+        print("⚠️ No safety net threshold finds any duplicate pair; keeping the current safety_net_threshold")
+        safety_recommended = _point(
+            {"safety_net_threshold": current_safety},
+            _safety_metrics(features, labels, np.array([current_safety]), beta), 0
+        )
+
+    return {
+        "pairs": int(len(labels)),
+        "duplicates": int(labels.sum()),
+        "beta": beta,
+        "min_precision": min_precision,
+        "combinations": int(len(combos)),
+        "consistency_mismatches": check_consistency(texts_a, texts_b, features, current_row),
+        "current": current_point,
+        "recommended": _point(recommended, metrics, best) if found else current_point,
+        "recommendation_found": found,
+        "safety_net": {
+            "current": current_safety,
+            "recommended": safety_recommended,
+            "recommendation_found": safety_found,
+            "curve": [_point({"safety_net_threshold": float(t)}, safety_metrics, j) for j, t in enumerate(safety_grid)],
+        },
+        "curves": curves,
+        "pareto_front": [
+            _point({name: float(combos[j, i]) for i, name in enumerate(PARAMS)}, metrics, j)
+            for j in _pareto_front(metrics)
+        ],
+    }
+
+
+def _safety_metrics(features: Dict[str, np.ndarray], labels: np.ndarray, thresholds: np.ndarray, beta: float) -> Dict[str, np.ndarray]:
+    """Metrics of the word-similarity safety net at each threshold."""
+    duplicate = features["word"][None, :] > thresholds[:, None]
+    return _metrics(np.stack([
+        (duplicate & labels).sum(axis=1),
+        (duplicate & ~labels).sum(axis=1),
+        (~duplicate & labels).sum(axis=1),
+        np.zeros(len(thresholds)),
+    ], axis=1), beta)
+
+
+def _print_point(label: str, point: Dict) -> None:
+    print(f"   {label:<12} precision={point['precision']:.1%} recall={point['recall']:.1%} "
+          f"F={point['f_beta']:.3f} wrongly dropped={point['false_positives']} "
+          f"embedding calls={point['embedding_calls']}")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Tune the hybrid dedup thresholds on labelled story pairs.")
+    parser.add_argument("pairs", help="JSONL file of {'a', 'b', 'duplicate'} pairs")
+    parser.add_argument("--beta", type=float, default=0.5, help="F-beta weighting (<1 favours precision)")
+    parser.add_argument("--min-precision", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=0, help="Processes (default: one per CPU)")
+    parser.add_argument("--output", help="Write the full report (curves, Pareto front) as JSON")
+    args = parser.parse_args()
+
+    load_dotenv()
+    with open("ai/config.yml", 'r') as f:
+        config = yaml.safe_load(f)
+    configure_openai_limits(config)
+    configure_embeddings(config)
+    configure_dedup(config)
+
+    texts_a, texts_b, labels = load_pairs(args.pairs)
+    if not len(labels) or labels.all() or not labels.any():
+        parser.error("need both duplicate and distinct pairs to tune against")
+
+    report = tune(texts_a, texts_b, labels, beta=args.beta, min_precision=args.min_precision, workers=args.workers)
+    print(f"\n✅ Searched {report['combinations']} combinations over {report['pairs']} pairs")
+    _print_point("current", report["current"])
+    _print_point("recommended", report["recommended"])
+    _print_point("safety net", report["safety_net"]["recommended"])
+
+    if not (report["recommendation_found"] and report["safety_net"]["recommendation_found"]):
+        print("\nNo setting found any duplicate pair for some thresholds; those keep their current values.")
+    print("\nSuggested config.yml values:")
+    print("dedup:")
+    for name in ("word_threshold", "embedding_threshold", "word_only_threshold"):
+        print(f"  {name}: {report['recommended'][name]}")
+    print(f"  safety_net_threshold: {report['safety_net']['recommended']['safety_net_threshold']}")
+    print("embeddings:")
+    print(f"  shortlist_threshold: {report['recommended']['shortlist_threshold']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📝 Full report written to {args.output}")
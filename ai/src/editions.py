@@ -0,0 +1,195 @@
+# ai/src/editions.py
+# Extra daily editions built from one research pass.
+#
+# Research, parsing and dedup run once. Each edition listed under 'editions' in config.yml
+# then selects the deduplicated stories for its audience (by region and/or keyword), and gets
+# its own Writer and Editor pass with the edition's instructions added to the input. Editions
+# run concurrently; their LLM calls share the pooled, rate-limited OpenAI client, so an extra
+# edition costs only its Writer/Editor calls. Each is published as newsletter-<name>.json
+# plus a dated editions/<date>-daily-<name>.json copy.
+#
+# Only the main edition feeds the story history and coverage filter: a story that ran in a
+# regional edition is still new to the main audience tomorrow.
+
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set
+
+from .run_deadline import out_of_time
+from .replay import in_context
+from .tools import deduplicate_stories, dedup_settings
+from .validation import validate_newsletter, format_issues_for_prompt, DAILY_RULES
+from .whats_hot import COUNTRIES
+
+# Defaults for each entry of the 'editions' list in config.yml
+DEFAULT_EDITION = {
+    "title": "",
+    "regions": [],                # Europe, Americas, APAC, MEA (as in web/lib/regions.ts)
+    "keywords": [],               # a story must mention one of these (case-insensitive)
+    "min_stories": 7,             # topped up with stories that name no region
+    "writer_instructions": "",
+    "editor_instructions": "",
+}
+
+# Editions written at the same time (the OpenAI client's limits still apply across all of them)
+MAX_CONCURRENT_EDITIONS = 4
+
+# ISO country code -> region, mirroring FLAG_TO_REGION in web/lib/regions.ts
+REGION_COUNTRIES = {
+    "Europe": {"GB", "DE", "FR", "NL", "SE", "IE", "CZ", "EE", "LT", "ES", "IT", "CH", "PL", "BE", "AT", "DK",
+               "FI", "NO", "PT", "GR"},
+    "Americas": {"US", "CA", "BR", "AR", "MX", "CO", "CL", "PE"},
+    "APAC": {"SG", "IN", "AU", "JP", "CN", "HK", "ID", "KR", "TW", "TH", "VN", "PH", "MY", "NZ"},
+    "MEA": {"AE", "IL", "NG", "KE", "ZA", "SA", "EG", "QA", "BH", "KW"},
+}
+_COUNTRY_REGION = {code: region for region, codes in REGION_COUNTRIES.items() for code in codes}
+
+
+def _place_pattern(place: str) -> str:
+    # Places are matched capitalised, so "us" and "french fries" don't count
+    if len(place) <= 3 or "." in place:
+        return re.escape(place.upper())
+    return re.escape(" ".join(word[0].upper() + word[1:] for word in place.split()))
+
+
+_PLACE_RE = re.compile(
+    r"(?<![\w.])(" + "|".join(_place_pattern(p) for p in sorted(COUNTRIES, key=len, reverse=True)) + r")(?!\w)"
+)
+
+
+def load_editions(config: Dict) -> List[Dict]:
+    """Editions from config.yml, with defaults filled in (each needs a 'name')."""
+    editions = []
+    for entry in config.get("editions") or []:
+        if not entry.get("name"):
+            print(f"⚠️ Skipping edition without a name: {entry}")
+            continue
+        editions.append({**DEFAULT_EDITION, "title": entry["name"].title(), **entry})
+    return editions
+
+
+def story_regions(story: Dict) -> Set[str]:
+    """Regions of the places a story names in its title and body."""
+    text = f"{story.get('title', '')} {story.get('body', '')}"
+    return {
+        _COUNTRY_REGION[code]
+        for match in _PLACE_RE.finditer(text)
+        if (code := COUNTRIES.get(match.group(1).lower())) in _COUNTRY_REGION
+    }
+
+
+def flag_region(flag: str) -> Optional[str]:
+    """Region of an emoji flag, or None for unknown flags."""
+    code = "".join(chr(ord(c) - 0x1F1E6 + ord("A")) for c in flag if 0x1F1E6 <= ord(c) <= 0x1F1FF)
+    return _COUNTRY_REGION.get(code)
+
+
+def select_stories(stories: List[Dict], edition: Dict) -> List[Dict]:
+    """
+    Stories for an edition, in their original order.
+
+    Stories matching the edition's regions and keywords come first. When fewer than
+    min_stories match, the list is topped up with stories that name no region at all
+    (global stories), so a regional edition still has enough for the Writer to choose from.
+    """
+    regions = set(edition["regions"])
+    keywords = [k.lower() for k in edition["keywords"]]
+    matched, neutral = [], []
+    for story in stories:
+        named = story_regions(story)
+        text = f"{story.get('title', '')} {story.get('body', '')}".lower()
+        keyword_ok = not keywords or any(k in text for k in keywords)
+        if keyword_ok and (not regions or named & regions):
+            matched.append(story)
+        elif regions and not named:
+            neutral.append(story)
+    return matched + neutral[:max(0, edition["min_stories"] - len(matched))]
+
+
+def select_whats_hot(items: List[Dict], edition: Dict) -> List[Dict]:
+    """What's Hot items whose flag is in one of the edition's regions (all items without regions)."""
+    if not edition["regions"]:
+        return items
+    return [item for item in items if flag_region(item.get("flag", "")) in edition["regions"]]
+
+
+def _brief(edition: Dict, instructions: str) -> str:
+    return f"EDITION: {edition['title']}\n{instructions}\n\n" if instructions else f"EDITION: {edition['title']}\n\n"
+
+
+def write_edition(edition: Dict, stories: List[Dict], whats_hot_items: List[Dict], writer_chain, editor_chain) -> Dict:
+    """
+    Write, validate and review one edition.
+
+    Args:
+        edition: Edition settings (see DEFAULT_EDITION)
+        stories: Deduplicated stories from the daily run
+        whats_hot_items: The daily run's What's Hot items
+        writer_chain: The daily Writer chain
+        editor_chain: The daily Editor chain
+
+    Returns:
+        Dict with 'name', 'output' (newsletter dict, or None if the edition was skipped
+        or failed), 'verdict' and 'issues'
+    """
+    result = {"name": edition["name"], "output": None, "verdict": None, "issues": []}
+    selected = select_stories(stories, edition)
+    if len(selected) < DAILY_RULES["min_news"]:
+        result["issues"] = [f"only {len(selected)} stories for this edition"]
+        print(f"ℹ️ Edition '{edition['name']}': only {len(selected)} stories, skipping")
+        return result
+
+    print(f"📰 Edition '{edition['name']}': writing from {len(selected)} of {len(stories)} stories")
+    writer_input = _brief(edition, edition["writer_instructions"]) + json.dumps(selected, indent=2)
+    draft = writer_chain.invoke({"input": writer_input}).content
+    output_json, issues = validate_newsletter(draft, DAILY_RULES)
+    if issues and not (out_of_time() and output_json is not None):
+        retry_input = (
+            f"{writer_input}\n\nYOUR PREVIOUS DRAFT FAILED VALIDATION:\n{draft}\n\n"
+            f"Fix these issues and return the corrected JSON:\n{format_issues_for_prompt(issues)}"
+        )
+        draft = writer_chain.invoke({"input": retry_input}).content
+        output_json, issues = validate_newsletter(draft, DAILY_RULES)
+
+    result["issues"] = issues
+    if output_json is None:
+        print(f"⚠️ Edition '{edition['name']}': Writer output is not valid JSON")
+        return result
+
+    if not issues and not out_of_time():
+        review_input = _brief(edition, edition["editor_instructions"]) + draft
+        result["verdict"] = editor_chain.invoke({"input": review_input}).content
+
+    if isinstance(output_json.get("news"), list):
+        output_json["news"] = deduplicate_stories(
+            output_json["news"], similarity_threshold=dedup_settings()["safety_net_threshold"]
+        )
+    output_json["whats_hot"] = select_whats_hot(whats_hot_items, edition)
+    result["output"] = output_json
+    return result
+
+
+def write_editions(editions: List[Dict], stories: List[Dict], whats_hot_items: List[Dict], writer_chain, editor_chain) -> List[Dict]:
+    """Write every edition concurrently. A failing edition is reported without stopping the others."""
+
+    def run(edition: Dict) -> Dict:
+        try:
+            return write_edition(edition, stories, whats_hot_items, writer_chain, editor_chain)
+        except Exception as e:
+            print(f"⚠️ Edition '{edition['name']}' failed: {e}")
+            return {"name": edition["name"], "output": None, "verdict": None, "issues": [f"failed: {e}"]}
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_EDITIONS) as executor:
+        # Editions run in the stage's context (retry state for the LLM cache, a backfill's pinned time)
+        return list(executor.map(in_context(run), editions))
+
+
+def edition_name(name: str) -> str:
+    """Edition key used in published file names, e.g. daily-europe."""
+    return f"daily-{name}"
+
+
+def latest_filename(name: str) -> str:
+    """Latest-copy file name for an edition, e.g. newsletter-europe.json."""
+    return f"newsletter-{name}.json"
@@ -0,0 +1,300 @@
+# ai/src/embeddings.py
+# Pluggable embedding backends for dedup, clustering and the weekly pool.
+#
+# - "openai": text-embedding-3-small through the shared, rate-limited client (batched, cached)
+# - "local":  character n-gram feature hashing with TF-IDF weighting; no network, no cost
+#
+# The configured backend embeds stories. When it fails (API down, rate limited), pairwise
+# similarity falls back to the local backend for both texts and says so, instead of scoring
+# 0 and silently turning hybrid dedup into word-only matching. After the first failure the
+# backend isn't called again for the rest of the run, so an O(n·m) dedup doesn't wait out the
+# same failure for every pair. The local backend also
+# shortlists story pairs before any API call. Set EMBEDDING_BACKEND=local for tests and
+# benchmarks.
+
+import math
+import os
+import re
+import threading
+import zlib
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .llm_clients import openai_client
+from .single_flight import SingleFlightCache
+
+# Defaults used when config.yml has no 'embeddings' section
+DEFAULT_EMBEDDINGS = {
+    "backend": "openai",
+    "fallback": "local",
+    "shortlist_threshold": 0.1,   # pairs below this local similarity skip the embedding check
+    "local_features": 262144,     # hash buckets (2^18)
+    "local_ngram_min": 3,
+    "local_ngram_max": 5,
+}
+
+# Dense local vectors fold the hash buckets down to this many dimensions
+DENSE_DIM = 2048
+
+# Texts per embeddings API request
+OPENAI_BATCH_SIZE = 100
+
+
+class EmbeddingError(Exception):
+    """Raised when a backend cannot embed (e.g. the API is unreachable)."""
+
+
+class EmbeddingBackend:
+    """Interface for embedding backends: embed texts and compare two of their vectors."""
+
+    name = "base"
+
+    def embed(self, texts: List[str]) -> list:
+        """Vectors for texts, in order. Raises EmbeddingError if the backend is unavailable."""
+        raise NotImplementedError
+
+    def similarity(self, vec1, vec2) -> float:
+        """Cosine similarity of two vectors produced by this backend."""
+        raise NotImplementedError
+
+    def vectors(self, texts: List[str]) -> List[List[float]]:
+        """Dense float vectors for storage and clustering (same as embed() for dense backends)."""
+        return self.embed(texts)
+
+
+def _dense_cosine(vec1, vec2) -> float:
+    if vec1 is None or vec2 is None or len(vec1) == 0 or len(vec1) != len(vec2):
+        return 0.0
+    a, b = np.asarray(vec1, dtype=float), np.asarray(vec2, dtype=float)
+    norm = np.linalg.norm(a) * np.linalg.norm(b)
+    return float(a @ b / norm) if norm else 0.0
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """
+    OpenAI embeddings, batched and cached by text (first 500 chars).
+
+    Concurrent requests for the same text (e.g. dedup and clustering threads) share one API call.
+    """
+
+    name = "openai"
+
+    def __init__(self, model: str = "text-embedding-3-small"):
+        self.model = model
+        self._cache = SingleFlightCache("embeddings")
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    def _openai(self):
+        with self._client_lock:
+            if self._client is None:
+                self._client = openai_client()
+            return self._client
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        keys = [text[:500] for text in texts]
+        by_key = dict(zip(keys, texts))
+        return self._cache.get_or_compute_many(keys, lambda missing: self._fetch([by_key[key] for key in missing]))
+
+    def _fetch(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), OPENAI_BATCH_SIZE):
+            batch = texts[start:start + OPENAI_BATCH_SIZE]
+            try:
+                response = self._openai().embeddings.create(
+                    model=self.model,
+                    input=[text[:8000] for text in batch]  # Model limit is 8191 tokens
+                )
+            except Exception as e:
+                raise EmbeddingError(str(e)) from e
+            vectors.extend(item.embedding for item in response.data)
+        return vectors
+
+    def similarity(self, vec1, vec2) -> float:
+        return _dense_cosine(vec1, vec2)
+
+
+class HashedNgramBackend(EmbeddingBackend):
+    """
+    Character n-gram TF-IDF vectors via feature hashing.
+
+    Vectors are sparse {bucket: weight} dicts, L2-normalised; dense() folds them into
+    DENSE_DIM-dimensional NumPy arrays for matrix comparisons. Document frequencies are
+    accumulated from every text embedded (or passed to fit()), so IDF sharpens as more
+    stories are seen; before that the weighting is plain sublinear TF.
+    """
+
+    name = "local"
+
+    def __init__(self, n_features: int = 262144, ngram_min: int = 3, ngram_max: int = 5):
+        self.n_features = n_features
+        self.ngram_min = ngram_min
+        self.ngram_max = ngram_max
+        self._df: Counter = Counter()
+        self._docs = 0
+        self._seen: set = set()
+        self._lock = threading.Lock()
+
+    def _buckets(self, text: str) -> Counter:
+        text = " " + re.sub(r"\s+", " ", text.lower()).strip() + " "
+        counts: Counter = Counter()
+        for n in range(self.ngram_min, self.ngram_max + 1):
+            for i in range(len(text) - n + 1):
+                counts[zlib.crc32(text[i:i + n].encode("utf-8")) % self.n_features] += 1
+        return counts
+
+    def fit(self, texts: List[str]) -> None:
+        """Add texts to the document frequency statistics (each distinct text counts once)."""
+        with self._lock:
+            for text in texts:
+                key = text[:500]
+                if key in self._seen:
+                    continue
+                self._seen.add(key)
+                self._df.update(self._buckets(text).keys())
+                self._docs += 1
+
+    def _idf(self, bucket: int) -> float:
+        return math.log((1 + self._docs) / (1 + self._df.get(bucket, 0))) + 1
+
+    def embed(self, texts: List[str]) -> List[Dict[int, float]]:
+        self.fit(texts)
+        vectors = []
+        for text in texts:
+            weights = {b: (1 + math.log(n)) * self._idf(b) for b, n in self._buckets(text).items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            vectors.append({b: w / norm for b, w in weights.items()})
+        return vectors
+
+    def similarity(self, vec1: Dict[int, float], vec2: Dict[int, float]) -> float:
+        if not vec1 or not vec2:
+            return 0.0
+        if len(vec1) > len(vec2):
+            vec1, vec2 = vec2, vec1
+        return sum(w * vec2.get(b, 0.0) for b, w in vec1.items())
+
+    def dense(self, texts: List[str]) -> np.ndarray:
+        """Row-normalised dense matrix (len(texts) x DENSE_DIM) of the texts' vectors."""
+        matrix = np.zeros((len(texts), DENSE_DIM))
+        for row, vector in enumerate(self.embed(texts)):
+            for bucket, weight in vector.items():
+                matrix[row, bucket % DENSE_DIM] += weight
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1.0, norms)
+
+    def vectors(self, texts: List[str]) -> List[List[float]]:
+        return self.dense(texts).tolist()
+
+
+BACKENDS: Dict[str, Callable[[Dict], EmbeddingBackend]] = {
+    "openai": lambda settings: OpenAIEmbeddingBackend(),
+    "local": lambda settings: HashedNgramBackend(
+        n_features=settings["local_features"],
+        ngram_min=settings["local_ngram_min"],
+        ngram_max=settings["local_ngram_max"],
+    ),
+}
+
+_settings = dict(DEFAULT_EMBEDDINGS)
+_backends: Dict[str, EmbeddingBackend] = {}
+_backends_lock = threading.Lock()
+_stats = {"fallbacks": 0, "shortlist_skipped": 0}
+# Backends that failed during this run, with their first error (reset by configure_embeddings)
+_failed: Dict[str, str] = {}
+_failed_lock = threading.Lock()
+
+
+def register_backend(name: str, factory: Callable[[Dict], EmbeddingBackend]) -> None:
+    """Make a custom backend selectable by name in config.yml."""
+    BACKENDS[name] = factory
+
+
+def configure_embeddings(config: Dict) -> None:
+    """Apply the 'embeddings' section of config.yml (EMBEDDING_BACKEND overrides the backend)."""
+    _settings.update(config.get("embeddings") or {})
+    with _failed_lock:
+        _failed.clear()
+    backend = os.getenv("EMBEDDING_BACKEND", _settings["backend"])
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Choose one of: {', '.join(BACKENDS)}")
+    _settings["backend"] = backend
+
+
+def get_backend(name: Optional[str] = None) -> EmbeddingBackend:
+    """The named backend (default: the configured one), created once per process."""
+    name = name or os.getenv("EMBEDDING_BACKEND", _settings["backend"])
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = BACKENDS[name](_settings)
+        return _backends[name]
+
+
+def local_backend() -> HashedNgramBackend:
+    return get_backend("local")
+
+
+def record_failure(name: str, error: Exception) -> None:
+    """Remember that a backend failed, so it isn't called again during this run."""
+    with _failed_lock:
+        if name in _failed:
+            return
+        _failed[name] = str(error)
+    fallback = _settings.get("fallback")
+    if fallback and fallback != name:
+        print(f"⚠️ Embedding backend '{name}' unavailable ({error}), using '{fallback}' for the rest of the run")
+    else:
+        print(f"⚠️ Embedding backend '{name}' unavailable ({error}), skipping embedding similarity for the rest of the run")
+
+
+def backend_failed(name: Optional[str] = None) -> bool:
+    """True once the backend (default: the configured one) has failed during this run."""
+    return (name or os.getenv("EMBEDDING_BACKEND", _settings["backend"])) in _failed
+
+
+def text_similarity(text1: str, text2: str) -> Tuple[float, str]:
+    """
+    Cosine similarity of two texts with the configured backend, falling back when it fails.
+
+    Returns:
+        Tuple of (similarity, name of the backend that produced it)
+    """
+    backend = get_backend()
+    fallback = _settings.get("fallback")
+    if fallback == backend.name:
+        fallback = None
+    if not backend_failed(backend.name):
+        try:
+            vec1, vec2 = backend.embed([text1, text2])
+            return backend.similarity(vec1, vec2), backend.name
+        except EmbeddingError as e:
+            record_failure(backend.name, e)
+    if not fallback:
+        return 0.0, backend.name
+    _stats["fallbacks"] += 1
+    backup = get_backend(fallback)
+    vec1, vec2 = backup.embed([text1, text2])
+    return backup.similarity(vec1, vec2), backup.name
+
+
+def shortlist_similarities(texts_a: List[str], texts_b: List[str]) -> np.ndarray:
+    """Local similarity matrix (len(texts_a) x len(texts_b)); a cheap first pass before embeddings."""
+    if not texts_a or not texts_b:
+        return np.zeros((len(texts_a), len(texts_b)))
+    local = local_backend()
+    local.fit(texts_a + texts_b)
+    return local.dense(texts_a) @ local.dense(texts_b).T
+
+
+def shortlist_threshold() -> float:
+    return _settings["shortlist_threshold"]
+
+
+def record_shortlist_skip() -> None:
+    _stats["shortlist_skipped"] += 1
+
+
+def embedding_stats() -> Dict:
+    """Fallbacks and shortlist skips during this run (for the run report)."""
+    return {"backend": _settings["backend"], **_stats}
@@ -0,0 +1,171 @@
+# ai/src/feed_parser.py
+# Streaming fast path for reading RSS and Atom feeds.
+#
+# rss_tool keeps only the title, link, date and the start of the summary of a feed's most
+# recent entries, but feedparser.parse builds every entry of the document with all its
+# namespaces and sanitized HTML. Here lxml's iterparse walks the document once, pulls out just
+# those fields as each <item>/<entry> closes, frees the element, and stops once the entries
+# still to come can't be selected any more (feeds list their newest entries first). Summary
+# HTML is reduced to text with a regex tag stripper instead of a full HTML parse.
+#
+# Documents that aren't well-formed XML, or where no entries are found, return None and the
+# caller falls back to feedparser, which copes with broken markup and exotic formats.
+
+import calendar
+import html
+import io
+import re
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+
+from feedparser import FeedParserDict
+# feedparser's own date parser, so published_parsed matches what feedparser.parse would give
+from feedparser.datetimes import _parse_date
+from lxml import etree
+
+# Entry elements: <item> in RSS 0.9x/1.0/2.0, <entry> in Atom
+ENTRY_TAGS = {"item", "entry"}
+
+# Feeds aren't always strictly newest-first: this many entries past the point where we have
+# enough (or in a row older than 'since') are still read before stopping
+OUT_OF_ORDER_ENTRIES = 5
+
+# Never read more entries than this from one document
+MAX_ENTRIES = 200
+
+_TAG_RE = re.compile(r"<[^>]*>")
+_HIDDEN_RE = re.compile(r"<(script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+
+_stats = {"fast": 0, "fallback": 0, "stopped_early": 0, "entries": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str, amount: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def strip_html(text: str) -> str:
+    """Plain text of an HTML fragment: tags dropped, entities decoded, whitespace collapsed."""
+    if "<" in text:
+        text = _TAG_RE.sub(" ", _HIDDEN_RE.sub(" ", text))
+    return " ".join(html.unescape(text).split())
+
+
+def _local(tag) -> str:
+    return tag.rpartition("}")[2] if isinstance(tag, str) else ""
+
+
+def _text(element) -> str:
+    # Atom type="xhtml" content is child elements rather than text
+    if len(element):
+        return "".join(element.itertext())
+    return element.text or ""
+
+
+def _atom_link(element) -> str:
+    rel = element.get("rel", "alternate")
+    return element.get("href", "") if rel == "alternate" else ""
+
+
+def _read_entry(element, base_url: str) -> FeedParserDict:
+    """The fields the pipeline uses, named as in feedparser entries."""
+    fields: Dict[str, str] = {}
+    for child in element:
+        name = _local(child.tag)
+        if name == "link":
+            # RSS puts the URL in the text, Atom in href (prefer rel="alternate")
+            link = child.text.strip() if child.text and child.text.strip() else _atom_link(child)
+            if link and "link" not in fields:
+                fields["link"] = link
+        elif name == "guid" and child.get("isPermaLink", "true") != "false":
+            fields.setdefault("guid", (child.text or "").strip())
+        elif name in ("title", "pubDate", "published", "updated", "date", "summary", "description",
+                      "encoded", "content"):
+            fields.setdefault(name, _text(child))
+
+    entry = FeedParserDict()
+    entry["title"] = strip_html(fields.get("title", ""))
+    link = fields.get("link") or fields.get("guid", "")
+    entry["link"] = urljoin(base_url, link) if link else ""
+    entry["summary"] = next(
+        (fields[name] for name in ("summary", "description", "content", "encoded") if fields.get(name)), ""
+    )
+    published = fields.get("pubDate") or fields.get("published") or fields.get("date")
+    if published:
+        entry["published_parsed"] = _parse_date(published.strip())
+    if fields.get("updated"):
+        entry["updated_parsed"] = _parse_date(fields["updated"].strip())
+    return entry
+
+
+def _timestamp(entry: FeedParserDict) -> Optional[float]:
+    published = entry.get("published_parsed") or entry.get("updated_parsed")
+    return calendar.timegm(published) if published else None
+
+
+def parse_feed(body: bytes, base_url: str, since: Optional[float] = None, keep: Optional[int] = None) -> Optional[FeedParserDict]:
+    """
+    Parse the entries of an RSS or Atom document, stopping once the rest can't be needed.
+
+    Reading stops OUT_OF_ORDER_ENTRIES entries after 'keep' entries newer than 'since' were
+    found, or after that many entries in a row older than 'since'.
+
+    Args:
+        body: Feed document
+        base_url: URL the feed was fetched from (relative links are resolved against it)
+        since: UTC epoch seconds; older entries are not needed (None: read every entry)
+        keep: Entries newer than since that are enough (None: no limit)
+
+    Returns:
+        feedparser-style result with 'entries' (title, link, summary, published_parsed,
+        updated_parsed), or None if the document should be parsed by feedparser instead
+    """
+    entries: List[FeedParserDict] = []
+    recent, old_in_a_row, enough_at = 0, 0, None
+    try:
+        for _, element in etree.iterparse(io.BytesIO(body), events=("end",), resolve_entities=False, no_network=True):
+            if _local(element.tag) not in ENTRY_TAGS:
+                continue
+            entry = _read_entry(element, base_url)
+            entries.append(entry)
+
+            # Free the entry and the ones before it, so memory stays flat on large feeds
+            element.clear()
+            parent = element.getparent()
+            while element.getprevious() is not None:
+                del parent[0]
+
+            ts = _timestamp(entry)
+            if since is not None and ts is not None:
+                if ts >= since:
+                    recent += 1
+                    old_in_a_row = 0
+                else:
+                    old_in_a_row += 1
+            if keep is not None and enough_at is None and recent >= keep:
+                enough_at = len(entries)
+            if (
+                len(entries) >= MAX_ENTRIES
+                or old_in_a_row >= OUT_OF_ORDER_ENTRIES
+                or (enough_at is not None and len(entries) >= enough_at + OUT_OF_ORDER_ENTRIES)
+            ):
+                _count("stopped_early")
+                break
+    except etree.XMLSyntaxError:
+        _count("fallback")
+        return None
+
+    if not entries:
+        _count("fallback")
+        return None
+    _count("fast")
+    _count("entries", len(entries))
+    return FeedParserDict(entries=entries, bozo=0)
+
+
+def feed_parser_stats() -> Dict:
+    """Feeds parsed by the fast path, left to feedparser, and stopped early (for the run report)."""
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,166 @@
+# ai/src/feed_selection.py
+# Per-feed entry selection driven by each source's publishing statistics.
+#
+# A fixed "last 48 hours, first 15 entries" rule fits no feed well: quiet feeds fall back
+# to their whole (stale) archive, while high-volume feeds lose recent items past #15.
+# Every time a run's rss_tool reads a feed, its publish rate, the age of its newest entry and
+# the interval between our runs are folded into running averages saved in
+# ai/runs/feed_stats.json. The next run derives a window and a cap for each feed from them.
+# Fetches that aren't a run reading the feed (the daemon's poller) only leave the entries'
+# timestamps pending, so the statistics follow the run cadence rather than the poll cadence.
+
+import json
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .checkpoints import RUNS_DIR
+
+STATS_PATH = os.path.join(RUNS_DIR, "feed_stats.json")
+
+# Defaults used when config.yml has no 'feed_selection' section
+DEFAULT_FEED_SELECTION = {
+    "default_window_hours": 48,   # window for a feed we have no history for
+    "min_window_hours": 24,
+    "max_window_hours": 96,
+    "default_entries": 15,        # cap for a feed we have no history for
+    "min_entries": 5,
+    "max_entries": 30,
+    "fallback_entries": 3,        # newest entries kept when nothing is inside the window
+    "stale_after_hours": 168,     # ...as long as they are younger than this
+}
+
+# Weight of the newest observation in the running averages
+SMOOTHING = 0.3
+
+# Reads closer together than this (retries, daemon polls) don't count as a new run interval
+MIN_RUN_INTERVAL_HOURS = 1
+
+_settings = dict(DEFAULT_FEED_SELECTION)
+_stats: Optional[Dict[str, Dict]] = None
+_lock = threading.Lock()
+# Entry timestamps of the latest fetch of each feed, until a run reads it (see record_read)
+_pending: Dict[str, List[float]] = {}
+
+
+def configure_feed_selection(config: Dict) -> None:
+    """Apply the 'feed_selection' section of config.yml."""
+    _settings.update(config.get("feed_selection") or {})
+
+
+def _load_stats() -> Dict[str, Dict]:
+    global _stats
+    if _stats is None:
+        try:
+            with open(STATS_PATH, 'r') as f:
+                _stats = json.load(f)
+        except (OSError, ValueError):
+            _stats = {}
+    return _stats
+
+
+def _save_stats() -> None:
+    os.makedirs(os.path.dirname(STATS_PATH) or ".", exist_ok=True)
+    tmp_path = STATS_PATH + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(_stats, f, indent=2)
+    os.replace(tmp_path, STATS_PATH)
+
+
+def _smooth(previous: Optional[float], value: float) -> float:
+    return value if previous is None else (1 - SMOOTHING) * previous + SMOOTHING * value
+
+
+def _observe(feed_url: str, timestamps: List[float], now: float) -> Dict:
+    """Fold one read of a feed into its running statistics."""
+    stats = _load_stats().setdefault(feed_url, {"runs": 0})
+
+    if len(timestamps) >= 2:
+        span_hours = (max(timestamps) - min(timestamps)) / 3600
+        if span_hours > 0:
+            stats["rate_per_hour"] = _smooth(stats.get("rate_per_hour"), (len(timestamps) - 1) / span_hours)
+    if timestamps:
+        lag_hours = max(0.0, (now - max(timestamps)) / 3600)
+        stats["lag_hours"] = _smooth(stats.get("lag_hours"), lag_hours)
+
+    last_run = stats.get("last_run")
+    if last_run is not None:
+        interval_hours = (now - last_run) / 3600
+        if interval_hours >= MIN_RUN_INTERVAL_HOURS:
+            stats["run_interval_hours"] = _smooth(stats.get("run_interval_hours"), interval_hours)
+
+    stats["last_run"] = now
+    stats["runs"] += 1
+    return stats
+
+
+def _window_and_cap(stats: Dict) -> Tuple[float, int]:
+    """Window (hours) and entry cap for a feed, from its statistics."""
+    s = _settings
+    if "run_interval_hours" not in stats and "lag_hours" not in stats:
+        return s["default_window_hours"], s["default_entries"]
+
+    # Cover the time since the previous run, stretched by how long this feed usually goes quiet
+    window = stats.get("run_interval_hours", s["default_window_hours"] / 2) + stats.get("lag_hours", 0.0)
+    window = min(max(window, s["min_window_hours"]), s["max_window_hours"])
+
+    rate = stats.get("rate_per_hour")
+    cap = s["default_entries"] if rate is None else math.ceil(rate * window)
+    cap = min(max(cap, s["min_entries"]), s["max_entries"])
+    return window, cap
+
+
+def feed_window(feed_url: str) -> Tuple[float, int]:
+    """A feed's current window (hours) and cap, without recording a read (used when replaying)."""
+    with _lock:
+        return _window_and_cap(_load_stats().get(feed_url, {}))
+
+
+def record_read(feed_url: str) -> None:
+    """Fold the latest fetch of a feed into its statistics, once, when a run reads the feed."""
+    with _lock:
+        timestamps = _pending.pop(feed_url, None)
+        if timestamps is None:
+            return
+        _observe(feed_url, timestamps, time.time())
+        try:
+            _save_stats()
+        except OSError as e:
+            print(f"⚠️ Could not save feed statistics: {e}")
+
+
+def select_entries(feed_url: str, entries: list, timestamp: Callable[[object], Optional[float]]) -> list:
+    """
+    Pick the entries of a feed worth passing to the researcher.
+
+    Entries inside the feed's window are kept newest first, up to its cap. When none
+    are, only the newest few younger than stale_after_hours are kept instead of the
+    whole feed. Feeds without dates keep their first entries up to the cap.
+
+    Args:
+        feed_url: Feed the entries come from (key for its statistics)
+        entries: Feed entries in feed order
+        timestamp: Returns an entry's UTC publish time as epoch seconds, or None
+
+    Returns:
+        Selected entries
+    """
+    now = time.time()
+    dated = [(ts, entry) for entry in entries if (ts := timestamp(entry)) is not None]
+
+    with _lock:
+        window, cap = _window_and_cap(_load_stats().get(feed_url, {}))
+        _pending[feed_url] = [ts for ts, _ in dated]
+
+    if not dated:
+        return list(entries)[:cap]
+
+    dated.sort(key=lambda pair: pair[0], reverse=True)
+    recent = [entry for ts, entry in dated if ts >= now - window * 3600]
+    if recent:
+        return recent[:cap]
+
+    stale_cutoff = now - _settings["stale_after_hours"] * 3600
+    return [entry for ts, entry in dated if ts >= stale_cutoff][:_settings["fallback_entries"]]
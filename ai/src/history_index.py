@@ -0,0 +1,287 @@
+# ai/src/history_index.py
+# Nearest-neighbour index of published story embeddings for historical dedup.
+#
+# Every published story is upserted with its embedding as the edition publishes. Dedup then
+# asks the index for each new story's top-k most similar past stories inside the lookback
+# window and runs the entity/word/embedding rules only against those, so a 90-day (or
+# whole-archive) window costs about the same as the old 3-day brute-force comparison. The
+# brute-force comparison with the last 3 days is only the fallback while the index is empty.
+#
+# Backends: a NumPy matrix saved under ai/runs/history_index/ (the supported backend: the
+# workflows cache ai/runs, and chromadb is not in ai/requirements.txt), or the Chroma
+# persistent store in db/ (HNSW, cosine) with backend: chroma or auto when chromadb is
+# installed. Vectors from different embedding backends are kept in separate collections, so
+# they are never compared.
+#
+# Usage:
+#   python -m ai.src.history_index rebuild --days 90              # seed from Supabase history
+#   python -m ai.src.history_index rebuild --days 90 --if-empty   # only when nothing is indexed (workflows)
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import chromadb
+except ImportError:  # optional: the NumPy index is used without it
+    chromadb = None
+
+from .checkpoints import RUNS_DIR
+from .embeddings import EmbeddingError, get_backend
+from .replay import as_of, current_time
+
+# Defaults used when config.yml has no 'history_index' section
+DEFAULT_HISTORY_INDEX = {
+    "backend": "auto",          # auto | chroma | numpy
+    "chroma_path": "db",
+    "lookback_days": 90,
+    "top_k": 5,                 # neighbours checked per new story
+    "min_similarity": 0.5,      # neighbours below this embedding similarity are not checked
+}
+
+NUMPY_INDEX_DIR = os.path.join(RUNS_DIR, "history_index")
+
+# Stored story bodies are truncated; dedup only needs the opening
+MAX_STORED_BODY = 1500
+
+# A neighbour: (story dict with title/body/date/url, embedding similarity)
+Neighbour = Tuple[Dict, float]
+
+_settings = dict(DEFAULT_HISTORY_INDEX)
+_index = None
+_index_lock = threading.Lock()
+
+
+def configure_history_index(config: Dict) -> None:
+    """Apply the 'history_index' section of config.yml."""
+    global _index
+    _settings.update(config.get("history_index") or {})
+    _index = None
+
+
+def story_id(story: Dict) -> str:
+    """Stable id of a published story (source URL, or title when there is none)."""
+    key = story.get("source", {}).get("url") or story.get("url") or story.get("title", "")
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _metadata(story: Dict, published: float) -> Dict:
+    return {
+        "title": story.get("title", ""),
+        "body": story.get("body", "")[:MAX_STORED_BODY],
+        "url": story.get("source", {}).get("url") or story.get("url", ""),
+        "published": published,
+        "date": datetime.fromtimestamp(published).strftime("%Y-%m-%d"),
+    }
+
+
+class NumpyHistoryIndex:
+    """Exact cosine search over a normalised NumPy matrix, persisted as .npy + .json."""
+
+    def __init__(self, directory: str, collection: str):
+        self._vectors_path = os.path.join(directory, f"{collection}.npy")
+        self._meta_path = os.path.join(directory, f"{collection}.json")
+        self._lock = threading.Lock()
+        self.ids: List[str] = []
+        self.metadata: List[Dict] = []
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        if os.path.exists(self._vectors_path) and os.path.exists(self._meta_path):
+            with open(self._meta_path, 'r') as f:
+                stored = json.load(f)
+            self.ids, self.metadata = stored["ids"], stored["metadata"]
+            self.vectors = np.load(self._vectors_path)
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def upsert(self, ids: List[str], vectors: List[List[float]], metadata: List[Dict]) -> None:
+        new = np.asarray(vectors, dtype=np.float32)
+        new /= np.linalg.norm(new, axis=1, keepdims=True) + 1e-12
+        with self._lock:
+            if self.count() and self.vectors.shape[1] != new.shape[1]:
+                raise ValueError(f"Vector size {new.shape[1]} doesn't match the index ({self.vectors.shape[1]})")
+            positions = {story: i for i, story in enumerate(self.ids)}
+            rows = list(self.vectors) if self.count() else []
+            for story, vector, meta in zip(ids, new, metadata):
+                if story in positions:
+                    rows[positions[story]] = vector
+                    self.metadata[positions[story]] = meta
+                else:
+                    positions[story] = len(self.ids)
+                    self.ids.append(story)
+                    self.metadata.append(meta)
+                    rows.append(vector)
+            self.vectors = np.vstack(rows).astype(np.float32)
+            self._save()
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self._vectors_path), exist_ok=True)
+        with open(self._vectors_path + ".tmp", 'wb') as f:
+            np.save(f, self.vectors)
+        os.replace(self._vectors_path + ".tmp", self._vectors_path)
+        with open(self._meta_path + ".tmp", 'w') as f:
+            json.dump({"ids": self.ids, "metadata": self.metadata}, f)
+        os.replace(self._meta_path + ".tmp", self._meta_path)
+
+    def query(self, vectors: List[List[float]], k: int, since: float, until: Optional[float] = None) -> List[List[Neighbour]]:
+        if not self.count():
+            return [[] for _ in vectors]
+        queries = np.asarray(vectors, dtype=np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True) + 1e-12
+        in_window = np.array([
+            m["published"] >= since and (until is None or m["published"] < until) for m in self.metadata
+        ])
+        scores = queries @ self.vectors.T
+        scores[:, ~in_window] = -np.inf
+
+        results = []
+        k = min(k, self.count())
+        for row in scores:
+            top = np.argpartition(-row, k - 1)[:k]
+            top = top[np.argsort(-row[top])]
+            results.append([(self.metadata[i], float(row[i])) for i in top if np.isfinite(row[i])])
+        return results
+
+
+class ChromaHistoryIndex:
+    """HNSW cosine search in a persistent Chroma collection."""
+
+    def __init__(self, path: str, collection: str):
+        client = chromadb.PersistentClient(path=path)
+        self._collection = client.get_or_create_collection(collection, metadata={"hnsw:space": "cosine"})
+
+    def count(self) -> int:
+        return self._collection.count()
+
+    def upsert(self, ids: List[str], vectors: List[List[float]], metadata: List[Dict]) -> None:
+        self._collection.upsert(ids=ids, embeddings=vectors, metadatas=metadata)
+
+    def query(self, vectors: List[List[float]], k: int, since: float, until: Optional[float] = None) -> List[List[Neighbour]]:
+        if not self.count():
+            return [[] for _ in vectors]
+        where = {"published": {"$gte": since}}
+        if until is not None:
+            where = {"$and": [where, {"published": {"$lt": until}}]}
+        result = self._collection.query(
+            query_embeddings=vectors,
+            n_results=min(k, self.count()),
+            where=where,
+            include=["metadatas", "distances"],
+        )
+        return [
+            [(meta, 1.0 - distance) for meta, distance in zip(metas, distances)]
+            for metas, distances in zip(result["metadatas"], result["distances"])
+        ]
+
+
+def get_history_index():
+    """The history index for the current embedding backend (Chroma if available, else NumPy)."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            collection = f"story_history_{get_backend().name}"
+            use_chroma = _settings["backend"] == "chroma" or (_settings["backend"] == "auto" and chromadb is not None)
+            if use_chroma:
+                try:
+                    _index = ChromaHistoryIndex(_settings["chroma_path"], collection)
+                except Exception as e:
+                    print(f"⚠️ Chroma history index unavailable ({e}), using the NumPy index")
+            if _index is None:
+                _index = NumpyHistoryIndex(NUMPY_INDEX_DIR, collection)
+        return _index
+
+
+def add_published_stories(stories: List[Dict], published: Optional[float] = None) -> int:
+    """
+    Upsert published stories into the history index.
+
+    Args:
+        stories: Newsletter stories ({'title', 'body', 'source': {'url'}}) or history dicts
+        published: Publication time (epoch seconds); defaults to now
+
+    Returns:
+        Number of stories indexed (0 if they couldn't be embedded)
+    """
+    if not stories:
+        return 0
+    published = published or time.time()
+    texts = [s.get("title", "") + " " + s.get("body", "") for s in stories]
+    try:
+        vectors = get_backend().vectors(texts)
+        get_history_index().upsert(
+            [story_id(s) for s in stories], vectors, [_metadata(s, published) for s in stories]
+        )
+    except (EmbeddingError, ValueError, OSError) as e:
+        print(f"⚠️ Could not update the history index: {e}")
+        return 0
+    return len(stories)
+
+
+def find_neighbours(texts: List[str], lookback_days: Optional[int] = None) -> Optional[List[List[Neighbour]]]:
+    """
+    Top-k most similar published stories for each text, within the lookback window.
+
+    Neighbours below min_similarity are dropped. Returns None when the index is empty or
+    the texts can't be embedded, so callers fall back to brute-force comparison.
+    """
+    index = get_history_index()
+    if not texts or not index.count():
+        return None
+    days = lookback_days or _settings["lookback_days"]
+    try:
+        vectors = get_backend().vectors(texts)
+    except EmbeddingError as e:
+        print(f"⚠️ History index lookup skipped: {e}")
+        return None
+    # A backfill run only sees stories published before its pinned time
+    since = current_time() - days * 86400
+    return [
+        [(meta, sim) for meta, sim in neighbours if sim >= _settings["min_similarity"]]
+        for neighbours in index.query(vectors, _settings["top_k"], since, as_of())
+    ]
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    import yaml
+
+    from .main import CONFIG_PATH, _fetch_recent_stories
+    from .embeddings import configure_embeddings
+    from .llm_clients import configure_openai_limits
+
+    parser = argparse.ArgumentParser(description="Manage the published-story history index.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = commands.add_parser("rebuild", help="Upsert published stories from Supabase")
+    rebuild_parser.add_argument("--days", type=int, default=90)
+    rebuild_parser.add_argument("--if-empty", action="store_true", help="Do nothing if the index already has stories")
+    args = parser.parse_args()
+
+    load_dotenv()
+    with open(CONFIG_PATH, 'r') as f:
+        config = yaml.safe_load(f)
+    configure_openai_limits(config)
+    configure_embeddings(config)
+    configure_history_index(config)
+
+    if args.if_empty and get_history_index().count():
+        print(f"ℹ️ History index already holds {get_history_index().count()} stories, not rebuilding")
+        raise SystemExit(0)
+
+    by_date: Dict[str, List[Dict]] = {}
+    for story in _fetch_recent_stories(args.days).get("stories", []):
+        by_date.setdefault(story.get("date", ""), []).append(story)
+    total = 0
+    for date, stories in sorted(by_date.items()):
+        try:
+            published = datetime.strptime(date, "%Y-%m-%d").timestamp()
+        except ValueError:
+            published = None
+        total += add_published_stories(stories, published)
+    print(f"✅ History index now holds {get_history_index().count()} stories ({total} upserted)")
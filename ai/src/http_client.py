@@ -0,0 +1,187 @@
+# ai/src/http_client.py
+# Shared HTTP client for feeds, scraped pages and search.
+#
+# Every fetch goes through one pooled requests.Session, so connections are kept alive per
+# host across the researcher's concurrent tool calls. Each request gets:
+#   - separate connect and read timeouts, plus a total deadline for the whole body (all
+#     capped at the time left in the run's current stage, see run_deadline.py)
+#   - gzip (and brotli when the brotli package is installed) content encoding
+#   - a maximum body size: feeds over it fail, pages are truncated to it
+#   - the same User-Agent and Accept-Language headers
+# feedparser parses the bytes fetched here instead of opening the URL itself.
+
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .run_deadline import call_timeout
+
+try:
+    import brotli  # noqa: F401 -- lets urllib3 decode "br" responses
+except ImportError:  # optional: only gzip/deflate are requested without it
+    brotli = None
+
+# Defaults used when config.yml has no 'http' section
+DEFAULT_HTTP = {
+    "connect_timeout": 5,       # seconds to open a connection
+    "read_timeout": 15,         # seconds to wait for each chunk of the response
+    "total_timeout": 30,        # seconds for the whole body
+    "max_body_mb": 5,
+    "pool_size": 16,            # kept-alive connections per host
+    "user_agent": "Mozilla/5.0 (compatible; thepaymentsnerd/2.0)",
+}
+
+FEED_ACCEPT = "application/rss+xml, application/atom+xml, application/xml;q=0.9, text/xml;q=0.9, */*;q=0.8"
+PAGE_ACCEPT = "text/html, application/xhtml+xml;q=0.9, */*;q=0.8"
+
+CHUNK_SIZE = 64 * 1024
+
+_settings = dict(DEFAULT_HTTP)
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_stats = {"requests": 0, "errors": 0, "timeouts": 0, "too_large": 0, "truncated": 0, "bytes": 0}
+_stats_lock = threading.Lock()
+
+
+class FetchError(Exception):
+    """Raised when a URL can't be fetched (network error, timeout, HTTP error or oversized body)."""
+
+
+class FetchResult:
+    """Body and response metadata of a fetched URL."""
+
+    def __init__(self, url: str, status: int, headers: Dict[str, str], body: bytes, truncated: bool):
+        # headers: response headers with lowercased names
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.truncated = truncated
+
+    @property
+    def charset(self) -> Optional[str]:
+        """Charset from the Content-Type header, if any."""
+        for part in self.headers.get("content-type", "").split(";")[1:]:
+            key, _, value = part.strip().partition("=")
+            if key.lower() == "charset" and value:
+                return value.strip('"\'')
+        return None
+
+
+def _count(name: str, amount: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def configure_http(config: Dict) -> None:
+    """Apply the 'http' section of config.yml (the session is rebuilt on next use)."""
+    global _session
+    _settings.update(config.get("http") or {})
+    with _session_lock:
+        _session = None
+
+
+def shared_headers() -> Dict[str, str]:
+    """Headers sent with every request (also passed to the search client)."""
+    return {
+        "User-Agent": _settings["user_agent"],
+        "Accept-Language": "en-US,en;q=0.9",
+        "Accept-Encoding": "gzip, deflate, br" if brotli is not None else "gzip, deflate",
+    }
+
+
+def request_timeout() -> float:
+    """Total seconds a single request may take (for clients that take one timeout)."""
+    return call_timeout(_settings["total_timeout"])
+
+
+def get_session() -> requests.Session:
+    """The pooled session, created once per process."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=_settings["pool_size"], pool_maxsize=_settings["pool_size"])
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(shared_headers())
+            _session = session
+        return _session
+
+
+def fetch(url: str, accept: str = PAGE_ACCEPT, truncate: bool = False) -> FetchResult:
+    """
+    Fetch a URL through the shared session.
+
+    Args:
+        url: URL to fetch
+        accept: Accept header for this request
+        truncate: Keep the first max_body_mb of an oversized body instead of failing
+
+    Returns:
+        FetchResult with the (decompressed) body
+
+    Raises:
+        FetchError: On network errors, timeouts, HTTP error statuses, or an oversized
+            body when truncate is False
+    """
+    max_bytes = int(_settings["max_body_mb"] * 1024 * 1024)
+    total_timeout = request_timeout()
+    deadline = time.monotonic() + total_timeout
+    _count("requests")
+    try:
+        with get_session().get(
+            url,
+            headers={"Accept": accept},
+            timeout=(_settings["connect_timeout"], call_timeout(_settings["read_timeout"])),
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            declared = int(response.headers.get("content-length") or 0)
+            if declared > max_bytes and not truncate:
+                _count("too_large")
+                raise FetchError(f"{url} is {declared} bytes (limit {max_bytes})")
+
+            chunks, size, truncated = [], 0, False
+            for chunk in response.iter_content(CHUNK_SIZE):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > max_bytes:
+                    if not truncate:
+                        _count("too_large")
+                        raise FetchError(f"{url} is over the {max_bytes} byte limit")
+                    truncated = True
+                    break
+                if time.monotonic() > deadline:
+                    _count("timeouts")
+                    raise FetchError(f"{url} took over {total_timeout:.0f}s")
+            body = b"".join(chunks)[:max_bytes]
+            _count("bytes", len(body))
+            if truncated:
+                _count("truncated")
+            headers = {k.lower(): v for k, v in response.headers.items()}
+            return FetchResult(response.url, response.status_code, headers, body, truncated)
+    except FetchError:
+        _count("errors")
+        raise
+    except requests.Timeout as e:
+        _count("timeouts")
+        _count("errors")
+        raise FetchError(f"Timed out fetching {url}: {e}") from e
+    except requests.RequestException as e:
+        _count("errors")
+        raise FetchError(f"Could not fetch {url}: {e}") from e
+
+
+def fetch_feed(url: str) -> FetchResult:
+    """Fetch a feed document (oversized feeds fail rather than parse truncated XML)."""
+    return fetch(url, accept=FEED_ACCEPT)
+
+
+def http_stats() -> Dict:
+    """Requests, failures and bytes fetched during this run (for the run report)."""
+    with _stats_lock:
+        return dict(_stats)
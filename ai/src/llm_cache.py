@@ -0,0 +1,191 @@
+# ai/src/llm_cache.py
+# Content-addressed on-disk cache for LLM responses.
+#
+# Attached to the deterministic (temperature 0) chat models only - the parser and the
+# Editor - whose calls are looked up by a hash of model, temperature, bound tool schemas and
+# messages before going to the API. The Writer and researcher are never cached: a retry or
+# --resume-from must get a fresh draft, not the same one that failed validation. Inside a
+# retried or resumed stage lookups are skipped (the fresh response replaces the entry), and
+# a response whose output turned out to be unusable can be dropped with forget_last_response().
+# Entries live in a local SQLite file with TTL and size-based (least recently used) eviction.
+# 'replay' mode serves hits without writing.
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+from .checkpoints import RUNS_DIR, stage_rerun
+
+# Defaults used when config.yml has no 'llm_cache' section
+DEFAULT_LLM_CACHE = {
+    "mode": "read_write",  # read_write | replay | off
+    "path": os.path.join(RUNS_DIR, "llm_cache.sqlite3"),
+    "ttl_hours": 72,
+    "max_size_mb": 200,
+}
+
+CACHE_MODES = ("read_write", "replay", "off")
+
+
+class SQLiteResponseCache(BaseCache):
+    """
+    LangChain cache backed by a single SQLite table.
+
+    Args:
+        path: SQLite file location
+        ttl_seconds: Entries older than this are treated as misses and purged
+        max_size_bytes: Least recently used entries are evicted above this total size
+        read_only: Replay mode - serve hits but never write new entries
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_size_bytes: int, read_only: bool = False):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_size_bytes = max_size_bytes
+        self.read_only = read_only
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.bypassed = 0
+        self._lock = threading.Lock()
+        self._last_key = threading.local()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " created_at REAL NOT NULL, accessed_at REAL NOT NULL, size INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        # llm_string carries the model name, temperature and bound kwargs (tool schemas);
+        # prompt is the serialized message list
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self._key(prompt, llm_string)
+        self._last_key.value = key
+        now = time.time()
+        if stage_rerun():
+            with self._lock:
+                self.bypassed += 1
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (now - row[1]) > self.ttl_seconds:
+                self.misses += 1
+                return None
+            if not self.read_only:
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            self.hits += 1
+        return [loads(value) for value in json.loads(row[0])]
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if self.read_only:
+            return
+        value = json.dumps([dumps(generation) for generation in return_val])
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at, size) VALUES (?, ?, ?, ?, ?)",
+                (self._key(prompt, llm_string), value, now, now, len(value)),
+            )
+            self.writes += 1
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then least recently used ones until under the size limit."""
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_size_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_size_bytes:
+                break
+
+    def forget_last_response(self) -> None:
+        """Drop the entry of this thread's most recent call (its output failed validation)."""
+        key = getattr(self._last_key, "value", None)
+        if key is None or self.read_only:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self, **kwargs) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "mode": "replay" if self.read_only else "read_write",
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "bypassed": self.bypassed,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+_cache: Optional[SQLiteResponseCache] = None
+
+
+def configure_llm_cache(config: Dict) -> Optional[SQLiteResponseCache]:
+    """
+    Open the response cache used by temperature-0 chat models (see response_cache).
+
+    Reads the 'llm_cache' section of config.yml; the LLM_CACHE_MODE environment
+    variable overrides the mode (e.g. LLM_CACHE_MODE=replay for a read-only re-run).
+
+    Returns:
+        The installed cache, or None when caching is off
+    """
+    settings = {**DEFAULT_LLM_CACHE, **(config.get("llm_cache") or {})}
+    mode = os.getenv("LLM_CACHE_MODE", settings["mode"])
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Unknown LLM cache mode '{mode}'. Choose one of: {', '.join(CACHE_MODES)}")
+    global _cache
+    if mode == "off":
+        _cache = None
+        return None
+
+    cache = SQLiteResponseCache(
+        path=settings["path"],
+        ttl_seconds=settings["ttl_hours"] * 60 * 60,
+        max_size_bytes=int(settings["max_size_mb"] * 1024 * 1024),
+        read_only=(mode == "replay"),
+    )
+    _cache = cache
+    print(f"🗄️ LLM response cache: {mode} ({settings['path']})")
+    return cache
+
+
+def response_cache(temperature: float):
+    """Cache for a chat model: the response cache at temperature 0, otherwise False (never cached)."""
+    if temperature == 0 and _cache is not None:
+        return _cache
+    return False
+
+
+def forget_last_response() -> None:
+    """Drop the cached response of this thread's most recent cached call, if any."""
+    if _cache is not None:
+        _cache.forget_last_response()
@@ -0,0 +1,332 @@
+# ai/src/llm_clients.py
+# Shared OpenAI HTTP layer for every chat model and embedding call.
+#
+# All ChatOpenAI instances (researcher, parser, writer, editor) and the embeddings
+# client in tools.py send requests through one pooled httpx client, so connections
+# are kept alive across stages. The transport coordinates:
+#   - a concurrency limit across threads and the async researcher
+#   - token buckets for requests/minute and (estimated) tokens/minute
+#   - retries on 429/5xx that honour Retry-After headers, and on connection errors and
+#     timeouts, with exponential backoff
+#   - timeouts capped at the time left in the run's current stage (see run_deadline.py)
+# and keeps counters that are written to the run report.
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+import weakref
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import httpx
+from langchain_openai import ChatOpenAI
+from openai import OpenAI
+
+from .run_deadline import call_timeout, stage_time_left
+from .llm_cache import response_cache
+
+# Defaults used when config.yml has no 'openai' section
+DEFAULT_OPENAI_LIMITS = {
+    "requests_per_minute": 450,
+    "tokens_per_minute": 180000,
+    "max_concurrency": 8,
+    "max_retries": 4,
+    "timeout_seconds": 120,
+}
+
+# Assumed completion size when a request doesn't set max_tokens
+DEFAULT_COMPLETION_TOKENS = 1000
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+MAX_BACKOFF_SECONDS = 60
+
+_limits = dict(DEFAULT_OPENAI_LIMITS)
+_metrics = {
+    "requests": 0,
+    "retries": 0,
+    "rate_limited": 0,
+    "server_errors": 0,
+    "transport_errors": 0,
+    "throttle_wait_seconds": 0.0,
+    "estimated_tokens": 0,
+}
+_metrics_lock = threading.Lock()
+
+
+def _count(name: str, amount: float = 1) -> None:
+    with _metrics_lock:
+        _metrics[name] += amount
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at rate_per_minute."""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self.tokens = rate_per_minute
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Take amount from the bucket and return how long the caller must wait before sending."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Requests larger than the whole bucket are allowed through once it is full
+            amount = min(amount, self.capacity)
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+_request_bucket = TokenBucket(_limits["requests_per_minute"])
+_token_bucket = TokenBucket(_limits["tokens_per_minute"])
+_concurrency = threading.BoundedSemaphore(_limits["max_concurrency"])
+
+
+def configure_openai_limits(config: Dict) -> None:
+    """Apply the 'openai' section of config.yml (call before creating any model)."""
+    global _request_bucket, _token_bucket, _concurrency
+    _limits.update(config.get("openai") or {})
+    _request_bucket = TokenBucket(_limits["requests_per_minute"])
+    _token_bucket = TokenBucket(_limits["tokens_per_minute"])
+    _concurrency = threading.BoundedSemaphore(_limits["max_concurrency"])
+
+
+def _estimate_tokens(request: httpx.Request) -> int:
+    """Rough token cost of a request: ~4 characters per prompt token plus the completion budget."""
+    try:
+        body = request.content
+    except httpx.RequestNotRead:
+        return DEFAULT_COMPLETION_TOKENS
+    prompt_tokens = len(body) // 4
+    if request.url.path.endswith("/embeddings"):
+        return prompt_tokens
+    try:
+        max_tokens = json.loads(body).get("max_tokens") or DEFAULT_COMPLETION_TOKENS
+    except (ValueError, AttributeError):
+        max_tokens = DEFAULT_COMPLETION_TOKENS
+    return prompt_tokens + max_tokens
+
+
+def _throttle_delay(request: httpx.Request) -> float:
+    """Reserve rate-limit capacity for a request and return the wait needed first."""
+    tokens = _estimate_tokens(request)
+    _count("estimated_tokens", tokens)
+    delay = max(_request_bucket.reserve(1), _token_bucket.reserve(tokens))
+    if delay:
+        _count("throttle_wait_seconds", delay)
+    return delay
+
+
+def _retry_delay(response: httpx.Response, attempt: int) -> float:
+    """Delay before retrying: the server's Retry-After if given, else exponential backoff with jitter."""
+    headers = response.headers
+    if "retry-after-ms" in headers:
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    if "retry-after" in headers:
+        value = headers["retry-after"]
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return _backoff(attempt)
+
+
+def _backoff(attempt: int) -> float:
+    """Exponential backoff with jitter."""
+    return min(MAX_BACKOFF_SECONDS, (2 ** attempt) + random.uniform(0, 1))
+
+
+def _fits_deadline(delay: float) -> bool:
+    # A retry that can't finish inside the stage's budget only makes the run later
+    time_left = stage_time_left()
+    return time_left is None or delay < time_left
+
+
+def _retry_after(response: httpx.Response, attempt: int) -> Optional[float]:
+    """Seconds to wait before retrying, or None if the response shouldn't be retried."""
+    if response.status_code not in RETRYABLE_STATUS or attempt >= _limits["max_retries"]:
+        return None
+    delay = _retry_delay(response, attempt)
+    if not _fits_deadline(delay):
+        return None
+    _count("rate_limited" if response.status_code == 429 else "server_errors")
+    _count("retries")
+    return delay
+
+
+def _retry_after_error(attempt: int) -> Optional[float]:
+    """Seconds to wait before retrying after a connection error or timeout, or None to give up."""
+    if attempt >= _limits["max_retries"]:
+        return None
+    delay = _backoff(attempt)
+    if not _fits_deadline(delay):
+        return None
+    _count("transport_errors")
+    _count("retries")
+    return delay
+
+
+def _apply_deadline(request: httpx.Request) -> None:
+    """Cap the request's timeouts at the time left in the current stage (see run_deadline.py)."""
+    timeouts = request.extensions.get("timeout")
+    if timeouts:
+        request.extensions["timeout"] = {
+            name: call_timeout(value if value is not None else _limits["timeout_seconds"])
+            for name, value in timeouts.items()
+        }
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """Sync transport: pooled connections + concurrency limit + rate limits + retries."""
+
+    def __init__(self, pool_limits: httpx.Limits):
+        self._transport = httpx.HTTPTransport(limits=pool_limits)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            time.sleep(_throttle_delay(request))
+            _apply_deadline(request)
+            with _concurrency:
+                _count("requests")
+                try:
+                    response = self._transport.handle_request(request)
+                except httpx.TransportError:
+                    # Connection errors, timeouts and dropped connections (the SDK's retries are off)
+                    delay = _retry_after_error(attempt)
+                    if delay is None:
+                        raise
+                else:
+                    delay = _retry_after(response, attempt)
+                    if delay is None:
+                        return response
+                    response.read()
+                    response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Async transport with the same limits, shared with the sync path.
+
+    Connection pools are bound to an event loop, so one inner transport is kept per loop
+    (each asyncio.run() in research.py gets its own pool; the limits stay global).
+    """
+
+    def __init__(self, pool_limits: httpx.Limits):
+        self._pool_limits = pool_limits
+        self._transports: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+    def _inner(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        if loop not in self._transports:
+            self._transports[loop] = httpx.AsyncHTTPTransport(limits=self._pool_limits)
+        return self._transports[loop]
+
+    async def _acquire(self) -> threading.BoundedSemaphore:
+        semaphore = _concurrency
+        while not semaphore.acquire(blocking=False):
+            await asyncio.sleep(0.05)
+        return semaphore
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            await asyncio.sleep(_throttle_delay(request))
+            _apply_deadline(request)
+            semaphore = await self._acquire()
+            try:
+                _count("requests")
+                try:
+                    response = await self._inner().handle_async_request(request)
+                except httpx.TransportError:
+                    delay = _retry_after_error(attempt)
+                    if delay is None:
+                        raise
+                else:
+                    delay = _retry_after(response, attempt)
+                    if delay is None:
+                        return response
+                    await response.aread()
+                    await response.aclose()
+            finally:
+                semaphore.release()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self) -> None:
+        for transport in list(self._transports.values()):
+            await transport.aclose()
+
+
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+_clients_lock = threading.Lock()
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=_limits["max_concurrency"] * 2,
+        max_keepalive_connections=_limits["max_concurrency"],
+        keepalive_expiry=120,
+    )
+
+
+def get_http_clients() -> tuple:
+    """Get or create the shared (sync, async) httpx clients for api.openai.com."""
+    global _http_client, _async_http_client
+    with _clients_lock:
+        if _http_client is None:
+            timeout = httpx.Timeout(_limits["timeout_seconds"], connect=10)
+            _http_client = httpx.Client(transport=RateLimitedTransport(_pool_limits()), timeout=timeout)
+            _async_http_client = httpx.AsyncClient(transport=AsyncRateLimitedTransport(_pool_limits()), timeout=timeout)
+    return _http_client, _async_http_client
+
+
+def chat_model(model: str, temperature: float, **kwargs) -> ChatOpenAI:
+    """
+    Create a ChatOpenAI model that uses the shared, rate-limited client.
+
+    Retries are handled by the transport (which honours Retry-After), so the SDK's own retries are disabled.
+    Only temperature-0 models use the LLM response cache (see llm_cache.py).
+    """
+    http_client, async_http_client = get_http_clients()
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        http_client=http_client,
+        http_async_client=async_http_client,
+        max_retries=0,
+        cache=response_cache(temperature),
+        **kwargs,
+    )
+
+
+def openai_client() -> OpenAI:
+    """Create a raw OpenAI client (embeddings) that uses the shared, rate-limited client."""
+    http_client, _ = get_http_clients()
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client, max_retries=0)
+
+
+def client_metrics() -> Dict:
+    """Snapshot of request, retry and throttling counters for the run report."""
+    with _metrics_lock:
+        snapshot = dict(_metrics)
+    snapshot["throttle_wait_seconds"] = round(snapshot["throttle_wait_seconds"], 2)
+    return snapshot
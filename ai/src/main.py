@@ -5,20 +5,72 @@ __import__('pysqlite3')
 import sys
 sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
 
+import argparse
 import yaml
 import json
 import os
-from datetime import datetime, timedelta
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from datetime import timedelta
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain.agents import create_openai_functions_agent, AgentExecutor
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from supabase import create_client
 
 # Import our custom tools
-from .tools import search_tool, scrape_tool, rss_tool, deduplicate_stories, filter_against_history
+from .tools import (
+    search_tool, scrape_tool, rss_tool, archive_search_tool, deduplicate_stories, filter_against_history,
+    get_feed_entries, embed_stories, configure_dedup, dedup_settings
+)
+from .archive import index_published_stories
+from .publish import publish_edition, PUBLIC_DIR
+from .llm_clients import chat_model, configure_openai_limits, client_metrics
+from .llm_cache import configure_llm_cache, forget_last_response
+from .http_client import configure_http, http_stats
+from .feed_parser import feed_parser_stats
+from .single_flight import cache_stats
+from .feed_selection import configure_feed_selection
+from .whats_hot import (
+    configure_whats_hot, whats_hot_enabled, extract_whats_hot, format_candidates_for_prompt, as_whats_hot_items,
+    record_fallback, whats_hot_stats
+)
+from .coverage import configure_coverage, coverage_stats, mark_published_stories
+from .relevance import configure_relevance, relevance_stats
+from .embeddings import configure_embeddings, embedding_stats
+from .history_index import configure_history_index, add_published_stories, get_history_index
+from .run_deadline import configure_deadline, out_of_time, deadline_stats
+from .replay import as_of, replaying, current_datetime, in_context
+from .editions import load_editions, write_editions, edition_name, latest_filename
+from .profiling import enable_profiling, finish_profiling, profile_tools
+from .checkpoints import RunCheckpoint, DAILY_STAGES
+from .research import build_researcher, run_researcher, load_research_budget
+from .weekly_pool import save_daily_pool
+from .validation import validate_newsletter, format_issues_for_prompt, DAILY_RULES
+
+# Recent history is cached so a long-running worker (see daemon.py) doesn't re-read Supabase for every edition
+HISTORY_CACHE_TTL_SECONDS = 15 * 60
+_history_cache: Dict[Tuple[int, Optional[float]], Tuple[float, dict]] = {}
+
+def get_recent_stories(days_back: int = 2, refresh: bool = False):
+    """
+    Fetch stories and editorial context from recent newsletters (cached for HISTORY_CACHE_TTL_SECONDS).
 
-def get_recent_stories(days_back: int = 2):
+    Args:
+        days_back: Number of days to look back for previous stories
+        refresh: Bypass the cache and re-read Supabase
+    """
+    # Backfill runs (see replay.py) each read the history up to their own pinned date
+    key = (days_back, as_of())
+    cached = _history_cache.get(key)
+    if cached and not refresh and (time.time() - cached[0]) < HISTORY_CACHE_TTL_SECONDS:
+        return cached[1]
+
+    recent_data = _fetch_recent_stories(days_back)
+    if recent_data.get('stories'):
+        _history_cache[key] = (time.time(), recent_data)
+    return recent_data
+
+def _fetch_recent_stories(days_back: int):
     """
     Fetch stories and editorial context from recent newsletters.
 
@@ -40,14 +92,16 @@ def get_recent_stories(days_back: int = 2):
         supabase = create_client(supabase_url, supabase_key)
 
         # Calculate date range
-        cutoff_date = (datetime.now() - timedelta(days=days_back)).strftime("%Y-%m-%d")
+        now = current_datetime()
+        cutoff_date = (now - timedelta(days=days_back)).strftime("%Y-%m-%d")
 
-        # Fetch recent newsletters
-        response = supabase.table("newsletters") \
+        # Fetch recent newsletters (before the pinned date when regenerating a past edition)
+        query = supabase.table("newsletters") \
             .select("content, publication_date") \
-            .gte("publication_date", cutoff_date) \
-            .order("publication_date", desc=True) \
-            .execute()
+            .gte("publication_date", cutoff_date)
+        if replaying():
+            query = query.lt("publication_date", now.strftime("%Y-%m-%d"))
+        response = query.order("publication_date", desc=True).execute()
 
         # Extract stories, perspectives, and themes from newsletters
         previous_stories = []
@@ -174,16 +228,117 @@ def format_narrative_context(recent_data):
 
     return "\n".join(sections)
 
-def main():
-    """The main function that runs the agent-based workflow."""
+CONFIG_PATH = 'ai/config.yml'
+
+def main(
+    resume_from: str | None = None,
+    profile: bool = False,
+    ready_by: str | None = None,
+    config_path: str = CONFIG_PATH,
+    output_dir: str = PUBLIC_DIR
+):
+    """
+    The main function that runs the agent-based workflow.
+
+    Args:
+        resume_from: Optional stage name; earlier stages are reloaded from today's checkpoints
+        profile: Profile each stage and tool call into the run directory (see profiling.py)
+        ready_by: Optional "HH:MM" the edition must be ready by (overrides deadline.ready_by)
+        config_path: Path to config.yml
+        output_dir: Directory the edition is published to
+    """
     load_dotenv()
 
     # 1. Load Configuration from the YAML file
-    with open('ai/config.yml', 'r') as file:
+    with open(config_path, 'r') as file:
         config = yaml.safe_load(file)
 
+    # Run deadline split into stage budgets: stages shrink their work instead of running late
+    configure_deadline(config, "daily", DAILY_STAGES if load_editions(config) else DAILY_STAGES[:-1], ready_by)
+
+    llm_cache = configure_pipeline(config)
+    return run_daily(config, llm_cache, config_path, resume_from=resume_from, profile=profile, output_dir=output_dir)
+
+def configure_pipeline(config: Dict):
+    """
+    Apply config.yml to the shared clients, caches and filters (once per process).
+
+    Returns:
+        The LLM response cache, or None when it is disabled
+    """
+    # All chat models and embeddings share one pooled, rate-limited OpenAI client
+    configure_openai_limits(config)
+
+    # One pooled HTTP client (timeouts, compression, body cap) for feeds, pages and search
+    configure_http(config)
+
+    # Per-feed windows and caps for rss_tool, adapted from each feed's publish rate
+    configure_feed_selection(config)
+
+    # Local relevance model that drops off-topic feed entries before the researcher sees them
+    configure_relevance(config)
+
+    # Embedding backend for dedup and clustering, with a local n-gram fallback
+    configure_embeddings(config)
+
+    # Nearest-neighbour index of published stories, for long-window dedup
+    configure_history_index(config)
+
+    # Exact URL set + Bloom filter of published articles, checked inside rss_tool
+    configure_coverage(config)
+
+    # Dedup thresholds (tuned offline with python -m ai.src.dedup_tuning)
+    configure_dedup(config)
+
+    # Regex What's Hot extraction from feed entries (the researcher only verifies the candidates)
+    configure_whats_hot(config)
+
+    # Serve repeated LLM calls (re-runs, resumes) from the on-disk response cache
+    return configure_llm_cache(config)
+
+
+def run_daily(
+    config: Dict,
+    llm_cache,
+    config_path: str = CONFIG_PATH,
+    resume_from: str | None = None,
+    profile: bool = False,
+    output_dir: str = PUBLIC_DIR
+):
+    """
+    Generate and publish one daily edition (configure_pipeline must have run).
+
+    Inside replay.pinned_time() (see backfill.py) the edition is regenerated as of that
+    time: feeds are replayed from the archive, live search and scraping are left out,
+    checkpoints go under ai/runs/backfill, and the story history, coverage filter and
+    weekly pool are left untouched.
+
+    Args:
+        config: Parsed config.yml
+        llm_cache: Return value of configure_pipeline
+        config_path: Path config was read from (hashed into the checkpoint directory)
+        resume_from: Optional stage name; earlier stages are reloaded from the run's checkpoints
+        profile: Profile each stage and tool call into the run directory (see profiling.py)
+        output_dir: Directory the edition is published to
+
+    Returns:
+        The published manifest entry, or None if the edition couldn't be published
+    """
+    replay = replaying()
+    run_date = current_datetime()
+
+    # Extra editions (regional/segment variants) written from this run's research
+    editions = load_editions(config)
+
+    # Every stage is checkpointed so a late failure can resume with --resume-from <stage>
+    checkpoint = RunCheckpoint(
+        "backfill" if replay else "daily", DAILY_STAGES, config_path, resume_from=resume_from, run_date=run_date
+    )
+    if profile:
+        enable_profiling(checkpoint.run_dir)
+
     # Get current date for context
-    current_date = datetime.now().strftime("%B %d, %Y")  # e.g., "December 30, 2025"
+    current_date = run_date.strftime("%B %d, %Y")  # e.g., "December 30, 2025"
 
     # Get recent stories and editorial context (for deduplication and narrative continuity)
     recent_data = get_recent_stories(days_back=3)  # Extended to 3 days for better narrative context
@@ -199,8 +354,12 @@ def main():
     
     # 2. Initialize the Language Model and the tools list
     # Using gpt-4o for latest knowledge (Oct 2023) and better reasoning
-    llm = ChatOpenAI(model="gpt-4o", temperature=0.3)
-    tools = [search_tool, scrape_tool, rss_tool]
+    llm = chat_model("gpt-4o", temperature=0.3)
+    # Past editions are regenerated from recorded feeds and the archive only: live search and
+    # pages would leak what happened after the pinned date
+    tools = profile_tools(
+        [rss_tool, archive_search_tool] if replay else [search_tool, scrape_tool, rss_tool, archive_search_tool]
+    )
 
     # 3. Create the Researcher Agent using a LangChain prompt template
     researcher_prompt_template = ChatPromptTemplate.from_messages([
@@ -249,8 +408,12 @@ RESEARCH FRAMEWORK:
 
 1. **Source Gathering** (Breadth):
    - Use rss_tool for all RSS feeds, prioritizing content from last 24-48 hours
+   - Call rss_tool for several feeds in the same step (parallel tool calls) instead of one feed per step
+   - If a tool replies that the research budget is used up, stop gathering and move on to analysis
    - If a feed fails, note it and continue with other sources
    - Aim to gather 20-30 candidate stories across all sources
+   - For pattern recognition, use archive_search_tool to see what we and our sources said about a company
+     or topic in recent weeks; only fall back to search_tool for things the archive doesn't cover
 
 2. **Story Evaluation** (Strategic Scoring):
 
@@ -318,7 +481,10 @@ RESEARCH FRAMEWORK:
 
 5. **"What's Hot" Discovery** (Funding, M&A, Product Launches):
 
-   WHILE researching the RSS feeds, also identify notable:
+   If the request below lists WHAT'S HOT CANDIDATES, they were extracted automatically from the feed
+   entries: verify each against its source, correct the company, country, type or description where
+   needed, drop anything irrelevant, and add only notable items the list missed. Otherwise,
+   WHILE researching the RSS feeds, identify notable:
    - **FUNDRAISING**: Series A/B/C/D rounds, growth equity, seed rounds ($10M+ or notable investors)
    - **PRODUCT LAUNCHES**: Major new products/features from payments companies
    - **M&A**: Acquisitions, mergers, significant strategic partnerships
@@ -346,6 +512,8 @@ RESEARCH FRAMEWORK:
 
    Source: [Publication name] - [URL]
 
+   SCORE: [Total 0-30 from the scoring framework]
+
    WHAT HAPPENED:
    [2-3 sentences with facts and data]
 
@@ -384,8 +552,10 @@ Your final answer must include BOTH Part 1 (10 stories) and Part 2 (What's Hot i
         MessagesPlaceholder(variable_name="agent_scratchpad"),
     ])
     
-    researcher_agent = create_openai_functions_agent(llm, tools, researcher_prompt_template)
-    researcher_executor = AgentExecutor(agent=researcher_agent, tools=tools, verbose=True)
+    # Tool-calling agent: several rss/scrape calls per turn, run concurrently under step/time/candidate budgets
+    researcher_executor, candidate_budget = build_researcher(
+        llm, tools, researcher_prompt_template, load_research_budget(config)
+    )
 
     # 4. Create the Writer Agent
     writer_prompt_template = ChatPromptTemplate.from_messages([
@@ -655,12 +825,12 @@ CRITICAL RULES:
     # MODIFIED: Create a simple 'chain' for the writer, as it doesn't need tools.
     # This avoids the "empty functions" error.
     # Using latest gpt-4o-mini for improved reasoning and structured output
-    writer_llm = ChatOpenAI(model="gpt-4o-mini-2024-07-18", temperature=0.1)
+    writer_llm = chat_model("gpt-4o-mini-2024-07-18", temperature=0.1)
     writer_chain = writer_prompt_template | writer_llm
 
     # 4.5. Create the Parser chain to structure Researcher output for deduplication
     # This parser now extracts BOTH news stories AND What's Hot items from the unified researcher output
-    parser_llm = ChatOpenAI(model="gpt-4o-mini-2024-07-18", temperature=0)
+    parser_llm = chat_model("gpt-4o-mini-2024-07-18", temperature=0)
     parser_prompt_template = ChatPromptTemplate.from_messages([
         ("system", """You are a data extraction assistant. Your job is to parse the Researcher's free-text output into structured JSON.
 
@@ -678,6 +848,7 @@ For each STORY, extract:
 - "contrarian_take": The CONTRARIAN TAKE section
 - "pattern": The PATTERN section
 - "second_order_effects": The SECOND-ORDER EFFECTS section
+- "score": The SCORE as an integer (0 if missing)
 
 For each WHATS_HOT item, extract:
 - "flag": Convert the country to emoji flag (US=🇺🇸, UK=🇬🇧, Germany=🇩🇪, France=🇫🇷, Netherlands=🇳🇱, Sweden=🇸🇪, Ireland=🇮🇪, Singapore=🇸🇬, Brazil=🇧🇷, Argentina=🇦🇷, Mexico=🇲🇽, India=🇮🇳, Australia=🇦🇺, Canada=🇨🇦, Japan=🇯🇵, China=🇨🇳, Hong Kong=🇭🇰, Israel=🇮🇱, UAE=🇦🇪, Czech Republic=🇨🇿, Estonia=🇪🇪, Lithuania=🇱🇹, Nigeria=🇳🇬, Kenya=🇰🇪, South Africa=🇿🇦, Indonesia=🇮🇩, South Korea=🇰🇷, Spain=🇪🇸, Italy=🇮🇹, Switzerland=🇨🇭)
@@ -696,7 +867,8 @@ OUTPUT FORMAT (must be valid JSON):
       "source_url": "https://example.com/article",
       "contrarian_take": "The contrarian angle",
       "pattern": "Related trend or signal",
-      "second_order_effects": "What to watch for next"
+      "second_order_effects": "What to watch for next",
+      "score": 24
     }}
   ],
   "whats_hot": [
@@ -721,7 +893,7 @@ CRITICAL:
     parser_chain = parser_prompt_template | parser_llm
 
     # 5. Create the Editor Agent for quality control
-    editor_llm = ChatOpenAI(model="gpt-4o-mini-2024-07-18", temperature=0)
+    editor_llm = chat_model("gpt-4o-mini-2024-07-18", temperature=0)
 
     editor_prompt_template = ChatPromptTemplate.from_messages([
         ("system", f"""You are a senior editor for /thepaymentsnerd newsletter, responsible for quality control.
@@ -734,6 +906,9 @@ IMPORTANT CONTEXT:
 
 Your role: Validate the newsletter meets editorial standards before publication.
 
+The draft has already passed automated checks for JSON structure, story count, sentence/length limits,
+required fields and source URLs. Do NOT re-check those - focus on the judgement calls rules can't make.
+
 QUALITY CHECKS:
 
 1. **Factual Accuracy**:
@@ -758,22 +933,17 @@ QUALITY CHECKS:
    - Are the 5 stories covering sufficiently different topics?
    - Flag if multiple stories cover the same company or announcement
 
-5. **Completeness**:
-   - Are all required fields present (news, perspective, curiosity)?
-   - Is the JSON valid and properly formatted?
-   - Is the "perspective" field providing synthesis?
-
-6. **Brand Voice**:
+5. **Brand Voice**:
    - Does it sound authoritative but accessible?
    - Is there a clear point of view?
    - Any contrarian or forward-looking angles?
 
-7. **Story Coherence** (Critical):
+6. **Story Coherence** (Critical):
    - Does each story relate to the newsletter's main themes (payments, fintech, banking)?
    - Flag any story that feels disconnected from the others
    - If a story doesn't fit (e.g., general tech news unrelated to payments), recommend replacing it
 
-8. **Perspective Quality** (Critical):
+7. **Perspective Quality** (Critical):
    - Does the "perspective" field provide a THEMATIC INSIGHT rather than a story summary?
    - Is it reframing the news through a conceptual lens, not just listing what happened?
    - Does it identify a unifying thread, tension, or pattern across stories?
@@ -782,7 +952,7 @@ QUALITY CHECKS:
    - RIGHT: "Everything is an acquiring play now. Whether it's Apple or Stripe, the real prize isn't transactions—it's owning the merchant relationship." (thematic lens)
    - RIGHT: "The obvious read is margin pressure. But actually, this is about which payment flows they'll defend at all costs." (reframe technique)
 
-9. **Curiosity Fact Validity**:
+8. **Curiosity Fact Validity**:
     - Is the curiosity fact INDEPENDENT from today's news stories? (It should NOT be a restatement of a news story)
     - Is it a CURRENT or HISTORICAL fact (not a future projection)?
     - Flag predictions like "by 2030..." or "projected to..." or "experts predict..."
@@ -790,14 +960,14 @@ QUALITY CHECKS:
     - Topics can include: payment history, global statistics, how payment rails work, fintech origin stories, crypto milestones, etc.
     - If using relative dates like "last year", ensure the actual year is specified (e.g., "in 2025" not just "last year")
 
-10. **Narrative Continuity** (Critical):
+9. **Narrative Continuity** (Critical):
     - Does the perspective avoid repetitive framing from previous days?
     - Flag generic phrases like "signals a shift" or "marks a pivot" without specifics
     - If recurring themes (stablecoins, regulation, etc.) appear multiple days, does the content BUILD on previous coverage?
     - WRONG: "Stablecoins are reshaping the payments landscape" (could be written any day)
     - RIGHT: "Today's Stripe announcement is the third stablecoin partnership this week, confirming enterprise adoption is accelerating"
 
-11. **Specificity Check** (Critical):
+10. **Specificity Check** (Critical):
     - Every claim of "shift", "pivot", or "transformation" must specify:
       * WHAT exactly is shifting (not just "the payments landscape")
       * WHO is affected (winners/losers)
@@ -822,92 +992,188 @@ Be thorough but fair. Minor issues are acceptable if overall quality is high."""
     editor_chain = editor_prompt_template | editor_llm
 
     # 6. Run the agents in a chain
-    print("--- Starting Researcher Agent ---")
-    # The unified researcher now finds BOTH main stories AND What's Hot items in a single pass
-    research_result = researcher_executor.invoke({"input": "Please research the latest news from my list of sources."})
+    def research_stage():
+        request = "Please research the latest news from my list of sources."
+        if replay:
+            request += (f" This edition is being regenerated for {current_date}: search_tool and scrape_tool are"
+                        " unavailable, so work from rss_tool and archive_search_tool only.")
+        candidates = []
+        if whats_hot_enabled():
+            # Read every feed up front (the agent's rss_tool calls are then served from the cache)
+            # so What's Hot candidates come from regexes over all entries, not from the LLM
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(in_context(rss_tool.invoke), [source['url'] for source in config['newsletters']]))
+            candidates = extract_whats_hot(get_feed_entries())
+            print(f"🔥 Extracted {len(candidates)} What's Hot candidates from {len(get_feed_entries())} feed entries")
+            if candidates:
+                request += "\n\n" + format_candidates_for_prompt(candidates)
+
+        print("--- Starting Researcher Agent ---")
+        # The unified researcher now finds BOTH main stories AND What's Hot items in a single pass
+        result = run_researcher(
+            researcher_executor, candidate_budget, llm, researcher_prompt_template, {"input": request}
+        )
+        return {"output": result['output'], "whats_hot_candidates": candidates}
+
+    research_result = checkpoint.run_stage("research", research_stage)
 
     # 6.5. Parse Researcher output into structured JSON for deduplication
     # Parser now extracts both stories and whats_hot from the unified output
-    print("\n--- Parsing Researcher Output (Stories + What's Hot) ---")
-    parser_result = parser_chain.invoke({"input": research_result['output']})
-
-    parsed_stories = None
-    whats_hot_items = []
-    try:
-        parsed_text = parser_result.content.strip().replace("```json", "").replace("```", "").strip()
-        parsed_data = json.loads(parsed_text)
-        # Extract stories and whats_hot from unified parser output
-        parsed_stories = parsed_data.get('stories', [])
-        whats_hot_items = parsed_data.get('whats_hot', [])
-        print(f"✅ Parsed {len(parsed_stories)} stories and {len(whats_hot_items)} What's Hot items from Researcher output")
-    except (json.JSONDecodeError, AttributeError) as e:
-        print(f"⚠️ Failed to parse Researcher output: {e}")
-        print("Falling back to raw Researcher output for Writer")
-        parsed_stories = None
-        whats_hot_items = []
+    def parse_stage():
+        if out_of_time():
+            print("\n⏱️ Out of time, skipping the parser and passing the raw Researcher output to the Writer")
+            return {"stories": None, "whats_hot": []}
+        print("\n--- Parsing Researcher Output (Stories + What's Hot) ---")
+        parser_result = parser_chain.invoke({"input": research_result['output']})
+        try:
+            parsed_text = parser_result.content.strip().replace("```json", "").replace("```", "").strip()
+            parsed_data = json.loads(parsed_text)
+            # Extract stories and whats_hot from unified parser output
+            stories = parsed_data.get('stories', [])
+            whats_hot = parsed_data.get('whats_hot', [])
+            print(f"✅ Parsed {len(stories)} stories and {len(whats_hot)} What's Hot items from Researcher output")
+            return {"stories": stories, "whats_hot": whats_hot}
+        except (json.JSONDecodeError, AttributeError) as e:
+            print(f"⚠️ Failed to parse Researcher output: {e}")
+            forget_last_response()
+            print("Falling back to raw Researcher output for Writer")
+            return {"stories": None, "whats_hot": []}
+
+    parsed = checkpoint.run_stage("parse", parse_stage)
+    parsed_stories = parsed['stories']
+    whats_hot_items = parsed['whats_hot']
+
+    # The extracted candidates stand in when the researcher reported no What's Hot items
+    if not whats_hot_items and research_result.get('whats_hot_candidates'):
+        whats_hot_items = as_whats_hot_items(research_result['whats_hot_candidates'])
+        record_fallback()
+        print(f"ℹ️ Using {len(whats_hot_items)} extracted What's Hot candidates")
 
     # 6.6. Deduplicate against recent stories (BEFORE Writer sees them)
     # Uses hybrid detection: entity extraction + word similarity + semantic embeddings
-    if parsed_stories and recent_stories:
-        print(f"\n🔍 Deduplication: Checking {len(parsed_stories)} stories against {len(recent_stories)} recent stories...")
-        print("   Using hybrid detection (entities + words + embeddings)")
-
-        # Filter out stories that are too similar to recent coverage
-        # Hybrid mode catches stories about same event even with different wording
-        filtered_stories, removed_stories = filter_against_history(
-            new_stories=parsed_stories,
-            historical_stories=recent_stories,
-            use_hybrid=True,
-            use_embeddings=True,
-            verbose=True
-        )
-
-        if removed_stories:
-            print(f"\n⚠️ Removed {len(removed_stories)} duplicate stories:")
-            for item in removed_stories:
-                print(f"   - {item['story'].get('title', 'Untitled')[:60]}...")
-                print(f"     Reason: {item['reason']}")
-
-        # Handle edge case: all stories were duplicates
-        if not filtered_stories:
-            print("⚠️ All stories were duplicates! Falling back to raw Researcher output")
-            writer_input = research_result['output']
-        else:
+    def dedup_stage():
+        indexed_count = get_history_index().count()
+        if parsed_stories and (recent_stories or indexed_count):
+            if indexed_count:
+                print(f"\n🔍 Deduplication: Checking {len(parsed_stories)} stories against the nearest of "
+                      f"{indexed_count} indexed stories...")
+            else:
+                print(f"\n🔍 Deduplication: History index is empty, checking {len(parsed_stories)} stories against "
+                      f"{len(recent_stories)} recent stories...")
+            print("   Using hybrid detection (entities + words + embeddings)")
+
+            # Filter out stories that are too similar to recent coverage
+            # Hybrid mode catches stories about same event even with different wording
+            filtered_stories, removed_stories = filter_against_history(
+                new_stories=parsed_stories,
+                historical_stories=recent_stories,
+                use_hybrid=True,
+                use_embeddings=True,
+                verbose=True,
+                use_history_index=True
+            )
+
+            if removed_stories:
+                print(f"\n⚠️ Removed {len(removed_stories)} duplicate stories:")
+                for item in removed_stories:
+                    print(f"   - {item['story'].get('title', 'Untitled')[:60]}...")
+                    print(f"     Reason: {item['reason']}")
+
+            # Handle edge case: all stories were duplicates
+            if not filtered_stories:
+                print("⚠️ All stories were duplicates! Falling back to raw Researcher output")
+                return {"writer_input": research_result['output'], "removed": removed_stories}
             print(f"✅ {len(filtered_stories)} unique stories passed to Writer")
-            writer_input = json.dumps(filtered_stories, indent=2)
-    elif parsed_stories:
-        print("ℹ️ No recent stories to deduplicate against")
-        writer_input = json.dumps(parsed_stories, indent=2)
-    else:
+            return {"writer_input": json.dumps(filtered_stories, indent=2), "removed": removed_stories}
+        elif parsed_stories:
+            print("ℹ️ No recent stories to deduplicate against")
+            return {"writer_input": json.dumps(parsed_stories, indent=2), "removed": []}
         # Fallback to raw output if parsing failed
-        writer_input = research_result['output']
-
-    print("\n--- Starting Writer Agent ---")
-    final_result_chain = writer_chain.invoke({"input": writer_input})
-
-    # 7. Run the Editor Agent for quality control
-    print("\n--- Starting Editor Review ---")
-    editor_result = editor_chain.invoke({"input": final_result_chain.content})
-    print(f"Editor verdict: {editor_result.content}")
+        return {"writer_input": research_result['output'], "removed": []}
+
+    writer_input = checkpoint.run_stage("dedup", dedup_stage)['writer_input']
+
+    def write_stage():
+        print("\n--- Starting Writer Agent ---")
+        draft = writer_chain.invoke({"input": writer_input}).content
+
+        # 6.8. Rule-based validation (BEFORE the Editor sees the draft)
+        # Structural problems are caught locally and sent back to the Writer once,
+        # so the Editor never spends a call reviewing a draft that can't be published
+        parsed_draft, issues = validate_newsletter(draft, DAILY_RULES)
+        if issues and out_of_time() and parsed_draft is not None:
+            print(f"\n⏱️ Out of time, keeping the draft despite {len(issues)} validation issues")
+        elif issues:
+            print(f"\n⚠️ Draft failed {len(issues)} validation checks, asking Writer to fix them:")
+            print(format_issues_for_prompt(issues))
+            retry_input = (
+                f"{writer_input}\n\nYOUR PREVIOUS DRAFT FAILED VALIDATION:\n{draft}\n\n"
+                f"Fix these issues and return the corrected JSON:\n{format_issues_for_prompt(issues)}"
+            )
+            draft = writer_chain.invoke({"input": retry_input}).content
+
+        # An unparseable draft can't be published: fail the stage so only the Writer is retried
+        if validate_newsletter(draft, DAILY_RULES)[0] is None:
+            raise ValueError("Writer output is not valid JSON")
+        return {"draft": draft}
+
+    draft = checkpoint.run_stage("write", write_stage)['draft']
+    output_json, validation_issues = validate_newsletter(draft, DAILY_RULES)
+
+    # 7. Run the Editor Agent for quality control (semantic checks only)
+    def edit_stage():
+        if validation_issues:
+            print("\n⚠️ Draft still fails validation, skipping Editor review:")
+            print(format_issues_for_prompt(validation_issues))
+            return {"verdict": None}
+
+        print("\n✅ Draft passed validation")
+        if out_of_time():
+            print("\n⏱️ Out of time, skipping Editor review")
+            return {"verdict": None}
+        print("\n--- Starting Editor Review ---")
+        editor_result = editor_chain.invoke({"input": draft})
+        print(f"Editor verdict: {editor_result.content}")
+        return {"verdict": editor_result.content}
+
+    editor_verdict = checkpoint.run_stage("edit", edit_stage)['verdict']
+
+    # 7.5. Extra editions: the same deduplicated stories, selected and written per audience
+    def editions_stage():
+        try:
+            stories = json.loads(writer_input)
+        except ValueError:
+            stories = None
+        if not isinstance(stories, list):
+            print("\nℹ️ No structured stories (parser fallback), skipping extra editions")
+            return {"editions": []}
+        print(f"\n--- Writing {len(editions)} extra editions ---")
+        return {"editions": write_editions(editions, stories, whats_hot_items, writer_chain, editor_chain)}
+
+    extra_editions = checkpoint.run_stage("editions", editions_stage)['editions'] if editions else []
 
     # If editor suggests revisions, we'll still proceed but log the feedback
-    if "NEEDS_REVISION" in editor_result.content:
+    if editor_verdict and "NEEDS_REVISION" in editor_verdict:
         print("\n⚠️ Editor flagged issues but proceeding with publication:")
-        print(editor_result.content)
+        print(editor_verdict)
+
+    # A backfill's counters are shared by all its dates, so they're reported once in backfill.json
+    if not replay:
+        write_run_stats(checkpoint, llm_cache)
 
     # 8. Save the final output to a file
+    published = None
     try:
-        # MODIFIED: The output from a simple chain is in the 'content' attribute.
-        # We also clean up potential markdown formatting from the AI's response.
-        output_text = final_result_chain.content.strip().replace("```json", "").replace("```", "").strip()
-        output_json = json.loads(output_text)
+        # The validator already parsed the Writer output (with markdown fences stripped)
+        if output_json is None:
+            raise ValueError(validation_issues[0])
 
         # Safety net: Within-day deduplication only
         # Historical dedup is now handled BEFORE the Writer (see step 6.6)
         # This catches only nearly identical copies that might slip through
         if 'news' in output_json and isinstance(output_json['news'], list):
             original_count = len(output_json['news'])
-            output_json['news'] = deduplicate_stories(output_json['news'], similarity_threshold=0.9)
+            output_json['news'] = deduplicate_stories(output_json['news'], similarity_threshold=dedup_settings()['safety_net_threshold'])
             final_count = len(output_json['news'])
 
             if original_count != final_count:
@@ -921,20 +1187,132 @@ Be thorough but fair. Minor issues are acceptable if overall quality is high."""
             output_json['whats_hot'] = []
             print("ℹ️ No items for What's Hot section")
 
-        output_path = "web/public/newsletter.json"
-        with open(output_path, 'w') as f:
-            json.dump(output_json, f, indent=2)
-
-        print(f"\n--- Newsletter successfully saved to {output_path} ---")
-        print("Final JSON output:")
-        print(json.dumps(output_json, indent=2))
+        published = publish_edition(output_json, edition="daily", run_date=run_date, public_dir=output_dir)
+        checkpoint.write_report("publish", published)
+
+        # Published stories become searchable history for archive_search_tool and dedup
+        # (a regenerated past edition is only for comparison, so it leaves history alone)
+        if not replay:
+            index_published_stories(output_json.get('news', []))
+            add_published_stories(output_json.get('news', []))
+            mark_published_stories(output_json.get('news', []), get_feed_entries())
+
+        print(f"\n--- Newsletter successfully saved to {output_dir}/newsletter.json ---")
+        print("Stories: " + "; ".join(published['titles']))
+
+        # Persist today's candidate pool so the weekly recap can reuse this research
+        if parsed_stories and not replay:
+            save_daily_pool(
+                run_date=run_date,
+                stories=parsed_stories,
+                whats_hot=whats_hot_items,
+                feed_entries=get_feed_entries(),
+                published_urls=[s.get('source', {}).get('url', '') for s in output_json.get('news', [])],
+                embeddings=embed_stories(parsed_stories)
+            )
         
-    except (json.JSONDecodeError, AttributeError, KeyError) as e:
+    except (ValueError, AttributeError, KeyError) as e:
         print(f"\n--- FAILED to parse or save the final JSON. ---")
         print(f"Error: {e}")
         print("Raw AI Output:")
         # Print the raw content for debugging
-        print(final_result_chain.content if hasattr(final_result_chain, 'content') else final_result_chain)
+        print(draft)
+        print(f"\nResearch, parsed and deduplicated stories are checkpointed in {checkpoint.run_dir}")
+        print("Re-run with --resume-from write to regenerate only the draft")
+
+    # Extra editions are published on their own, so one failing doesn't hold back the others
+    edition_report = []
+    for result in extra_editions:
+        entry = {"name": result["name"], "issues": result["issues"], "verdict": result["verdict"]}
+        if result["output"] is not None:
+            try:
+                extra = publish_edition(
+                    result["output"], edition=edition_name(result["name"]), run_date=run_date,
+                    public_dir=output_dir, latest_filename=latest_filename(result["name"])
+                )
+                entry["file"] = extra["file"]
+            except OSError as e:
+                print(f"⚠️ Could not publish edition '{result['name']}': {e}")
+                entry["issues"] = entry["issues"] + [f"publish failed: {e}"]
+        edition_report.append(entry)
+    if edition_report:
+        checkpoint.write_report("editions", edition_report)
+
+    return published
+
+def write_run_stats(checkpoint: RunCheckpoint, llm_cache) -> None:
+    """Print and save the run's client, cache and filter statistics to its run directory."""
+    if llm_cache:
+        llm_stats = llm_cache.stats()
+        print(f"\n🗄️ LLM cache: {llm_stats['hits']} hits, {llm_stats['misses']} misses ({llm_stats['hit_rate']:.0%} hit rate)")
+        checkpoint.write_report("llm_cache", llm_stats)
+
+    openai_stats = client_metrics()
+    print(f"📡 OpenAI client: {openai_stats['requests']} requests, {openai_stats['retries']} retries, "
+          f"{openai_stats['throttle_wait_seconds']}s throttled")
+    checkpoint.write_report("openai_client", openai_stats)
+
+    fetched = http_stats()
+    if fetched["requests"]:
+        print(f"🌐 HTTP: {fetched['requests']} requests, {fetched['errors']} failed "
+              f"({fetched['timeouts']} timeouts), {fetched['bytes'] / 1e6:.1f} MB")
+        checkpoint.write_report("http", fetched)
+
+    parsed = feed_parser_stats()
+    if parsed["fast"] or parsed["fallback"]:
+        checkpoint.write_report("feed_parser", parsed)
+
+    caches = cache_stats()
+    coalesced = sum(c["coalesced"] for c in caches.values())
+    if coalesced:
+        print(f"🔗 Caches: {coalesced} concurrent duplicate requests shared an in-flight fetch")
+    checkpoint.write_report("caches", caches)
+
+    covered = coverage_stats()
+    if covered["dropped"]:
+        print(f"🚫 Coverage filter: dropped {covered['dropped']} already-published entries of {covered['checked']}")
+    checkpoint.write_report("coverage", covered)
+
+    filtered = relevance_stats()
+    if filtered["scored"]:
+        print(f"🧮 Relevance filter: dropped {filtered['dropped']} of {filtered['scored']} feed entries")
+        checkpoint.write_report("relevance", filtered)
+
+    hot_report = whats_hot_stats()
+    if hot_report["entries_scanned"]:
+        checkpoint.write_report("whats_hot", hot_report)
+
+    embedding_report = embedding_stats()
+    if embedding_report["fallbacks"]:
+        print(f"⚠️ Embeddings: {embedding_report['fallbacks']} comparisons used the local fallback backend")
+    checkpoint.write_report("embeddings", embedding_report)
+
+    timing = deadline_stats()
+    if timing:
+        if timing["overran"]:
+            print(f"⏱️ Stages over budget: {', '.join(timing['overran'])}")
+        checkpoint.write_report("deadline", timing)
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate the daily newsletter.")
+    parser.add_argument(
+        "--resume-from",
+        choices=DAILY_STAGES,
+        help="Reload earlier stages from today's checkpoints and re-run from this stage"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Save per-stage cProfile, tracemalloc and stack samples to the run directory"
+    )
+    parser.add_argument(
+        "--ready-by",
+        metavar="HH:MM",
+        help="Time the edition must be ready by (overrides deadline.ready_by in config.yml)"
+    )
+    args = parser.parse_args()
+    try:
+        main(resume_from=args.resume_from, profile=args.profile, ready_by=args.ready_by)
+    finally:
+        finish_profiling()
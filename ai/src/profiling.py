@@ -0,0 +1,253 @@
+# ai/src/profiling.py
+# Opt-in CPU and memory profiling for pipeline stages and tool calls (--profile).
+#
+# With profiling on, every checkpointed stage runs under cProfile and tracemalloc while a
+# sampling thread records the stacks of all threads. Results land in <run dir>/profile/:
+#   <stage>.pstats      cProfile stats (open with `python -m pstats` or snakeviz)
+#   <stage>.collapsed   sampled stacks in collapsed format (flamegraph.pl, speedscope)
+#   tool-<name>.pstats  cProfile stats accumulated per tool, when the interpreter allows it
+#   summary.json        wall/CPU time, peak traced memory, peak RSS, top allocation sites
+#
+# With profiling off, profile_stage() returns a no-op context and profile_tools() returns
+# the tools unchanged, so normal runs pay nothing.
+
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+
+from langchain_core.tools import BaseTool, StructuredTool
+
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.005
+
+# Frames kept per allocation traceback and allocation sites listed per stage
+TRACEMALLOC_FRAMES = 10
+TOP_ALLOCATIONS = 15
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far (None where unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}"
+
+
+class StackSampler:
+    """Background thread that samples every thread's stack into collapsed-stack counts."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.counts[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.counts
+
+
+def _start_cprofile() -> Optional[cProfile.Profile]:
+    """Start a cProfile profiler, or return None if another one is already active (Python 3.12+)."""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return None
+    return profiler
+
+
+class RunProfiler:
+    """Collects per-stage and per-tool profiles for one pipeline run."""
+
+    def __init__(self, out_dir: str):
+        self.out_dir = out_dir
+        self.stages: Dict[str, Dict] = {}
+        self.tools: Dict[str, Dict] = {}
+        self._tool_stats: Dict[str, pstats.Stats] = {}
+        self._lock = threading.Lock()
+        os.makedirs(out_dir, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """Profile one pipeline stage (CPU, stack samples and allocations)."""
+        snapshot_before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        sampler = StackSampler()
+        sampler.start()
+        profiler = _start_cprofile()
+        started, cpu_started = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            wall, cpu = time.perf_counter() - started, time.process_time() - cpu_started
+            samples = sampler.stop()
+            _, peak_traced = tracemalloc.get_traced_memory()
+            self._save_stage(name, profiler, samples, snapshot_before, wall, cpu, peak_traced)
+
+    def _save_stage(self, name, profiler, samples, snapshot_before, wall, cpu, peak_traced) -> None:
+        pstats_path = None
+        if profiler is not None:
+            pstats_path = os.path.join(self.out_dir, f"{name}.pstats")
+            profiler.dump_stats(pstats_path)
+
+        collapsed_path = os.path.join(self.out_dir, f"{name}.collapsed")
+        with open(collapsed_path, 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+        # Allocation sites that grew the most during the stage
+        growth = tracemalloc.take_snapshot().compare_to(snapshot_before, "lineno")
+        top_allocations = [
+            {
+                "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_kb": round(stat.size_diff / 1024, 1),
+                "count": stat.count_diff,
+            }
+            for stat in growth[:TOP_ALLOCATIONS]
+        ]
+
+        self.stages[name] = {
+            "wall_seconds": round(wall, 2),
+            "cpu_seconds": round(cpu, 2),
+            "peak_traced_mb": round(peak_traced / (1024 * 1024), 1),
+            "peak_rss_mb": _peak_rss_mb(),
+            "samples": sum(samples.values()),
+            "pstats": pstats_path,
+            "collapsed": collapsed_path,
+            "top_allocations": top_allocations,
+        }
+        print(f"⏱️ Profile '{name}': {wall:.1f}s wall, {cpu:.1f}s CPU, "
+              f"peak {self.stages[name]['peak_traced_mb']} MB traced, RSS {self.stages[name]['peak_rss_mb']} MB")
+
+    @contextlib.contextmanager
+    def tool(self, name: str):
+        """Time one tool invocation, with its own cProfile when the interpreter allows nesting."""
+        profiler = _start_cprofile()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                entry = self.tools.setdefault(name, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "profiled_calls": 0})
+                entry["calls"] += 1
+                entry["seconds"] += elapsed
+                entry["max_seconds"] = max(entry["max_seconds"], elapsed)
+                if profiler is not None:
+                    entry["profiled_calls"] += 1
+                    if name in self._tool_stats:
+                        self._tool_stats[name].add(profiler)
+                    else:
+                        self._tool_stats[name] = pstats.Stats(profiler)
+
+    def write_summary(self) -> str:
+        """Write tool pstats and summary.json. Returns the summary path."""
+        for name, stats in self._tool_stats.items():
+            stats.dump_stats(os.path.join(self.out_dir, f"tool-{name}.pstats"))
+        for entry in self.tools.values():
+            entry["seconds"] = round(entry["seconds"], 2)
+            entry["max_seconds"] = round(entry["max_seconds"], 2)
+
+        summary_path = os.path.join(self.out_dir, "summary.json")
+        with open(summary_path, 'w') as f:
+            json.dump({"stages": self.stages, "tools": self.tools, "peak_rss_mb": _peak_rss_mb()}, f, indent=2)
+        tracemalloc.stop()
+        print(f"⏱️ Profile written to {self.out_dir}")
+        return summary_path
+
+
+_profiler: Optional[RunProfiler] = None
+
+
+def enable_profiling(run_dir: str) -> RunProfiler:
+    """Turn profiling on for this run; results go to <run_dir>/profile/."""
+    global _profiler
+    _profiler = RunProfiler(os.path.join(run_dir, "profile"))
+    print(f"⏱️ Profiling enabled ({_profiler.out_dir})")
+    return _profiler
+
+
+def finish_profiling() -> Optional[str]:
+    """Write the profile summary and turn profiling off. Returns the summary path, if any."""
+    global _profiler
+    if _profiler is None:
+        return None
+    summary_path = _profiler.write_summary()
+    _profiler = None
+    return summary_path
+
+
+def profile_stage(name: str):
+    """Context manager that profiles a stage when profiling is on, and does nothing otherwise."""
+    if _profiler is None:
+        return _NULL_CONTEXT
+    return _profiler.stage(name)
+
+
+def _profiled_tool(tool: BaseTool) -> BaseTool:
+    def run(**kwargs) -> str:
+        profiler = _profiler
+        if profiler is None:
+            return tool.invoke(kwargs)
+        with profiler.tool(tool.name):
+            return tool.invoke(kwargs)
+
+    return StructuredTool.from_function(
+        func=run,
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+    )
+
+
+def profile_tools(tools: List[BaseTool]) -> List[BaseTool]:
+    """Wrap tools so each invocation is profiled; returns them unchanged when profiling is off."""
+    if _profiler is None:
+        return tools
+    return [_profiled_tool(t) for t in tools]
@@ -0,0 +1,122 @@
+# ai/src/publish.py
+# Writes a finished edition to web/public.
+#
+# Every file is written to a temp file in the same directory and renamed into place, so
+# syncToSupabase.js and the web app never read a half-written newsletter. Alongside the
+# compact newsletter.json, each edition gets precompressed .gz (and .br when the brotli
+# package is installed) variants, a dated copy under editions/, and an entry in
+# editions/index.json listing every published edition by date.
+
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import brotli
+except ImportError:  # optional: only .gz variants are written without it
+    brotli = None
+
+PUBLIC_DIR = "web/public"
+LATEST_FILENAME = "newsletter.json"
+EDITIONS_DIRNAME = "editions"
+MANIFEST_FILENAME = "index.json"
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    """Write bytes to path via a temp file + rename in the same directory."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _write_with_variants(path: str, data: bytes) -> List[str]:
+    """Write a file plus its precompressed variants. Returns the paths written."""
+    # mtime=0 keeps the .gz byte-identical for identical content (no spurious git diffs)
+    variants = {path + ".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[path + ".br"] = brotli.compress(data)
+
+    # Compressed variants go first so the plain file never points at stale siblings
+    for variant_path, payload in variants.items():
+        _atomic_write(variant_path, payload)
+    _atomic_write(path, data)
+    return [path, *variants]
+
+
+def edition_filename(run_date: datetime, edition: str) -> str:
+    """Dated file name for an edition, e.g. 2025-01-31.json or 2025-01-31-weekly.json."""
+    suffix = "" if edition == "daily" else f"-{edition}"
+    return f"{run_date.strftime('%Y-%m-%d')}{suffix}.json"
+
+
+def _update_manifest(editions_dir: str, entry: Dict) -> None:
+    """Insert or replace an edition in index.json, newest first."""
+    manifest_path = os.path.join(editions_dir, MANIFEST_FILENAME)
+    manifest = {"editions": []}
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not read {manifest_path} ({e}), rebuilding it")
+
+    editions = [
+        e for e in manifest.get("editions", [])
+        if (e.get("date"), e.get("edition")) != (entry["date"], entry["edition"])
+    ]
+    editions.append(entry)
+    editions.sort(key=lambda e: (e["date"], e["edition"]), reverse=True)
+
+    manifest = {"updated_at": datetime.now().isoformat(timespec="seconds"), "editions": editions}
+    _atomic_write(manifest_path, json.dumps(manifest, indent=2).encode("utf-8"))
+
+
+def publish_edition(
+    output_json: Dict,
+    edition: str = "daily",
+    run_date: Optional[datetime] = None,
+    public_dir: str = PUBLIC_DIR,
+    latest_filename: str = LATEST_FILENAME
+) -> Dict:
+    """
+    Publish an edition atomically as the latest newsletter and as a dated archive copy.
+
+    Args:
+        output_json: Final newsletter dict ('news', 'perspective', 'curiosity', ...)
+        edition: "daily", "weekly" or "daily-<name>" (non-daily copies get a -<edition> suffix)
+        run_date: Date the edition is filed under (defaults to today)
+        public_dir: Web public directory
+        latest_filename: Name of the latest copy (extra editions use newsletter-<name>.json)
+
+    Returns:
+        Manifest entry for the edition, plus the list of 'written' paths
+    """
+    run_date = run_date or datetime.now()
+    data = json.dumps(output_json, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    editions_dir = os.path.join(public_dir, EDITIONS_DIRNAME)
+    filename = edition_filename(run_date, edition)
+
+    written = _write_with_variants(os.path.join(editions_dir, filename), data)
+    written += _write_with_variants(os.path.join(public_dir, latest_filename), data)
+
+    entry = {
+        "date": run_date.strftime('%Y-%m-%d'),
+        "edition": edition,
+        "file": f"{EDITIONS_DIRNAME}/{filename}",
+        "titles": [story.get("title", "") for story in output_json.get("news", [])],
+        "bytes": len(data),
+        "sha256": hashlib.sha256(data).hexdigest(),
+    }
+    _update_manifest(editions_dir, entry)
+
+    print(f"📦 Published {len(data)} bytes ({len(written)} files) to {public_dir}/{latest_filename} "
+          f"and {entry['file']}")
+    return {**entry, "written": written}
@@ -0,0 +1,406 @@
+# ai/src/relevance.py
+# Locally trained relevance filter for feed entries.
+#
+# A TF-IDF + logistic regression model over title and summary, trained from the archive:
+# feed entries whose link was published (in the archive or in Supabase's newsletters) or
+# picked as a candidate by the researcher are positives, the other entries the researcher
+# saw are negatives. rss_tool drops entries scoring below the model's threshold before they
+# reach the researcher, so off-topic crypto-trading or generic tech items stop costing gpt-4o
+# tokens. Scoring is a handful of dict lookups.
+#
+# Entries the filter dropped never had a chance to be picked, so they are left out of
+# training rather than counted as negatives. A small random share of them is let through
+# anyway (explore_share) and weighted up, so each retrain still sees how the model's
+# rejects would have fared and recall doesn't shrink from one retrain to the next.
+#
+# Usage:
+#   python -m ai.src.relevance train --days 180
+#   python -m ai.src.relevance score "Visa launches agentic payments pilot"
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import yaml
+from supabase import create_client
+
+from .archive import ARCHIVE_PATH, KIND_FEED_ENTRY, KIND_STORY, record_shown
+from .checkpoints import RUNS_DIR
+from .weekly_pool import POOL_DIR
+
+MODEL_PATH = os.getenv("NEWSLETTER_RELEVANCE_MODEL", os.path.join(RUNS_DIR, "relevance_model.json"))
+
+# Defaults used when config.yml has no 'relevance' section
+DEFAULT_RELEVANCE = {
+    "enabled": True,
+    "min_recall": 0.95,           # threshold keeps at least this share of held-out positives
+    "min_positives": 30,          # don't train with fewer labeled positives
+    "max_features": 20000,
+    "min_df": 2,
+    "explore_share": 0.05,        # share of below-threshold entries let through as training labels
+}
+
+# Training settings
+L2 = 1e-4
+LEARNING_RATE = 2.0
+ITERATIONS = 400
+VALIDATION_SHARE = 0.2
+SEED = 13
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9$€£%.-]*[a-z0-9%]|[a-z0-9]")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is",
+    "it", "its", "of", "on", "or", "that", "the", "this", "to", "was", "will", "with",
+}
+
+_settings = dict(DEFAULT_RELEVANCE)
+_model: Optional[Dict] = None
+_model_loaded = False
+_model_lock = threading.Lock()
+_stats = {"scored": 0, "dropped": 0, "explored": 0}
+_rng = random.Random()
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word unigrams and bigrams (stopwords removed)."""
+    words = [w for w in _TOKEN_RE.findall(text.lower()) if w not in _STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _entry_text(entry: Dict) -> str:
+    # Titles carry most of the signal, so they are counted twice
+    title = entry.get("title", "")
+    return f"{title} {title} {entry.get('summary', '') or entry.get('body', '')}"
+
+
+# ---------------------------------------------------------------------------
+# Training
+# ---------------------------------------------------------------------------
+
+def _published_urls(days: int) -> set:
+    """Source links of the stories in Supabase's newsletters from the last N days (empty without credentials)."""
+    supabase_url = os.getenv("NEXT_PUBLIC_SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not supabase_url or not supabase_key:
+        print("⚠️ Supabase credentials not found, using archived stories only")
+        return set()
+    cutoff_date = time.strftime("%Y-%m-%d", time.gmtime(time.time() - days * 86400))
+    try:
+        response = create_client(supabase_url, supabase_key).table("newsletters") \
+            .select("content") \
+            .gte("publication_date", cutoff_date) \
+            .execute()
+    except Exception as e:
+        print(f"⚠️ Could not fetch published stories from Supabase: {e}")
+        return set()
+    return {
+        story.get("source", {}).get("url")
+        for newsletter in response.data
+        for story in (newsletter.get("content") or {}).get("news", [])
+        if story.get("source", {}).get("url")
+    }
+
+
+def _positive_urls(days: int) -> set:
+    """Links that were published, or chosen as candidates by the researcher, in the last N days."""
+    since = time.time() - days * 86400
+    urls = _published_urls(days)
+    if os.path.exists(ARCHIVE_PATH):
+        with sqlite3.connect(ARCHIVE_PATH) as conn:
+            urls.update(row[0] for row in conn.execute(
+                "SELECT url FROM docs WHERE kind = ? AND published >= ?", (KIND_STORY, since)
+            ))
+    if os.path.isdir(POOL_DIR):
+        for week in os.listdir(POOL_DIR):
+            week_dir = os.path.join(POOL_DIR, week)
+            for name in os.listdir(week_dir):
+                try:
+                    with open(os.path.join(week_dir, name), 'r') as f:
+                        day = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                urls.update(s.get("source_url") for s in day.get("stories", []) if s.get("source_url"))
+    return urls
+
+
+def load_training_data(days: int) -> Tuple[List[str], List[int], List[float]]:
+    """
+    Archived feed entries from the last N days that reached the researcher.
+
+    Entries archived before shown entries were recorded are all used (weight 1). After that,
+    entries the filter dropped are skipped, and the ones let through by exploration carry
+    weight 1 / explore_share, standing in for the rejects that weren't sampled.
+
+    Returns:
+        (texts, 1/0 relevance labels, sample weights)
+    """
+    if not os.path.exists(ARCHIVE_PATH):
+        return [], [], []
+    positives = _positive_urls(days)
+    since = time.time() - days * 86400
+    with sqlite3.connect(ARCHIVE_PATH) as conn:
+        # Created by the archive on first use; an older archive may not have it yet
+        conn.execute("CREATE TABLE IF NOT EXISTS shown_entries (url TEXT PRIMARY KEY, shown_at REAL NOT NULL, "
+                     "weight REAL NOT NULL DEFAULT 1)")
+        tracked_since = conn.execute("SELECT MIN(shown_at) FROM shown_entries").fetchone()[0]
+        rows = conn.execute(
+            "SELECT d.url, d.title, d.body, d.published, s.weight FROM docs d "
+            "LEFT JOIN shown_entries s ON s.url = d.url WHERE d.kind = ? AND d.published >= ?",
+            (KIND_FEED_ENTRY, since)
+        ).fetchall()
+    if tracked_since is None:
+        tracked_since = float("inf")
+    rows = [
+        (url, title, body, weight if weight is not None else 1.0)
+        for url, title, body, published, weight in rows
+        if weight is not None or published < tracked_since
+    ]
+    texts = [_entry_text({"title": title, "summary": body}) for _, title, body, _ in rows]
+    labels = [1 if url in positives else 0 for url, _, _, _ in rows]
+    weights = [weight for _, _, _, weight in rows]
+    return texts, labels, weights
+
+
+def _build_vocabulary(token_lists: List[List[str]], max_features: int, min_df: int) -> Tuple[Dict[str, int], List[float]]:
+    df = Counter(term for tokens in token_lists for term in set(tokens))
+    terms = [t for t, n in df.most_common(max_features) if n >= min_df]
+    n_docs = len(token_lists)
+    vocabulary = {term: i for i, term in enumerate(terms)}
+    idf = [math.log((1 + n_docs) / (1 + df[term])) + 1 for term in terms]
+    return vocabulary, idf
+
+
+def _tfidf_rows(token_lists: List[List[str]], vocabulary: Dict[str, int], idf: List[float]):
+    """Sparse L2-normalised TF-IDF matrix as COO arrays (rows, cols, values)."""
+    rows, cols, vals = [], [], []
+    for r, tokens in enumerate(token_lists):
+        counts = Counter(vocabulary[t] for t in tokens if t in vocabulary)
+        weights = {c: (1 + math.log(n)) * idf[c] for c, n in counts.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        for c, w in weights.items():
+            rows.append(r)
+            cols.append(c)
+            vals.append(w / norm)
+    return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64), np.array(vals)
+
+
+def _fit_logistic(rows, cols, vals, labels, weights, n_features: int):
+    """Class-weighted L2 logistic regression by full-batch gradient descent on sparse input."""
+    y = np.asarray(labels, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    n = len(y)
+    # Positives are rare: weight both classes to contribute equally
+    pos = max((weights * y).sum(), 1e-9)
+    neg = max((weights * (1 - y)).sum(), 1e-9)
+    sample_weight = weights * np.where(y == 1, n / (2 * pos), n / (2 * neg))
+
+    w = np.zeros(n_features)
+    b = 0.0
+    for _ in range(ITERATIONS):
+        z = np.bincount(rows, weights=vals * w[cols], minlength=n) + b
+        p = 1 / (1 + np.exp(-z))
+        g = sample_weight * (p - y) / n
+        w -= LEARNING_RATE * (np.bincount(cols, weights=vals * g[rows], minlength=n_features) + L2 * w)
+        b -= LEARNING_RATE * g.sum()
+    return w, b
+
+
+def _scores(rows, cols, vals, n: int, w, b):
+    return np.bincount(rows, weights=vals * w[cols], minlength=n) + b
+
+
+def _threshold_for_recall(scores, labels, weights, min_recall: float) -> float:
+    """Highest score threshold that still keeps min_recall of the (weighted) positives."""
+    positives = sorted(((s, w) for s, y, w in zip(scores, labels, weights) if y == 1), reverse=True)
+    if not positives:
+        return float("-inf")
+    needed = min_recall * sum(w for _, w in positives)
+    kept = 0.0
+    for score, weight in positives:
+        kept += weight
+        if kept >= needed - 1e-9:
+            return float(score)
+    return float(positives[-1][0])
+
+
+def train(days: int = 180, model_path: str = MODEL_PATH, settings: Optional[Dict] = None) -> Optional[Dict]:
+    """
+    Train the relevance model from the archive and save it.
+
+    A random share of the data is held out to pick the threshold (so that min_recall of
+    relevant entries survive) and to report metrics.
+
+    Returns:
+        Training metrics, or None if there weren't enough labeled positives
+    """
+    settings = {**_settings, **(settings or {})}
+    texts, labels, weights = load_training_data(days)
+    n_positive = sum(labels)
+    print(f"📚 Relevance training data: {len(texts)} entries, {n_positive} relevant")
+    if n_positive < settings["min_positives"]:
+        print(f"⚠️ Need at least {settings['min_positives']} relevant entries to train, skipping")
+        return None
+
+    token_lists = [tokenize(t) for t in texts]
+    order = np.random.default_rng(SEED).permutation(len(texts))
+    n_val = int(len(texts) * VALIDATION_SHARE)
+    val_idx, train_idx = order[:n_val], order[n_val:]
+
+    train_tokens = [token_lists[i] for i in train_idx]
+    vocabulary, idf = _build_vocabulary(train_tokens, settings["max_features"], settings["min_df"])
+    w, b = _fit_logistic(
+        *_tfidf_rows(train_tokens, vocabulary, idf),
+        [labels[i] for i in train_idx], [weights[i] for i in train_idx], len(idf)
+    )
+
+    val_tokens = [token_lists[i] for i in val_idx]
+    val_labels = [labels[i] for i in val_idx]
+    val_weights = [weights[i] for i in val_idx]
+    val_scores = _scores(*_tfidf_rows(val_tokens, vocabulary, idf), len(val_tokens), w, b)
+    threshold = _threshold_for_recall(val_scores, val_labels, val_weights, settings["min_recall"])
+
+    # Metrics are weighted, so explored entries stand in for the rejects that weren't sampled
+    kept = [s >= threshold for s in val_scores]
+    kept_weight = sum(wt for k, wt in zip(kept, val_weights) if k)
+    true_kept = sum(wt for k, y, wt in zip(kept, val_labels, val_weights) if k and y)
+    metrics = {
+        "entries": len(texts),
+        "positives": n_positive,
+        "explored": sum(1 for wt in weights if wt > 1),
+        "validation_recall": round(true_kept / max(sum(wt for y, wt in zip(val_labels, val_weights) if y), 1e-9), 3),
+        "validation_precision": round(true_kept / max(kept_weight, 1e-9), 3),
+        "validation_dropped_share": round(1 - kept_weight / max(sum(val_weights), 1e-9), 3),
+    }
+
+    terms = sorted(vocabulary, key=vocabulary.get)
+    model = {
+        "trained_at": time.time(),
+        "threshold": threshold,
+        "bias": float(b),
+        # Per term: (idf, coefficient); scoring needs nothing else
+        "terms": {term: [round(idf[i], 5), round(float(w[i]), 6)] for i, term in enumerate(terms)},
+        "metrics": metrics,
+    }
+    os.makedirs(os.path.dirname(model_path) or ".", exist_ok=True)
+    tmp_path = model_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(model, f)
+    os.replace(tmp_path, model_path)
+
+    print(f"✅ Relevance model saved to {model_path}: recall {metrics['validation_recall']}, "
+          f"precision {metrics['validation_precision']}, drops {metrics['validation_dropped_share']:.0%} of entries")
+    return metrics
+
+
+# ---------------------------------------------------------------------------
+# Runtime filter
+# ---------------------------------------------------------------------------
+
+def configure_relevance(config: Dict) -> None:
+    """Apply the 'relevance' section of config.yml."""
+    global _model_loaded
+    _settings.update(config.get("relevance") or {})
+    _model_loaded = False
+
+
+def _get_model() -> Optional[Dict]:
+    """Load the stored model once; None when filtering is off or no model has been trained."""
+    global _model, _model_loaded
+    with _model_lock:
+        if not _model_loaded:
+            _model_loaded = True
+            _model = None
+            if _settings["enabled"] and os.path.exists(MODEL_PATH):
+                try:
+                    with open(MODEL_PATH, 'r') as f:
+                        _model = json.load(f)
+                    print(f"🧮 Relevance filter loaded ({len(_model['terms'])} terms)")
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"⚠️ Could not load relevance model: {e}")
+        return _model
+
+
+def score_entry(entry: Dict, model: Dict) -> float:
+    """Relevance score (logit) of a feed entry dict with 'title' and 'summary'."""
+    terms = model["terms"]
+    counts = Counter(t for t in tokenize(_entry_text(entry)) if t in terms)
+    if not counts:
+        return model["bias"]
+    dot = 0.0
+    norm = 0.0
+    for term, n in counts.items():
+        idf, coef = terms[term]
+        weight = (1 + math.log(n)) * idf
+        dot += weight * coef
+        norm += weight * weight
+    return model["bias"] + dot / math.sqrt(norm)
+
+
+def filter_relevant(entries: List[Dict], record: bool = True) -> List[Dict]:
+    """
+    Drop feed entries scoring below the model threshold (no-op without a model).
+
+    Args:
+        entries: Feed entry dicts with 'title', 'summary' and 'link'
+        record: Remember the entries that pass (and let a random explore_share of the
+            rejects through) as training labels; off when regenerating past editions
+
+    Returns:
+        The entries to show the researcher
+    """
+    model = _get_model()
+    if model is None:
+        kept = [(e, 1.0) for e in entries]
+    else:
+        explore_share = _settings["explore_share"] if record else 0
+        kept = []
+        for entry in entries:
+            if score_entry(entry, model) >= model["threshold"]:
+                kept.append((entry, 1.0))
+            elif explore_share > 0 and _rng.random() < explore_share:
+                kept.append((entry, 1 / explore_share))
+                _stats["explored"] += 1
+        _stats["scored"] += len(entries)
+        _stats["dropped"] += len(entries) - len(kept)
+    if record:
+        record_shown([(e.get("link", ""), weight) for e, weight in kept])
+    return [e for e, _ in kept]
+
+
+def relevance_stats() -> Dict:
+    """Entries scored, dropped and let through for exploration by the filter during this run."""
+    return dict(_stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train or try the feed entry relevance model.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    train_parser = commands.add_parser("train", help="Retrain the model from the archive")
+    train_parser.add_argument("--days", type=int, default=180, help="Use archived entries from the last N days")
+    score_parser = commands.add_parser("score", help="Score a title (and optional summary)")
+    score_parser.add_argument("title")
+    score_parser.add_argument("summary", nargs="?", default="")
+    args = parser.parse_args()
+
+    with open("ai/config.yml", 'r') as f:
+        configure_relevance(yaml.safe_load(f))
+
+    if args.command == "train":
+        train(days=args.days)
+    else:
+        model = _get_model()
+        if model is None:
+            print("No relevance model found; run `python -m ai.src.relevance train` first")
+        else:
+            score = score_entry({"title": args.title, "summary": args.summary}, model)
+            verdict = "keep" if score >= model["threshold"] else "drop"
+            print(f"{score:.3f} (threshold {model['threshold']:.3f}) -> {verdict}")
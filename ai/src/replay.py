@@ -0,0 +1,61 @@
+# ai/src/replay.py
+# Pinned "current time" for regenerating past editions (see backfill.py).
+#
+# A backfill run generates its edition as of a past date and time. Code that reads the clock
+# to choose inputs (feed windows, history lookbacks, archive searches, What's Hot recency)
+# calls current_time() instead of time.time(), and rss_tool replays the feed entries recorded
+# in the archive instead of fetching live feeds. The pinned time lives in a ContextVar, so
+# several dates can run in parallel threads of one process while sharing the OpenAI rate
+# limiter and caches.
+
+import contextvars
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Optional
+
+_as_of: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("as_of", default=None)
+
+
+def as_of() -> Optional[float]:
+    """The pinned time (epoch seconds) of the current run, or None for a live run."""
+    return _as_of.get()
+
+
+def replaying() -> bool:
+    """True inside a backfill run."""
+    return _as_of.get() is not None
+
+
+def current_time() -> float:
+    """Epoch seconds "now" for the current run (the pinned time when replaying)."""
+    pinned = _as_of.get()
+    return time.time() if pinned is None else pinned
+
+
+def current_datetime() -> datetime:
+    """Local datetime "now" for the current run."""
+    return datetime.fromtimestamp(current_time())
+
+
+@contextmanager
+def pinned_time(when: datetime):
+    """Run the enclosed code as of a past date and time."""
+    token = _as_of.set(when.timestamp())
+    try:
+        yield
+    finally:
+        _as_of.reset(token)
+
+
+def in_context(fn: Callable) -> Callable:
+    """
+    Wrap fn to run in a copy of the caller's context, e.g. for ThreadPoolExecutor.map
+    (executor threads don't inherit the pinned time otherwise).
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+
+    return run
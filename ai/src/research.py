@@ -0,0 +1,212 @@
+# ai/src/research.py
+# Researcher agent construction and execution for the daily and weekly pipelines.
+#
+# Uses a tool-calling agent so the LLM can request several rss_tool/scrape_tool calls
+# in a single turn; the async AgentExecutor runs those calls concurrently.
+# Three budgets keep the research phase bounded:
+#   - max_iterations: LLM turns before the agent is stopped
+#   - max_execution_time: wall-clock seconds for the whole agent loop
+#   - max_candidates: feed entries gathered before rss_tool refuses to read more feeds
+# Under a run deadline (run_deadline.py) the time and candidate budgets shrink to fit the
+# research stage's share, and scrape_tool is dropped when that share is less than half.
+
+import asyncio
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from langchain.agents import AgentExecutor, create_tool_calling_agent
+from langchain.agents.agent import RunnableMultiActionAgent
+from langchain.agents.format_scratchpad.tools import format_to_tool_messages
+from langchain_core.messages import HumanMessage
+from langchain_core.tools import BaseTool, StructuredTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from .run_deadline import stage_time_left
+
+# Defaults used when config.yml has no 'research' section
+DEFAULT_RESEARCH_BUDGET = {
+    "max_iterations": 15,
+    "max_execution_time": 420,
+    "max_candidates": 100,
+}
+
+# Share of the wall-clock budget spent gathering; the rest is reserved for analysis
+GATHERING_TIME_SHARE = 0.6
+
+# Tools that stop once the gathering phase is over (search_tool stays available for context)
+GATHERING_TOOLS = {"rss_tool", "scrape_tool"}
+
+# Tools whose output adds candidate stories to the pool
+CANDIDATE_TOOLS = {"rss_tool"}
+
+# Share of the stage's time left given to the agent loop; the rest covers the forced final answer
+AGENT_TIME_SHARE = 0.85
+
+# Fewest candidates a shortened research stage still gathers
+MIN_CANDIDATES = 20
+
+# Message AgentExecutor returns when it hits max_iterations or max_execution_time
+_STOPPED_MESSAGE = "Agent stopped due to"
+
+
+class CandidateBudget:
+    """Thread-safe count of candidate stories gathered by the researcher's tools."""
+
+    def __init__(self, max_candidates: int, max_execution_time: float):
+        # Configured budgets; each run's limits are derived from these (see _fit_to_deadline)
+        self.configured_candidates = max_candidates
+        self.configured_seconds = max_execution_time
+        self.max_candidates = max_candidates
+        self.gathering_seconds = max_execution_time * GATHERING_TIME_SHARE
+        self.gathering_deadline = None
+        self.count = 0
+        self.skipped_tools = set()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the gathering clock and count (called each time the agent starts running)."""
+        with self._lock:
+            self.count = 0
+            self.gathering_deadline = time.monotonic() + self.gathering_seconds
+
+    def stop_reason(self, tool_name: str) -> str | None:
+        """Return why a gathering tool should stop, or None if there is budget left."""
+        if tool_name in self.skipped_tools:
+            return "run is short on time, use the feed summaries instead"
+        if tool_name in CANDIDATE_TOOLS and self.count >= self.max_candidates:
+            return f"candidate budget reached ({self.count} stories gathered)"
+        if self.gathering_deadline is not None and time.monotonic() >= self.gathering_deadline:
+            return f"gathering time budget used up ({self.count} stories gathered)"
+        return None
+
+    def record(self, tool_name: str, output: str) -> None:
+        """Count the candidate stories contained in a tool's output."""
+        if tool_name not in CANDIDATE_TOOLS:
+            return
+        found = sum(1 for line in output.splitlines() if line.startswith("Title: "))
+        with self._lock:
+            self.count += found
+
+
+def _budgeted_tool(tool: BaseTool, budget: CandidateBudget) -> BaseTool:
+    """Wrap a gathering tool so it stops fetching once the candidate budget is spent."""
+
+    def run(**kwargs) -> str:
+        reason = budget.stop_reason(tool.name)
+        if reason:
+            return f"Skipped: {reason}. Stop gathering and write your analysis with the stories you already have."
+        output = tool.invoke(kwargs)
+        budget.record(tool.name, output)
+        return output
+
+    return StructuredTool.from_function(
+        func=run,
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+    )
+
+
+def load_research_budget(config: Dict) -> Dict:
+    """Merge the 'research' section of config.yml over the default budgets."""
+    return {**DEFAULT_RESEARCH_BUDGET, **(config.get("research") or {})}
+
+
+def build_researcher(llm, tools: List[BaseTool], prompt, budget: Dict) -> Tuple[AgentExecutor, CandidateBudget]:
+    """
+    Create the researcher AgentExecutor with step, time and candidate budgets applied.
+
+    Args:
+        llm: Chat model that supports tool calling
+        tools: Tools available to the researcher
+        prompt: ChatPromptTemplate with 'input' and 'agent_scratchpad' placeholders
+        budget: Dict with max_iterations, max_execution_time and max_candidates
+
+    Returns:
+        Tuple of (executor, candidate_budget)
+    """
+    candidate_budget = CandidateBudget(
+        max_candidates=budget["max_candidates"],
+        max_execution_time=budget["max_execution_time"],
+    )
+    budgeted_tools = [
+        _budgeted_tool(t, candidate_budget) if t.name in GATHERING_TOOLS else t
+        for t in tools
+    ]
+    # Invoke rather than stream each turn, so agent turns can be served from the LLM response cache
+    agent = RunnableMultiActionAgent(
+        runnable=create_tool_calling_agent(llm, budgeted_tools, prompt),
+        stream_runnable=False,
+    )
+    executor = AgentExecutor(
+        agent=agent,
+        tools=budgeted_tools,
+        verbose=True,
+        max_iterations=budget["max_iterations"],
+        max_execution_time=budget["max_execution_time"],
+        return_intermediate_steps=True,
+    )
+    return executor, candidate_budget
+
+
+def _force_final_answer(llm, tools: List[BaseTool], prompt, inputs: Dict, intermediate_steps: list) -> str:
+    """Ask the LLM for a final answer from what it gathered, with tool calls disabled."""
+    scratchpad = format_to_tool_messages(intermediate_steps)
+    scratchpad.append(HumanMessage(
+        content="The research budget is used up. Do not call any more tools. "
+                "Write your final answer now, in the required output format, using only the material gathered above."
+    ))
+    messages = prompt.invoke({**inputs, "agent_scratchpad": scratchpad})
+    final_llm = llm.bind(tools=[convert_to_openai_tool(t) for t in tools], tool_choice="none")
+    return final_llm.invoke(messages).content
+
+
+def _fit_to_deadline(executor: AgentExecutor, candidate_budget: CandidateBudget) -> None:
+    """Shrink the time and candidate budgets to the research stage's share of the run deadline."""
+    # Start from the configured budgets, so a retried stage isn't cut down again from the last cut
+    configured_seconds = candidate_budget.configured_seconds
+    executor.max_execution_time = configured_seconds
+    candidate_budget.gathering_seconds = configured_seconds * GATHERING_TIME_SHARE
+    candidate_budget.max_candidates = candidate_budget.configured_candidates
+    candidate_budget.skipped_tools.clear()
+
+    time_left = stage_time_left()
+    if time_left is None:
+        return
+    agent_seconds = max(0.0, time_left * AGENT_TIME_SHARE)
+    if agent_seconds >= configured_seconds:
+        return
+    scale = agent_seconds / configured_seconds
+    executor.max_execution_time = agent_seconds
+    candidate_budget.gathering_seconds = agent_seconds * GATHERING_TIME_SHARE
+    candidate_budget.max_candidates = max(MIN_CANDIDATES, int(candidate_budget.configured_candidates * scale))
+    if scale < 0.5:
+        candidate_budget.skipped_tools.add("scrape_tool")
+    print(f"⏱️ Research cut to {agent_seconds:.0f}s and {candidate_budget.max_candidates} candidates"
+          + (", skipping scrape_tool" if candidate_budget.skipped_tools else ""))
+
+
+def run_researcher(executor: AgentExecutor, candidate_budget: CandidateBudget, llm, prompt, inputs: Dict) -> Dict:
+    """
+    Run the researcher agent with concurrent tool execution.
+
+    If the agent is cut off by max_iterations or max_execution_time, the material it
+    already gathered is turned into a final answer instead of being discarded.
+
+    Returns:
+        Dict with 'output' (the researcher's final answer), like AgentExecutor.invoke
+    """
+    started = time.monotonic()
+    _fit_to_deadline(executor, candidate_budget)
+    candidate_budget.start()
+    result = asyncio.run(executor.ainvoke(inputs))
+    steps = result.get("intermediate_steps", [])
+    print(f"\n📊 Research: {len(steps)} tool calls, {candidate_budget.count} candidate stories, "
+          f"{time.monotonic() - started:.0f}s")
+
+    if result.get("output", "").startswith(_STOPPED_MESSAGE):
+        print("⚠️ Researcher hit its step/time budget, writing final answer from gathered material")
+        result["output"] = _force_final_answer(llm, executor.tools, prompt, inputs, steps)
+
+    return result
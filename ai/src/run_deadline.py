@@ -0,0 +1,194 @@
+# ai/src/run_deadline.py
+# Run-level deadline split into per-stage time budgets.
+#
+# A run gets an end time: the configured "ready by" clock time for its pipeline, clamped to
+# between min_run_minutes and max_run_minutes from now (or max_run_minutes when there is no
+# ready-by time, or it has already passed). A few minutes are held back for saving and
+# publishing. Each stage, when it starts, gets its share of the time left, in proportion to
+# the shares of the stages still to run, so time a stage doesn't use flows to later stages.
+#
+# The stage budget then propagates down:
+#   - the researcher's execution time and candidate budget shrink to fit (research.py)
+#   - every OpenAI request and feed/page fetch gets a timeout no longer than the time left
+#   - stages skip optional LLM calls (parser, Writer fix-up, Editor) once the run is out of time
+
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+# Defaults used when config.yml has no 'deadline' section
+DEFAULT_DEADLINE = {
+    "ready_by": None,                 # "HH:MM", or {pipeline: "HH:MM"}
+    "timezone": "UTC",
+    "min_run_minutes": 15,
+    "max_run_minutes": 40,
+    "publish_reserve_minutes": 2,     # kept back for validation, saving and publishing
+    "min_call_seconds": 20,           # no LLM/HTTP call gets less than this
+    "stage_shares": {"research": 0.5, "parse": 0.05, "dedup": 0.05, "write": 0.2, "edit": 0.2, "editions": 0.2},
+}
+
+
+class RunDeadline:
+    """
+    Deadline for one run, with per-stage budgets handed out as stages start.
+
+    Args:
+        end: Monotonic time the run must be finished by
+        stages: Ordered stage names of the pipeline
+        settings: Merged 'deadline' settings
+    """
+
+    def __init__(self, end: float, stages: List[str], settings: Dict):
+        self.end = end
+        self.stages = stages
+        self.settings = settings
+        self.shares = {stage: settings["stage_shares"].get(stage, 0.1) for stage in stages}
+        self.reserve = settings["publish_reserve_minutes"] * 60
+        self.budgets: Dict[str, float] = {}
+        self.used: Dict[str, float] = {}
+        self.current: Optional[str] = None
+        self._stage_ends: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        """Seconds left for stages (the publish reserve excluded)."""
+        return self.end - self.reserve - time.monotonic()
+
+    def start_stage(self, stage: str) -> float:
+        """Give a stage its share of the time left (once; retries keep the same end). Returns the budget."""
+        with self._lock:
+            self.current = stage
+            if stage not in self._stage_ends:
+                later = self.stages[self.stages.index(stage):] if stage in self.stages else [stage]
+                total_share = sum(self.shares.get(s, 0.1) for s in later)
+                budget = max(0.0, self.remaining()) * self.shares.get(stage, 0.1) / total_share
+                self.budgets[stage] = budget
+                self._stage_ends[stage] = time.monotonic() + budget
+            return self.budgets[stage]
+
+    def finish_stage(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.used[stage] = self.used.get(stage, 0.0) + seconds
+            self.current = None
+
+    def stage_remaining(self) -> float:
+        """Seconds left in the running stage's budget (the whole run's outside a stage)."""
+        with self._lock:
+            stage_end = self._stage_ends.get(self.current) if self.current else None
+        if stage_end is None:
+            return self.remaining()
+        return min(stage_end, self.end - self.reserve) - time.monotonic()
+
+    def out_of_time(self) -> bool:
+        """True once the run can't fit another minimum-length call before its publish reserve."""
+        return self.remaining() < self.settings["min_call_seconds"]
+
+    def stats(self) -> Dict:
+        return {
+            "seconds_left": round(self.end - time.monotonic(), 1),
+            "stages": {
+                stage: {"budget": round(self.budgets[stage], 1), "used": round(self.used.get(stage, 0.0), 1)}
+                for stage in self.budgets
+            },
+            "overran": [stage for stage in self.budgets if self.used.get(stage, 0.0) > self.budgets[stage]],
+        }
+
+
+_settings = dict(DEFAULT_DEADLINE)
+_deadline: Optional[RunDeadline] = None
+
+
+def _ready_by(pipeline: str) -> Optional[str]:
+    ready_by = _settings["ready_by"]
+    if isinstance(ready_by, dict):
+        return ready_by.get(pipeline)
+    return ready_by
+
+
+def configure_deadline(config: Dict, pipeline: str, stages: List[str], ready_by: Optional[str] = None) -> RunDeadline:
+    """
+    Start the run deadline from the 'deadline' section of config.yml.
+
+    Args:
+        config: Parsed config.yml
+        pipeline: "daily" or "weekly" (selects a per-pipeline ready_by)
+        stages: Ordered stage names of the pipeline
+        ready_by: "HH:MM" override (e.g. from --ready-by)
+
+    Returns:
+        The run's deadline
+    """
+    global _deadline
+    _settings.update(config.get("deadline") or {})
+    minutes = _settings["max_run_minutes"]
+
+    clock = ready_by or _ready_by(pipeline)
+    if clock:
+        zone = ZoneInfo(_settings["timezone"])
+        now = datetime.now(zone)
+        hour, minute = (int(part) for part in clock.split(":"))
+        target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        until = (target - now) / timedelta(minutes=1)
+        if until > 0:
+            minutes = min(max(until, _settings["min_run_minutes"]), _settings["max_run_minutes"])
+        else:
+            print(f"⏱️ Ready-by time {clock} has passed, allowing {minutes} minutes")
+
+    _deadline = RunDeadline(time.monotonic() + minutes * 60, stages, _settings)
+    finish = datetime.now() + timedelta(minutes=minutes)
+    print(f"⏱️ Run deadline: {finish.strftime('%H:%M')} ({minutes:.0f} min, "
+          f"{_settings['publish_reserve_minutes']} kept for publishing)")
+    return _deadline
+
+
+def current_deadline() -> Optional[RunDeadline]:
+    return _deadline
+
+
+def clear_deadline() -> None:
+    """Drop the deadline (between runs in a long-lived process)."""
+    global _deadline
+    _deadline = None
+
+
+@contextmanager
+def _timed_stage(deadline: RunDeadline, stage: str):
+    budget = deadline.start_stage(stage)
+    print(f"⏱️ Stage '{stage}': {budget:.0f}s budget ({max(0.0, deadline.remaining()):.0f}s left in the run)")
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        deadline.finish_stage(stage, time.monotonic() - started)
+
+
+def deadline_stage(stage: str):
+    """Context manager that runs a stage against its budget (a no-op without a deadline)."""
+    if _deadline is None:
+        return nullcontext()
+    return _timed_stage(_deadline, stage)
+
+
+def stage_time_left() -> Optional[float]:
+    """Seconds left in the running stage's budget, or None without a deadline."""
+    return None if _deadline is None else _deadline.stage_remaining()
+
+
+def call_timeout(default: float) -> float:
+    """Timeout for one LLM/HTTP call: the default, capped by the stage's time left (but at least min_call_seconds)."""
+    if _deadline is None:
+        return default
+    return min(default, max(float(_settings["min_call_seconds"]), _deadline.stage_remaining()))
+
+
+def out_of_time() -> bool:
+    """True when optional work should be skipped to make the deadline."""
+    return _deadline is not None and _deadline.out_of_time()
+
+
+def deadline_stats() -> Optional[Dict]:
+    """Stage budgets and time used (for the run report), or None without a deadline."""
+    return None if _deadline is None else _deadline.stats()
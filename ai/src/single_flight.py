@@ -0,0 +1,170 @@
+# ai/src/single_flight.py
+# Thread- and asyncio-safe caches with per-key single-flight.
+#
+# The researcher's tool calls run concurrently (and the What's Hot prefetch fans out over
+# every feed), so two calls for the same feed, page or embedding text can arrive together.
+# With a plain dict both would go to the network. Here the first caller for a key computes
+# the value while later callers wait for that same result ("coalesced"), from threads or
+# coroutines alike. Failures are passed to everyone waiting and are not cached.
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+# Every cache created in this process, by name (for the run report)
+_caches: Dict[str, "SingleFlightCache"] = {}
+_caches_lock = threading.Lock()
+
+
+class SingleFlightCache:
+    """
+    Key-value cache where concurrent misses for the same key share one computation.
+
+    Args:
+        name: Name in cache_stats()
+        ttl_seconds: Entries older than this are recomputed (None: kept for the process)
+    """
+
+    def __init__(self, name: str, ttl_seconds: Optional[float] = None):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self._values: Dict[Hashable, Tuple[float, Any]] = {}
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+        with _caches_lock:
+            _caches[name] = self
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        """(found, value) for a fresh entry. Call with the lock held."""
+        cached = self._values.get(key)
+        if cached is None:
+            return False, None
+        stored_at, value = cached
+        if self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds:
+            del self._values[key]
+            return False, None
+        return True, value
+
+    def _claim(self, key: Hashable) -> Tuple[str, Any]:
+        """
+        Look a key up, registering the caller as its computer on a miss.
+
+        Returns:
+            ("hit", value), ("wait", future of the computation in flight) or ("compute", new future)
+        """
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self._stats["hits"] += 1
+                return "hit", value
+            if key in self._inflight:
+                self._stats["coalesced"] += 1
+                return "wait", self._inflight[key]
+            self._stats["misses"] += 1
+            future = Future()
+            self._inflight[key] = future
+            return "compute", future
+
+    def _resolve(self, key: Hashable, future: Future, value: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+            if error is None:
+                self._values[key] = (time.time(), value)
+            else:
+                self._stats["errors"] += 1
+        if error is None:
+            future.set_result(value)
+        else:
+            future.set_exception(error)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Cached value for key, computing it once however many threads ask at the same time."""
+        state, value = self._claim(key)
+        if state == "hit":
+            return value
+        if state == "wait":
+            return value.result()
+        try:
+            result = compute()
+        except BaseException as e:
+            self._resolve(key, value, error=e)
+            raise
+        self._resolve(key, value, result)
+        return result
+
+    async def aget_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Async get_or_compute: waits without blocking the event loop, and coalesces with threads too."""
+        state, value = self._claim(key)
+        if state == "hit":
+            return value
+        if state == "wait":
+            return await asyncio.wrap_future(value)
+        try:
+            result = await compute()
+        except BaseException as e:
+            self._resolve(key, value, error=e)
+            raise
+        self._resolve(key, value, result)
+        return result
+
+    def get_or_compute_many(self, keys: Sequence[Hashable], compute: Callable[[List[Hashable]], List[Any]]) -> List[Any]:
+        """
+        Cached values for several keys, computing the missing ones in one batch.
+
+        Args:
+            keys: Keys to look up (duplicates allowed)
+            compute: Called with the keys no one else is computing; returns their values in order
+
+        Returns:
+            Values in the order of keys
+        """
+        results: Dict[Hashable, Any] = {}
+        waiting: Dict[Hashable, Future] = {}
+        claimed: Dict[Hashable, Future] = {}
+        for key in dict.fromkeys(keys):
+            state, value = self._claim(key)
+            if state == "hit":
+                results[key] = value
+            elif state == "wait":
+                waiting[key] = value
+            else:
+                claimed[key] = value
+
+        if claimed:
+            try:
+                values = compute(list(claimed))
+            except BaseException as e:
+                for key, future in claimed.items():
+                    self._resolve(key, future, error=e)
+                raise
+            for (key, future), value in zip(claimed.items(), values):
+                self._resolve(key, future, value)
+                results[key] = value
+
+        for key, future in waiting.items():
+            results[key] = future.result()
+        return [results[key] for key in keys]
+
+    def pop(self, key: Hashable) -> None:
+        """Forget a key (a computation in flight still completes for its waiters)."""
+        with self._lock:
+            self._values.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def stats(self) -> Dict:
+        """Hits, misses (computations), coalesced waits and failed computations."""
+        with self._lock:
+            return {**self._stats, "size": len(self._values)}
+
+
+def cache_stats() -> Dict[str, Dict]:
+    """Statistics of every cache, by name (for the run report)."""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
@@ -2,16 +2,29 @@
 
 # This is the correct import for the stable LangChain environment we built.
 from langchain_core.tools import tool
+import calendar
 import time
-import os
 import re
-from typing import Dict, Tuple, List, Set, Optional
+from typing import Dict, FrozenSet, Tuple, List, Set, Optional, Union
 
-import requests
+import numpy as np
 from bs4 import BeautifulSoup
 from duckduckgo_search import DDGS
 import feedparser
-from openai import OpenAI
+
+from .http_client import fetch, fetch_feed, shared_headers, request_timeout
+from .embeddings import (
+    EmbeddingError, get_backend, text_similarity, shortlist_similarities, shortlist_threshold,
+    record_shortlist_skip, record_failure, backend_failed
+)
+from .feed_selection import select_entries, feed_window, record_read
+from .feed_parser import parse_feed, strip_html
+from .history_index import find_neighbours
+from .coverage import filter_covered
+from .relevance import filter_relevant
+from .single_flight import SingleFlightCache
+from .archive import index_documents, search_archive, feed_entries_between, KIND_ARTICLE, KIND_FEED_ENTRY
+from .replay import as_of, replaying
 
 # Retry configuration
 MAX_RETRIES = 3
@@ -21,39 +34,55 @@ RETRY_DELAY = 2  # seconds
 def search_tool(query: str) -> str:
     """Performs a web search to find relevant URLs."""
     try:
-        cached = _get_cached(("search", query))
-        if cached is not None:
-            return cached
-        with DDGS() as ddgs:
-            results = [r for r in ddgs.text(query, max_results=10)]
-            output = str(results) if results else "No results found."
-            _set_cached(("search", query), output)
-            return output
+        return _tool_cache.get_or_compute(("search", query), lambda: _search(query))
     except Exception as e:
         return f"Error searching: {e}"
 
+
+def _search(query: str) -> str:
+    # DDGS keeps its own HTTP client; it gets the shared headers and timeout
+    with DDGS(headers=shared_headers(), timeout=request_timeout()) as ddgs:
+        results = [r for r in ddgs.text(query, max_results=10)]
+        return str(results) if results else "No results found."
+
+@tool
+def archive_search_tool(query: str, days_back: int = 30) -> str:
+    """Searches our local archive of feed entries, scraped articles and stories we published.
+    Use it to check what we or our sources said about a company or topic recently (fast, no web search)."""
+    results = search_archive(query, days_back=days_back)
+    if not results:
+        return f"No archive results for '{query}' in the last {days_back} days."
+    return "\n\n".join(
+        f"[{r['kind']}] {time.strftime('%Y-%m-%d', time.gmtime(r['published']))} - {r['title'] or r['url']}\n"
+        f"Link: {r['url']}\n{r['snippet']}"
+        for r in results
+    )
+
 @tool
 def scrape_tool(url: str) -> str:
     """Scrapes the text content of a single webpage with retry logic."""
-    cached = _get_cached(("scrape", url))
-    if cached is not None:
-        return cached
+    try:
+        return _tool_cache.get_or_compute(("scrape", url), lambda: _scrape(url))
+    except Exception as e:
+        return f"Error scraping {url} after {MAX_RETRIES} attempts: {e}"
+
 
+def _scrape(url: str) -> str:
     # Retry logic for failed scrapes
     last_error = None
     for attempt in range(MAX_RETRIES):
         try:
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            response = _session.get(url, headers=headers, timeout=10)
-            response.raise_for_status()  # Raise error for bad status codes
+            # Pooled client with connect/read timeouts; oversized pages are truncated, not refused
+            page = fetch(url, truncate=True)
 
-            soup = BeautifulSoup(response.text, 'lxml')
+            soup = BeautifulSoup(page.body, 'lxml', from_encoding=page.charset)
             for tag in soup(['script', 'style', 'nav', 'footer', 'header']):
                 tag.decompose()
             # Increased from 4000 to 12000 chars to capture full article content
             # 12000 chars ≈ 3000 tokens, prevents losing critical details at end of articles
             output = soup.get_text(strip=True)[:12000]
-            _set_cached(("scrape", url), output)
+            title = soup.title.get_text(strip=True) if soup.title else ""
+            index_documents(KIND_ARTICLE, [{"url": url, "title": title, "body": output}])
             return output
 
         except Exception as e:
@@ -62,99 +91,185 @@ def scrape_tool(url: str) -> str:
                 time.sleep(RETRY_DELAY)
                 continue
 
-    return f"Error scraping {url} after {MAX_RETRIES} attempts: {last_error}"
+    raise last_error
 
 @tool
 def rss_tool(rss_feed_url: str) -> str:
     """Fetches articles from an RSS feed with retry logic for reliability."""
-    cached = _get_cached(("rss", rss_feed_url))
-    if cached is not None:
-        return cached
+    try:
+        # Backfill runs (see replay.py) are cached per pinned time
+        output = _tool_cache.get_or_compute(("rss", rss_feed_url, as_of()), lambda: _read_feed(rss_feed_url))
+    except Exception as e:
+        return f"Error reading RSS feed {rss_feed_url} after {MAX_RETRIES} attempts: {e}"
+    # The run has read the feed (possibly from a daemon poll): update its publishing statistics
+    record_read(rss_feed_url)
+    return output
 
-    # Retry logic for failed feeds
-    last_error = None
+
+def _read_feed(rss_feed_url: str) -> str:
+    records = _replay_feed(rss_feed_url) if replaying() else _fetch_feed_records(rss_feed_url)
+    if not records:
+        return f"No recent articles found in {rss_feed_url}"
+
+    # Articles we've already published, then off-topic entries, never reach the agent
+    records = filter_relevant(filter_covered(records), record=not replaying())
+    if not records:
+        return f"No relevant recent articles found in {rss_feed_url}"
+
+    summaries = [
+        f"Title: {r['title'] or 'N/A'}\nLink: {r['link'] or 'N/A'}\nSummary: {r['summary']}"
+        for r in records
+    ]
+    return "\n\n".join(summaries)
+
+
+def _fetch_feed_records(rss_feed_url: str) -> List[dict]:
+    # Retry logic for failed fetches
     for attempt in range(MAX_RETRIES):
         try:
-            feed = feedparser.parse(rss_feed_url)
-
-            # Check if feed parsed successfully
-            if hasattr(feed, 'bozo_exception'):
-                raise feed.bozo_exception
-
-            # Increased from 10 to 15 entries to capture more stories from high-volume feeds
-            # Prevents missing important stories from feeds that publish 20+ articles/day
-            entries = _filter_recent_entries(feed.entries, hours=48)[:15]
-            if not entries:
-                return f"No recent articles found in {rss_feed_url}"
-
-            summaries = [
-                # Truncate summary to 1000 chars to prevent runaway RSS feeds that include full article text
-                # This prevents token overflow while preserving key information
-                f"Title: {e.get('title', 'N/A')}\nLink: {e.get('link', 'N/A')}\nSummary: {BeautifulSoup(e.get('summary', ''), 'lxml').get_text(strip=True)[:1000]}"
-                for e in entries
-            ]
-            output = "\n\n".join(summaries)
-            _set_cached(("rss", rss_feed_url), output)
-            return output
+            # Parsing stops once the feed has more entries inside its window than it can keep
+            window_hours, cap = feed_window(rss_feed_url)
+            feed = _parse_feed(rss_feed_url, since=time.time() - window_hours * 3600, keep=cap)
+            break
+        except Exception:
+            if attempt == MAX_RETRIES - 1:
+                raise
+            time.sleep(RETRY_DELAY)
+
+    # Malformed markup (e.g. an undeclared &nbsp;) parses the same way on every fetch, so it
+    # isn't retried: keep whatever feedparser recovered and only fail if that is nothing
+    if feed.get("bozo"):
+        if not feed.entries:
+            raise feed.get("bozo_exception") or ValueError("Feed could not be parsed")
+        print(f"⚠️ {rss_feed_url} is not well-formed ({feed.get('bozo_exception')}), "
+              f"using the {len(feed.entries)} entries recovered")
+
+    # Window and cap adapt to each feed's publish rate (see feed_selection.py):
+    # high-volume feeds keep more recent items, quiet feeds don't fall back to stale ones
+    entries = select_entries(rss_feed_url, feed.entries, _entry_timestamp)
+
+    # Keep the entries so the daily run can persist them for the weekly recap
+    # (summaries are truncated to 1000 chars to prevent runaway feeds that include full article text)
+    return _record_feed_entries(rss_feed_url, entries)
+
+
+def _replay_feed(rss_feed_url: str) -> List[dict]:
+    """Entries recorded in the archive for a feed, inside its window before the pinned time."""
+    window_hours, cap = feed_window(rss_feed_url)
+    end = as_of()
+    records = feed_entries_between(rss_feed_url, end - window_hours * 3600, end, cap)
+    _feed_entries[(end, rss_feed_url)] = records
+    return records
+
+
+# Tool outputs by (tool, argument). Concurrent calls with the same argument (agent turns,
+# the What's Hot prefetch) share one fetch; failures are not cached.
+_CACHE_TTL_SECONDS = 6 * 60 * 60
+_tool_cache = SingleFlightCache("tools", ttl_seconds=_CACHE_TTL_SECONDS)
 
-        except Exception as e:
-            last_error = e
-            if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
-                continue
 
-    return f"Error reading RSS feed {rss_feed_url} after {MAX_RETRIES} attempts: {last_error}"
+# Feed entries read by rss_tool during this run, keyed by (pinned time or None, feed URL)
+_feed_entries: Dict[Tuple[Optional[float], str], List[dict]] = {}
 
 
-_CACHE_TTL_SECONDS = 6 * 60 * 60
-_cache: Dict[Tuple[str, str], Tuple[float, str]] = {}
-_session = requests.Session()
+def _parse_feed(rss_feed_url: str, since: Optional[float] = None, keep: Optional[int] = None):
+    """
+    Fetch a feed through the shared HTTP client and parse its entries.
 
+    The streaming parser in feed_parser.py reads only the fields we use and stops early
+    (see parse_feed for since and keep); feeds it can't read are parsed with feedparser.
+    """
+    fetched = fetch_feed(rss_feed_url)
+    feed = parse_feed(fetched.body, fetched.url, since=since, keep=keep)
+    if feed is not None:
+        return feed
+    return feedparser.parse(fetched.body, response_headers={
+        "content-location": fetched.url,
+        "content-type": fetched.headers.get("content-type", ""),
+    })
+
+
+def _entry_timestamp(entry) -> float | None:
+    """Publish time of a feedparser entry as a UTC epoch timestamp."""
+    published = entry.get("published_parsed") or entry.get("updated_parsed")
+    return calendar.timegm(published) if published else None
+
+
+def _entry_record(entry, feed_url: str) -> dict:
+    """Plain-dict copy of a feedparser entry with the fields the pipeline uses."""
+    return {
+        "feed": feed_url,
+        "title": entry.get("title", ""),
+        "link": entry.get("link", ""),
+        "summary": strip_html(entry.get("summary", ""))[:1000],
+        "published": _entry_timestamp(entry),
+    }
 
-def _get_cached(key: Tuple[str, str]) -> str | None:
-    cached = _cache.get(key)
-    if not cached:
-        return None
-    timestamp, value = cached
-    if (time.time() - timestamp) > _CACHE_TTL_SECONDS:
-        _cache.pop(key, None)
-        return None
-    return value
 
+def _record_feed_entries(feed_url: str, entries) -> List[dict]:
+    records = [_entry_record(e, feed_url) for e in entries]
+    _feed_entries[(None, feed_url)] = records
+    index_documents(KIND_FEED_ENTRY, [
+        {"url": r["link"], "title": r["title"], "body": r["summary"], "source": feed_url, "published": r["published"]}
+        for r in records
+    ])
+    return records
 
-def _set_cached(key: Tuple[str, str], value: str) -> None:
-    _cache[key] = (time.time(), value)
 
+def get_feed_entries() -> List[dict]:
+    """Return every feed entry rss_tool has read during this run."""
+    pinned = as_of()
+    return [entry for (key, _), entries in list(_feed_entries.items()) if key == pinned for entry in entries]
 
-def _filter_recent_entries(entries, hours: int) -> list:
-    """Filter RSS entries to only include recent ones within specified hours."""
-    cutoff = time.time() - (hours * 60 * 60)
-    recent = []
-    for entry in entries:
-        published = entry.get("published_parsed") or entry.get("updated_parsed")
-        if published:
-            published_ts = time.mktime(published)
-            if published_ts >= cutoff:
-                recent.append(entry)
-    return recent or list(entries)
 
+def fetch_new_entries(rss_feed_url: str, since: float) -> List[dict]:
+    """
+    Fetch entries published after a timestamp, without going through the agent.
 
-def _calculate_similarity(text1: str, text2: str) -> float:
+    Used by the weekly recap to read only what appeared since the last daily run.
+    Entries we've already published are dropped. Returns an empty list if the feed can't be read.
     """
-    Calculate similarity between two texts using a simple word overlap metric.
-    Returns a score between 0 (completely different) and 1 (identical).
+    try:
+        feed = _parse_feed(rss_feed_url, since=since)
+    except Exception as e:
+        print(f"⚠️ Could not read {rss_feed_url}: {e}")
+        return []
+    return filter_covered([
+        _entry_record(entry, rss_feed_url)
+        for entry in feed.entries
+        if (_entry_timestamp(entry) or 0) > since
+    ])
+
+
+def refresh_feed(rss_feed_url: str) -> str:
     """
-    # Simple word-based similarity
-    words1 = set(text1.lower().split())
-    words2 = set(text2.lower().split())
+    Re-fetch a feed and replace its cached rss_tool output (used by the daemon's poller).
+
+    Unlike rss_tool, this doesn't count as a run reading the feed in its statistics.
+    """
+    key = ("rss", rss_feed_url, None)
+    _tool_cache.pop(key)
+    try:
+        return _tool_cache.get_or_compute(key, lambda: _read_feed(rss_feed_url))
+    except Exception as e:
+        return f"Error reading RSS feed {rss_feed_url} after {MAX_RETRIES} attempts: {e}"
+
 
+def _word_similarity(words1: FrozenSet[str], words2: FrozenSet[str]) -> float:
+    """Jaccard similarity of two word sets (0 when either is empty)."""
     if not words1 or not words2:
         return 0.0
+    common = len(words1 & words2)
+    return common / (len(words1) + len(words2) - common)
 
-    intersection = words1.intersection(words2)
-    union = words1.union(words2)
 
-    return len(intersection) / len(union) if union else 0.0
+def _calculate_similarity(text1: str, text2: str) -> float:
+    """
+    Calculate similarity between two texts using a simple word overlap metric.
+    Returns a score between 0 (completely different) and 1 (identical).
+    """
+    # Simple word-based similarity
+    return _word_similarity(frozenset(text1.lower().split()), frozenset(text2.lower().split()))
 
 
 # =============================================================================
@@ -200,6 +315,27 @@ EVENT_PATTERNS = {
 }
 
 
+# Defaults used when config.yml has no 'dedup' section (tune with python -m ai.src.dedup_tuning)
+DEFAULT_DEDUP = {
+    "word_threshold": 0.3,          # word similarity that confirms an entity match
+    "embedding_threshold": 0.8,     # embedding similarity that confirms an entity match
+    "word_only_threshold": 0.6,     # word similarity that makes a duplicate without an entity match
+    "safety_net_threshold": 0.9,    # word similarity for the within-edition pass after the editor
+}
+
+_dedup_settings = dict(DEFAULT_DEDUP)
+
+
+def configure_dedup(config: Dict) -> None:
+    """Apply the 'dedup' section of config.yml."""
+    _dedup_settings.update(config.get("dedup") or {})
+
+
+def dedup_settings() -> Dict:
+    """Current dedup thresholds."""
+    return dict(_dedup_settings)
+
+
 def _extract_entities(text: str) -> Dict[str, Set[str]]:
     """
     Extract key entities from text: companies and event types.
@@ -263,72 +399,124 @@ def _entities_overlap(entities1: Dict[str, Set[str]], entities2: Dict[str, Set[s
     return False, "No significant entity overlap", False
 
 
-# Embedding cache to avoid redundant API calls
-_embedding_cache: Dict[str, List[float]] = {}
-_openai_client: Optional[OpenAI] = None
-
+class StoryRecord:
+    """
+    A story with the features dedup compares, each computed once on first use.
 
-def _get_openai_client() -> OpenAI:
-    """Get or create OpenAI client."""
-    global _openai_client
-    if _openai_client is None:
-        _openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    return _openai_client
+    Pairwise checks then come down to set intersections and, for dense embedding
+    backends, a dot product of unit vectors.
 
+    Args:
+        story: Story dict ('title' and 'body' or 'summary')
+        text: Comparison text (defaults to title + body/summary)
+    """
 
-def _get_embedding(text: str) -> List[float]:
+    __slots__ = ("story", "text", "_lower", "_words", "_entities", "_embedding")
+
+    def __init__(self, story: Dict, text: Optional[str] = None):
+        self.story = story
+        self.text = text if text is not None else story.get('title', '') + ' ' + story.get('body', story.get('summary', ''))
+        self._lower = None
+        self._words = None
+        self._entities = None
+        self._embedding = None
+
+    @classmethod
+    def of(cls, item: Union["StoryRecord", Dict, str]) -> "StoryRecord":
+        """Record for a story dict or plain text (records are returned as they are)."""
+        if isinstance(item, StoryRecord):
+            return item
+        if isinstance(item, str):
+            return cls({}, text=item)
+        return cls(item)
+
+    @property
+    def title(self) -> str:
+        return self.story.get('title', '')
+
+    @property
+    def lower(self) -> str:
+        if self._lower is None:
+            self._lower = self.text.lower()
+        return self._lower
+
+    @property
+    def words(self) -> FrozenSet[str]:
+        """Lowercased words, as compared by _calculate_similarity."""
+        if self._words is None:
+            self._words = frozenset(self.lower.split())
+        return self._words
+
+    @property
+    def entities(self) -> Dict[str, Set[str]]:
+        """Companies and event types (see _extract_entities)."""
+        if self._entities is None:
+            self._entities = _extract_entities(self.text)
+        return self._entities
+
+    def embedding(self) -> Optional[np.ndarray]:
+        """
+        Unit-length embedding from the configured backend, or None when the backend failed
+        or produces sparse vectors (those are compared pairwise by text_similarity instead).
+        """
+        if self._embedding is None:
+            if backend_failed():
+                return None
+            self._embedding = False
+            backend = get_backend()
+            try:
+                vector = backend.embed([self.text])[0]
+            except EmbeddingError as e:
+                record_failure(backend.name, e)
+                return None
+            if not isinstance(vector, dict):
+                array = np.asarray(vector, dtype=float)
+                norm = np.linalg.norm(array)
+                if norm:
+                    self._embedding = array / norm
+        return self._embedding if self._embedding is not False else None
+
+
+def embed_stories(stories: list) -> Dict[str, List[float]]:
     """
-    Get embedding vector for text using OpenAI's text-embedding-3-small.
-    Uses caching to avoid redundant API calls.
+    Embedding for each story (title + body), keyed by title, in one batched call.
+    Returns {} if the backend is unavailable, so callers fall back to word similarity.
     """
-    # Create a cache key from first 500 chars (sufficient for dedup purposes)
-    cache_key = text[:500]
-
-    if cache_key in _embedding_cache:
-        return _embedding_cache[cache_key]
-
+    titles = [story.get('title', '') for story in stories]
+    texts = [story.get('title', '') + ' ' + story.get('body', story.get('summary', '')) for story in stories]
+    if not texts or backend_failed():
+        return {}
+    backend = get_backend()
     try:
-        client = _get_openai_client()
-        response = client.embeddings.create(
-            model="text-embedding-3-small",
-            input=text[:8000]  # Model limit is 8191 tokens
-        )
-        embedding = response.data[0].embedding
-        _embedding_cache[cache_key] = embedding
-        return embedding
-    except Exception as e:
-        print(f"⚠️ Embedding API error: {e}")
-        return []
+        vectors = backend.vectors(texts)
+    except EmbeddingError as e:
+        record_failure(backend.name, e)
+        return {}
+    return {title: vector for title, vector in zip(titles, vectors) if vector}
 
 
-def _cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
-    """Calculate cosine similarity between two vectors."""
-    if not vec1 or not vec2 or len(vec1) != len(vec2):
-        return 0.0
-
-    dot_product = sum(a * b for a, b in zip(vec1, vec2))
-    magnitude1 = sum(a * a for a in vec1) ** 0.5
-    magnitude2 = sum(b * b for b in vec2) ** 0.5
+def _calculate_embedding_similarity(text1: str, text2: str) -> Tuple[float, str]:
+    """Calculate semantic similarity using embeddings. Returns (similarity, backend used)."""
+    return text_similarity(text1, text2)
 
-    if magnitude1 == 0 or magnitude2 == 0:
-        return 0.0
 
-    return dot_product / (magnitude1 * magnitude2)
-
-
-def _calculate_embedding_similarity(text1: str, text2: str) -> float:
-    """Calculate semantic similarity using embeddings."""
-    emb1 = _get_embedding(text1)
-    emb2 = _get_embedding(text2)
-    return _cosine_similarity(emb1, emb2)
+def _record_embedding_similarity(record1: StoryRecord, record2: StoryRecord) -> Tuple[float, str]:
+    """Embedding similarity of two records from their cached vectors, falling back to text_similarity."""
+    vec1, vec2 = record1.embedding(), record2.embedding()
+    if vec1 is None or vec2 is None:
+        return _calculate_embedding_similarity(record1.text, record2.text)
+    return float(vec1 @ vec2), get_backend().name
 
 
 def is_duplicate_hybrid(
-    story1_text: str,
-    story2_text: str,
-    word_threshold: float = 0.3,
-    embedding_threshold: float = 0.8,
-    use_embeddings: bool = True
+    story1_text: Union[str, StoryRecord],
+    story2_text: Union[str, StoryRecord],
+    word_threshold: Optional[float] = None,
+    embedding_threshold: Optional[float] = None,
+    use_embeddings: bool = True,
+    local_similarity: Optional[float] = None,
+    embedding_similarity: Optional[float] = None,
+    word_only_threshold: Optional[float] = None
 ) -> Tuple[bool, Dict]:
     """
     Hybrid duplicate detection combining entities, word similarity, and embeddings.
@@ -339,16 +527,26 @@ def is_duplicate_hybrid(
     - MEDIUM CONFIDENCE: If entities match, check word OR embedding similarity
     - LOW/NO MATCH: Use strict word-only threshold (60%)
 
+    Thresholds left as None come from the 'dedup' section of config.yml.
+
     Args:
-        story1_text: Full text of first story (title + body)
-        story2_text: Full text of second story (title + body)
+        story1_text: Full text of first story (title + body), or its StoryRecord
+        story2_text: Full text of second story (title + body), or its StoryRecord
         word_threshold: Jaccard similarity threshold when entities match (medium confidence)
         embedding_threshold: Cosine similarity threshold when entities match
         use_embeddings: Whether to use embedding similarity (can disable for speed)
+        local_similarity: Precomputed local n-gram similarity; below the shortlist
+            threshold the embedding check is skipped
+        embedding_similarity: Precomputed embedding similarity (e.g. from the history index)
+        word_only_threshold: Jaccard similarity threshold when entities don't match
 
     Returns:
         Tuple of (is_duplicate: bool, debug_info: dict)
     """
+    word_threshold = _dedup_settings["word_threshold"] if word_threshold is None else word_threshold
+    embedding_threshold = _dedup_settings["embedding_threshold"] if embedding_threshold is None else embedding_threshold
+    word_only_threshold = _dedup_settings["word_only_threshold"] if word_only_threshold is None else word_only_threshold
+
     debug_info = {
         "entities1": {},
         "entities2": {},
@@ -357,12 +555,16 @@ def is_duplicate_hybrid(
         "entity_reason": "",
         "word_similarity": 0.0,
         "embedding_similarity": None,
+        "embedding_backend": None,
         "decision_reason": ""
     }
 
+    # Features are cached on the records, so repeated comparisons don't recompute them
+    record1, record2 = StoryRecord.of(story1_text), StoryRecord.of(story2_text)
+
     # Step 1: Extract entities
-    entities1 = _extract_entities(story1_text)
-    entities2 = _extract_entities(story2_text)
+    entities1 = record1.entities
+    entities2 = record2.entities
     debug_info["entities1"] = {k: list(v) for k, v in entities1.items()}
     debug_info["entities2"] = {k: list(v) for k, v in entities2.items()}
 
@@ -373,7 +575,7 @@ def is_duplicate_hybrid(
     debug_info["entity_reason"] = entity_reason
 
     # Step 3: Calculate word similarity
-    word_sim = _calculate_similarity(story1_text, story2_text)
+    word_sim = _word_similarity(record1.words, record2.words)
     debug_info["word_similarity"] = round(word_sim, 3)
 
     # HIGH CONFIDENCE: Entity match alone is sufficient
@@ -384,7 +586,7 @@ def is_duplicate_hybrid(
 
     # If no entity match, use stricter word-only threshold (original behavior)
     if not entity_match:
-        if word_sim > 0.6:  # Original threshold
+        if word_sim > word_only_threshold:
             debug_info["decision_reason"] = f"No entity match, but high word similarity ({word_sim:.1%})"
             return True, debug_info
         debug_info["decision_reason"] = f"No entity match, low word similarity ({word_sim:.1%})"
@@ -398,9 +600,18 @@ def is_duplicate_hybrid(
         return True, debug_info
 
     # Check embedding similarity if enabled
+    # Pairs the local n-gram pass already finds unrelated don't need an embeddings call
+    if use_embeddings and local_similarity is not None and local_similarity < shortlist_threshold():
+        record_shortlist_skip()
+        use_embeddings = False
+
     if use_embeddings:
-        emb_sim = _calculate_embedding_similarity(story1_text, story2_text)
+        if embedding_similarity is not None:
+            emb_sim, backend = embedding_similarity, "history_index"
+        else:
+            emb_sim, backend = _record_embedding_similarity(record1, record2)
         debug_info["embedding_similarity"] = round(emb_sim, 3)
+        debug_info["embedding_backend"] = backend
 
         if emb_sim > embedding_threshold:
             debug_info["decision_reason"] = f"Entity match + embedding similarity ({emb_sim:.1%} > {embedding_threshold:.0%})"
@@ -413,30 +624,22 @@ def is_duplicate_hybrid(
 def deduplicate_stories(stories: list, similarity_threshold: float = 0.4) -> list:
     """
     Remove duplicate or highly similar stories from a list.
-    Each story should be a dict with 'title' and optionally 'summary' or 'body'.
-    Returns deduplicated list of stories.
+    Each story should be a dict with 'title' and optionally 'summary' or 'body', or a StoryRecord.
+    Returns deduplicated list of stories (the items passed in).
     """
     if not stories:
         return []
 
     deduplicated = []
-    seen_content = []
+    seen_words = []
 
     for story in stories:
-        # Combine title and body/summary for comparison
-        story_text = story.get('title', '') + ' ' + story.get('body', story.get('summary', ''))
+        words = StoryRecord.of(story).words
 
         # Check against already seen stories
-        is_duplicate = False
-        for seen in seen_content:
-            similarity = _calculate_similarity(story_text, seen)
-            if similarity > similarity_threshold:
-                is_duplicate = True
-                break
-
-        if not is_duplicate:
+        if not any(_word_similarity(words, seen) > similarity_threshold for seen in seen_words):
             deduplicated.append(story)
-            seen_content.append(story_text)
+            seen_words.append(words)
 
     return deduplicated
 
@@ -444,10 +647,11 @@ def deduplicate_stories(stories: list, similarity_threshold: float = 0.4) -> lis
 def filter_against_history(
     new_stories: list,
     historical_stories: list,
-    similarity_threshold: float = 0.6,
+    similarity_threshold: Optional[float] = None,
     use_hybrid: bool = True,
     use_embeddings: bool = True,
-    verbose: bool = False
+    verbose: bool = False,
+    use_history_index: bool = False
 ) -> Tuple[list, list]:
     """
     Filter out stories that are too similar to historical coverage.
@@ -457,54 +661,83 @@ def filter_against_history(
     (e.g., "Capital One acquires Brex" written differently by two sources).
 
     Args:
-        new_stories: List of story dicts to filter (today's stories)
-        historical_stories: List of story dicts to compare against (recent coverage)
+        new_stories: List of story dicts or StoryRecords to filter (today's stories)
+        historical_stories: List of story dicts or StoryRecords to compare against (recent coverage)
         similarity_threshold: Jaccard similarity threshold (0-1) for word-only mode.
-            Default 0.6. Ignored when use_hybrid=True.
+            Defaults to dedup.word_only_threshold. Ignored when use_hybrid=True.
         use_hybrid: Use hybrid detection (entities + words + embeddings). Default True.
         use_embeddings: Include embedding similarity in hybrid mode. Default True.
         verbose: Print detailed matching info for debugging. Default False.
+        use_history_index: Check each story against its nearest published neighbours from the
+            history index (see history_index.py), covering its whole lookback window.
+            historical_stories are then only compared when the index can't answer (empty,
+            or the stories can't be embedded). Hybrid mode only. Default False.
 
     Returns:
         Tuple of (filtered_stories, removed_stories_with_reasons)
-        - filtered_stories: Stories that are NOT duplicates
+        - filtered_stories: Stories that are NOT duplicates (the items passed in)
         - removed_stories: List of dicts with 'story' and 'reason' for each removed story
     """
     if not new_stories:
         return [], []
+    if similarity_threshold is None:
+        similarity_threshold = _dedup_settings["word_only_threshold"]
 
-    if not historical_stories:
+    # Each story's words, entities and embedding are computed once, however many pairs it is in
+    new_records = [StoryRecord.of(s) for s in new_stories]
+    new_texts = [record.text for record in new_records]
+
+    # Nearest published neighbours per new story, from the whole lookback window; when the
+    # index answers they are the only candidates, otherwise every historical story is compared
+    neighbours = find_neighbours(new_texts) if use_hybrid and use_history_index else None
+    if neighbours is not None:
+        historical_stories = []
+
+    if not historical_stories and not neighbours:
         return new_stories, []
 
-    # Pre-compute text representations for historical stories
-    historical_texts = []
-    for story in historical_stories:
-        text = story.get('title', '') + ' ' + story.get('body', story.get('summary', ''))
-        historical_texts.append(text)
+    historical_records = [StoryRecord.of(s) for s in historical_stories]
+    historical_texts = [record.text for record in historical_records]
 
     filtered = []
     removed = []
 
-    for story in new_stories:
-        story_text = story.get('title', '') + ' ' + story.get('body', story.get('summary', ''))
-        story_title = story.get('title', 'Untitled')
+    # Cheap first pass: local n-gram similarity of every new/historical pair
+    shortlist = None
+    if use_hybrid and use_embeddings and historical_texts:
+        shortlist = shortlist_similarities(new_texts, historical_texts)
+
+    for row, story in enumerate(new_stories):
+        record = new_records[row]
+        story_title = record.title or 'Untitled'
 
         is_duplicate = False
         duplicate_reason = ""
 
-        for i, historical_text in enumerate(historical_texts):
+        # Candidates: (historical record, local similarity, embedding similarity)
+        candidates = [
+            (historical_record, float(shortlist[row, i]) if shortlist is not None else None, None)
+            for i, historical_record in enumerate(historical_records)
+        ]
+        if neighbours:
+            candidates += [
+                (StoryRecord(neighbour, neighbour.get('title', '') + ' ' + neighbour.get('body', '')), None, similarity)
+                for neighbour, similarity in neighbours[row]
+            ]
+
+        for historical_record, local_sim, emb_sim in candidates:
             if use_hybrid:
                 # Use hybrid detection
                 is_dup, debug_info = is_duplicate_hybrid(
-                    story_text,
-                    historical_text,
-                    word_threshold=0.3,
-                    embedding_threshold=0.8,
-                    use_embeddings=use_embeddings
+                    record,
+                    historical_record,
+                    use_embeddings=use_embeddings,
+                    local_similarity=local_sim,
+                    embedding_similarity=emb_sim
                 )
                 if is_dup:
                     is_duplicate = True
-                    historical_title = historical_stories[i].get('title', 'Unknown')
+                    historical_title = historical_record.title or 'Unknown'
                     duplicate_reason = f"Matched '{historical_title[:50]}...' - {debug_info['decision_reason']}"
                     if verbose:
                         print(f"  🔴 DUPLICATE: {story_title[:40]}...")
@@ -514,10 +747,10 @@ def filter_against_history(
                     break
             else:
                 # Original word-only detection
-                similarity = _calculate_similarity(story_text, historical_text)
+                similarity = _word_similarity(record.words, historical_record.words)
                 if similarity > similarity_threshold:
                     is_duplicate = True
-                    historical_title = historical_stories[i].get('title', 'Unknown')
+                    historical_title = historical_record.title or 'Unknown'
                     duplicate_reason = f"Word similarity {similarity:.1%} with '{historical_title[:50]}...'"
                     break
 
@@ -0,0 +1,162 @@
+# ai/src/validation.py
+# Rule-based checks for Writer drafts, run BEFORE the LLM Editor.
+# Anything that rules can verify (JSON shape, story count, lengths, source URLs)
+# is checked here for free, so the Editor only runs on structurally valid drafts.
+
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+# Rule presets for each newsletter format
+# Sentence ranges mirror the Writer prompts (daily: 3-4 sentences, weekly recap: 6-8)
+DAILY_RULES = {
+    "min_news": 5,
+    "max_news": 5,
+    "min_sentences": 3,
+    "max_sentences": 4,
+    "max_title_words": 18,
+    "max_body_chars": 1200,
+}
+
+WEEKLY_RULES = {
+    "min_news": 3,
+    "max_news": 5,
+    "min_sentences": 6,
+    "max_sentences": 8,
+    "max_title_words": 18,
+    "max_body_chars": 2400,
+}
+
+# Abbreviations that end with a period but do not end a sentence
+_ABBREVIATIONS = {
+    "u.s", "u.k", "e.u", "inc", "corp", "ltd", "co", "plc", "vs", "e.g", "i.e",
+    "mr", "mrs", "ms", "dr", "st", "jr", "sr", "no", "approx", "est",
+}
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])["”\')\]]*\s+(?=["“\'(\[]?[A-Z0-9$€£])')
+
+
+def clean_json_output(text: str) -> str:
+    """Strip markdown code fences that the LLM sometimes wraps around JSON output."""
+    return text.strip().replace("```json", "").replace("```", "").strip()
+
+
+def count_sentences(text: str) -> int:
+    """
+    Count sentences in a story body.
+
+    Splits on terminal punctuation followed by a capitalised word, skipping common
+    abbreviations (U.S., Inc., e.g.) and decimal amounts ($1.2bn) so they don't inflate the count.
+    """
+    text = text.strip()
+    if not text:
+        return 0
+
+    count = 1
+    for match in _SENTENCE_END.finditer(text):
+        preceding = text[:match.start()].rstrip('"”\')]')
+        last_word = preceding.split()[-1].rstrip('.!?').lower() if preceding.split() else ""
+        if last_word in _ABBREVIATIONS:
+            continue
+        count += 1
+    return count
+
+
+def is_valid_url(url: str) -> bool:
+    """Check that a URL is absolute http(s) with a plausible host."""
+    if not isinstance(url, str) or not url.strip():
+        return False
+    parsed = urlparse(url.strip())
+    return parsed.scheme in ("http", "https") and "." in parsed.netloc and " " not in url.strip()
+
+
+def _validate_story(index: int, story, rules: Dict) -> List[str]:
+    """Return rule violations for a single news item."""
+    label = f"news[{index}]"
+    if not isinstance(story, dict):
+        return [f"{label} must be an object with title, body and source"]
+
+    issues = []
+    title = story.get("title")
+    body = story.get("body")
+    source = story.get("source")
+
+    if not isinstance(title, str) or not title.strip():
+        issues.append(f"{label} is missing a title")
+    elif len(title.split()) > rules["max_title_words"]:
+        issues.append(f"{label} title has {len(title.split())} words (max {rules['max_title_words']})")
+
+    if not isinstance(body, str) or not body.strip():
+        issues.append(f"{label} is missing a body")
+    else:
+        sentences = count_sentences(body)
+        if not rules["min_sentences"] <= sentences <= rules["max_sentences"]:
+            issues.append(
+                f"{label} body has {sentences} sentences "
+                f"(expected {rules['min_sentences']}-{rules['max_sentences']})"
+            )
+        if len(body) > rules["max_body_chars"]:
+            issues.append(f"{label} body is {len(body)} characters (max {rules['max_body_chars']})")
+
+    if not isinstance(source, dict):
+        issues.append(f"{label} source must be an object with 'name' and 'url'")
+    else:
+        if not str(source.get("name", "")).strip():
+            issues.append(f"{label} source is missing a name")
+        if not is_valid_url(source.get("url", "")):
+            issues.append(f"{label} source url is missing or malformed: {source.get('url', '')!r}")
+
+    return issues
+
+
+def validate_newsletter(output_text: str, rules: Dict = DAILY_RULES) -> Tuple[Optional[dict], List[str]]:
+    """
+    Validate a Writer draft against the newsletter schema and editorial limits.
+
+    Args:
+        output_text: Raw Writer output (may be wrapped in markdown code fences)
+        rules: Limits to enforce (DAILY_RULES or WEEKLY_RULES)
+
+    Returns:
+        Tuple of (parsed_json, issues)
+        - parsed_json: The parsed draft, or None if it is not valid JSON
+        - issues: Human-readable rule violations (empty list means the draft is valid)
+    """
+    try:
+        output_json = json.loads(clean_json_output(output_text))
+    except (json.JSONDecodeError, AttributeError, TypeError) as e:
+        return None, [f"Output is not valid JSON: {e}"]
+
+    if not isinstance(output_json, dict):
+        return None, ["Output must be a JSON object with 'news', 'perspective' and 'curiosity'"]
+
+    issues = []
+
+    news = output_json.get("news")
+    if not isinstance(news, list):
+        issues.append("'news' must be a list of stories")
+    else:
+        if not rules["min_news"] <= len(news) <= rules["max_news"]:
+            expected = (
+                str(rules["min_news"]) if rules["min_news"] == rules["max_news"]
+                else f"{rules['min_news']}-{rules['max_news']}"
+            )
+            issues.append(f"Expected {expected} news items, got {len(news)}")
+        for i, story in enumerate(news):
+            issues.extend(_validate_story(i, story, rules))
+
+    perspective = output_json.get("perspective")
+    if not isinstance(perspective, str) or not perspective.strip():
+        issues.append("'perspective' is missing or empty")
+
+    curiosity = output_json.get("curiosity")
+    if not isinstance(curiosity, dict) or not str(curiosity.get("text", "")).strip():
+        issues.append("'curiosity' must be an object with a non-empty 'text'")
+
+    return output_json, issues
+
+
+def format_issues_for_prompt(issues: List[str]) -> str:
+    """Format validation issues as feedback for a Writer retry."""
+    return "\n".join(f"- {issue}" for issue in issues)
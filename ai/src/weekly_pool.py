@@ -0,0 +1,141 @@
+# ai/src/weekly_pool.py
+# Per-week aggregate of the daily runs' research artifacts.
+#
+# Each daily run saves its candidate pool (parsed stories with scores and embeddings,
+# What's Hot items, raw feed entries) under ai/runs/weekly_pool/<ISO week>/<date>.json.
+# The weekly recap builds from that pool plus the feed entries published since the
+# last daily run, instead of re-crawling every feed with a fresh researcher agent.
+
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .checkpoints import RUNS_DIR
+
+POOL_DIR = os.path.join(RUNS_DIR, "weekly_pool")
+
+# Embeddings are rounded before saving to keep the pool files small
+EMBEDDING_PRECISION = 5
+
+
+def week_key(run_date: datetime) -> str:
+    """ISO week identifier, e.g. '2026-W42'."""
+    year, week, _ = run_date.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def save_daily_pool(
+    run_date: datetime,
+    stories: List[dict],
+    whats_hot: List[dict],
+    feed_entries: List[dict],
+    published_urls: List[str],
+    embeddings: Optional[Dict[str, List[float]]] = None
+) -> str:
+    """
+    Save one day's candidate pool into this week's aggregate.
+
+    Args:
+        run_date: Date of the daily run
+        stories: Parsed Researcher stories (title, body, source_url, score, ...)
+        whats_hot: Parsed What's Hot items
+        feed_entries: Feed entries read by rss_tool during the run
+        published_urls: Source URLs of the stories that made it into the newsletter
+        embeddings: Optional map of story title -> embedding vector
+
+    Returns:
+        Path of the saved pool file
+    """
+    embeddings = embeddings or {}
+    pool_stories = []
+    for story in stories:
+        record = dict(story)
+        record["published"] = story.get("source_url", "") in published_urls
+        vector = embeddings.get(story.get("title", ""))
+        if vector:
+            record["embedding"] = [round(v, EMBEDDING_PRECISION) for v in vector]
+        pool_stories.append(record)
+
+    week_dir = os.path.join(POOL_DIR, week_key(run_date))
+    os.makedirs(week_dir, exist_ok=True)
+    path = os.path.join(week_dir, f"{run_date.strftime('%Y-%m-%d')}.json")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({
+            "date": run_date.strftime("%Y-%m-%d"),
+            "fetched_at": time.time(),
+            "stories": pool_stories,
+            "whats_hot": whats_hot,
+            "feed_entries": feed_entries,
+        }, f)
+    os.replace(tmp_path, path)
+    print(f"📦 Saved daily candidate pool ({len(pool_stories)} stories, {len(feed_entries)} feed entries) to {path}")
+    return path
+
+
+def load_week_pool(run_date: datetime) -> List[dict]:
+    """Load every daily pool saved so far in the week of run_date, oldest first."""
+    week_dir = os.path.join(POOL_DIR, week_key(run_date))
+    if not os.path.isdir(week_dir):
+        return []
+
+    days = []
+    for name in sorted(os.listdir(week_dir)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(week_dir, name), 'r') as f:
+                days.append(json.load(f))
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ Skipping unreadable pool file {name}: {e}")
+    return days
+
+
+def last_fetch_time(days: List[dict]) -> float:
+    """Timestamp of the most recent daily run in the pool (0 if none)."""
+    return max((day.get("fetched_at", 0) for day in days), default=0)
+
+
+def format_pool_for_prompt(days: List[dict], new_entries: List[dict]) -> str:
+    """
+    Format the week's unpublished candidates and the new feed entries for the weekly researcher.
+
+    Stories already published are left out (they appear in the "already covered" list).
+    Raw feed entries from the daily runs are not included; they only mark which new
+    entries the daily runs already saw, so those are left out too.
+    """
+    sections = []
+
+    for day in days:
+        candidates = [s for s in day.get("stories", []) if not s.get("published")]
+        if not candidates:
+            continue
+        sections.append(f"\n**Candidates researched on {day.get('date', 'Unknown')} (not published):**")
+        for story in sorted(candidates, key=lambda s: s.get("score") or 0, reverse=True):
+            score = f" [score {story['score']}/30]" if story.get("score") else ""
+            sections.append(f"---\nTITLE: {story.get('title', 'Untitled')}{score}")
+            sections.append(f"Source: {story.get('source_name', '')} - {story.get('source_url', '')}")
+            sections.append(f"Summary: {story.get('body', '')}")
+            if story.get("contrarian_take"):
+                sections.append(f"Contrarian take: {story['contrarian_take']}")
+            if story.get("second_order_effects"):
+                sections.append(f"Second-order effects: {story['second_order_effects']}")
+
+    whats_hot = [item for day in days for item in day.get("whats_hot", [])]
+    if whats_hot:
+        sections.append("\n**What's Hot items found this week:**")
+        for item in whats_hot:
+            sections.append(f"  - {item.get('company', '')} {item.get('description', '')} ({item.get('source_url', '')})")
+
+    seen_links = {entry.get("link") for day in days for entry in day.get("feed_entries", [])}
+    fresh = [entry for entry in new_entries if entry.get("link") not in seen_links]
+    if fresh:
+        sections.append("\n**New feed entries since the last daily run:**")
+        for entry in fresh:
+            sections.append(f"---\nTitle: {entry.get('title', 'N/A')}\nLink: {entry.get('link', 'N/A')}\nSummary: {entry.get('summary', '')}")
+
+    if not sections:
+        return "No candidate stories available from this week's daily runs."
+    return "\n".join(sections)
@@ -6,21 +6,35 @@ __import__('pysqlite3')
 import sys
 sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
 
+import argparse
 import yaml
-import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain.agents import create_openai_functions_agent, AgentExecutor
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from supabase import create_client
 
 # Import our custom tools
-from .tools import search_tool, scrape_tool, rss_tool, deduplicate_stories
+from .tools import (
+    search_tool, scrape_tool, rss_tool, archive_search_tool, deduplicate_stories, fetch_new_entries, get_feed_entries,
+    dedup_settings
+)
 
 # Import helper functions from main
-from .main import format_trends_for_prompt
+from .main import format_trends_for_prompt, write_run_stats, configure_pipeline, CONFIG_PATH
+from .archive import index_published_stories
+from .publish import publish_edition
+from .llm_clients import chat_model
+from .coverage import mark_published_stories
+from .history_index import add_published_stories
+from .run_deadline import configure_deadline, out_of_time
+from .profiling import enable_profiling, finish_profiling, profile_tools
+from .checkpoints import RunCheckpoint, WEEKLY_STAGES
+from .clustering import cluster_stories, format_clusters_for_prompt, MAX_CLUSTERS
+from .weekly_pool import load_week_pool, last_fetch_time, format_pool_for_prompt
+from .research import build_researcher, run_researcher, load_research_budget
+from .validation import validate_newsletter, format_issues_for_prompt, WEEKLY_RULES
 
 def get_week_stories(days_back: int = 7):
     """
@@ -104,8 +118,15 @@ def format_weekly_stories_for_prompt(weekly_stories):
 
     return "\n".join(formatted)
 
-def main():
-    """Generate weekly recap newsletter with extended analysis."""
+def main(resume_from: str | None = None, profile: bool = False, ready_by: str | None = None):
+    """
+    Generate weekly recap newsletter with extended analysis.
+
+    Args:
+        resume_from: Optional stage name; earlier stages are reloaded from today's checkpoints
+        profile: Profile each stage and tool call into the run directory (see profiling.py)
+        ready_by: Optional "HH:MM" the recap must be ready by (overrides deadline.ready_by)
+    """
     load_dotenv()
 
     print("\n" + "="*60)
@@ -113,15 +134,32 @@ def main():
     print("="*60 + "\n")
 
     # 1. Load Configuration
-    with open('ai/config.yml', 'r') as file:
+    with open(CONFIG_PATH, 'r') as file:
         config = yaml.safe_load(file)
 
+    # Run deadline split into stage budgets: stages shrink their work instead of running late
+    configure_deadline(config, "weekly", WEEKLY_STAGES, ready_by)
+
+    # Shared clients, caches and filters, configured as for the daily run
+    llm_cache = configure_pipeline(config)
+
+    # Every stage is checkpointed so a late failure can resume with --resume-from <stage>
+    checkpoint = RunCheckpoint("weekly", WEEKLY_STAGES, CONFIG_PATH, resume_from=resume_from)
+    if profile:
+        enable_profiling(checkpoint.run_dir)
+
     # Get current date
     current_date = datetime.now().strftime("%B %d, %Y")
 
     # Get all stories from this week
     weekly_stories = get_week_stories(days_back=7)
+    # The researcher needs every title to reject duplicates; the Writer gets the week grouped into
+    # themes so its prompt stays the same size however many stories ran (a short week is the plain list)
     weekly_stories_formatted = format_weekly_stories_for_prompt(weekly_stories)
+    if len(weekly_stories) > MAX_CLUSTERS:
+        weekly_themes_formatted = format_clusters_for_prompt(cluster_stories(weekly_stories))
+    else:
+        weekly_themes_formatted = weekly_stories_formatted
 
     # Format trends
     current_trends = config.get('current_trends', [])
@@ -131,8 +169,8 @@ def main():
     news_sources_str = "\n".join([f"- {s['url']} ({s['topic']})" for s in config['newsletters']])
 
     # 2. Initialize LLM and tools
-    llm = ChatOpenAI(model="gpt-4o", temperature=0.3)
-    tools = [search_tool, scrape_tool, rss_tool]
+    llm = chat_model("gpt-4o", temperature=0.3)
+    tools = profile_tools([search_tool, scrape_tool, rss_tool, archive_search_tool])
 
     # 3. Create Researcher Agent for finding this week's best new stories
     researcher_prompt = ChatPromptTemplate.from_messages([
@@ -180,6 +218,10 @@ If we already covered "Flutterwave Acquires Mono":
 Sources to check:
 {news_sources_str}
 
+Call rss_tool for several sources in the same step (parallel tool calls) rather than one at a time.
+Use archive_search_tool to check earlier coverage of a company or topic before reaching for search_tool.
+If a tool replies that the research budget is used up, stop gathering and write your answer.
+
 Current industry trends for context:
 {trends_context}
 
@@ -209,8 +251,9 @@ Return 3-5 stories maximum. Quality over quantity."""),
         MessagesPlaceholder(variable_name="agent_scratchpad"),
     ])
 
-    researcher_agent = create_openai_functions_agent(llm, tools, researcher_prompt)
-    researcher_executor = AgentExecutor(agent=researcher_agent, tools=tools, verbose=True)
+    researcher_executor, candidate_budget = build_researcher(
+        llm, tools, researcher_prompt, load_research_budget(config)
+    )
 
     # 4. Create Writer Agent for weekly recap format
     writer_prompt = ChatPromptTemplate.from_messages([
@@ -220,6 +263,9 @@ CONTEXT:
 - Today: {current_date} (Friday)
 - This week was SLOWER for breaking news
 - We're sending a recap because we only sent 1-3 daily newsletters this week
+- This week's coverage so far (use these themes to connect the recap to what readers already saw):
+
+{weekly_themes_formatted}
 
 **🚨 CRITICAL: FINAL ANTI-DUPLICATION CHECK 🚨**
 
@@ -314,40 +360,34 @@ Return ONLY the JSON, no markdown formatting."""),
         ("user", "Here are this week's stories to analyze:\n\n{input}"),
     ])
 
-    writer_llm = ChatOpenAI(model="gpt-4o-mini-2024-07-18", temperature=0.1)
+    writer_llm = chat_model("gpt-4o-mini-2024-07-18", temperature=0.1)
     writer_chain = writer_prompt | writer_llm
 
     # 5. Create Editor for quality control
-    editor_llm = ChatOpenAI(model="gpt-4o-mini-2024-07-18", temperature=0)
+    editor_llm = chat_model("gpt-4o-mini-2024-07-18", temperature=0)
 
     editor_prompt = ChatPromptTemplate.from_messages([
         ("system", f"""You are the senior editor reviewing a WEEKLY RECAP newsletter.
 
 This is different from the daily newsletter - it's a Friday recap for slower weeks with EXTENDED ANALYSIS.
 
-WEEKLY RECAP QUALITY CHECKS:
+The draft has already passed automated checks for JSON structure, story count (3-5),
+story length (6-8 sentences), required fields and source URLs. Do NOT re-check those.
 
-1. **Story Length:**
-   - Each story should be 6-8 sentences (count them!)
-   - If shorter, it's not meeting recap standards
+WEEKLY RECAP QUALITY CHECKS:
 
-2. **Extended Analysis:**
+1. **Extended Analysis:**
    - Stories should have: facts, why it matters, competitive dynamics, forward look
    - Not just breaking news summary
 
-3. **Forward-Looking:**
+2. **Forward-Looking:**
    - Each story should have "what to watch next" angle
    - Perspective should preview next week
 
-4. **Intro Framing:**
+3. **Intro Framing:**
    - Should acknowledge slower week
    - Set appropriate expectations (analysis over breaking news)
 
-5. **Completeness:**
-   - 3-5 stories (quality over quantity for slow weeks)
-   - All required fields present
-   - Proper JSON formatting
-
 RETURN FORMAT:
 
 If passes all checks:
@@ -365,26 +405,90 @@ Be thorough but fair."""),
     editor_chain = editor_prompt | editor_llm
 
     # 6. Run the pipeline
-    print("\n--- Starting Researcher Agent ---")
-    research_result = researcher_executor.invoke({
-        "input": "Find the best stories from this week for our weekly recap."
-    })
-
-    print("\n--- Starting Writer Agent ---")
-    writer_result = writer_chain.invoke({"input": research_result['output']})
-
-    print("\n--- Starting Editor Review ---")
-    editor_result = editor_chain.invoke({"input": writer_result.content})
-    print(f"Editor verdict: {editor_result.content}")
-
-    if "NEEDS_REVISION" in editor_result.content:
+    # Reuse the research the daily runs already did this week; only entries published
+    # since the last daily run are fetched. Falls back to the full agent when there is no pool.
+    week_pool = load_week_pool(datetime.now())
+
+    def research_stage():
+        if week_pool:
+            since = last_fetch_time(week_pool)
+            print(f"\n--- Building research from {len(week_pool)} daily candidate pools ---")
+            print(f"📡 Fetching feed entries published since {datetime.fromtimestamp(since).strftime('%Y-%m-%d %H:%M')}")
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                fetched = executor.map(lambda source: fetch_new_entries(source['url'], since), config['newsletters'])
+                new_entries = [entry for entries in fetched for entry in entries]
+            print(f"   {len(new_entries)} new entries since the last daily run")
+
+            pool_context = format_pool_for_prompt(week_pool, new_entries)
+            result = (researcher_prompt | llm).invoke({
+                "input": "Find the best stories from this week for our weekly recap. The daily runs already read "
+                         "and analysed this week's feeds, so do NOT fetch feeds again: select from the candidate "
+                         f"pool and new entries below.\n\n{pool_context}",
+                "agent_scratchpad": [],
+            })
+            return {"output": result.content}
+
+        print("\n--- Starting Researcher Agent ---")
+        result = run_researcher(
+            researcher_executor, candidate_budget, llm, researcher_prompt,
+            {"input": "Find the best stories from this week for our weekly recap."}
+        )
+        return {"output": result['output']}
+
+    research_result = checkpoint.run_stage("research", research_stage)
+
+    def write_stage():
+        print("\n--- Starting Writer Agent ---")
+        draft = writer_chain.invoke({"input": research_result['output']}).content
+
+        # Rule-based validation first: only structurally valid drafts reach the Editor
+        parsed_draft, issues = validate_newsletter(draft, WEEKLY_RULES)
+        if issues and out_of_time() and parsed_draft is not None:
+            print(f"\n⏱️ Out of time, keeping the draft despite {len(issues)} validation issues")
+        elif issues:
+            print(f"\n⚠️ Draft failed {len(issues)} validation checks, asking Writer to fix them:")
+            print(format_issues_for_prompt(issues))
+            retry_input = (
+                f"{research_result['output']}\n\nYOUR PREVIOUS DRAFT FAILED VALIDATION:\n{draft}\n\n"
+                f"Fix these issues and return the corrected JSON:\n{format_issues_for_prompt(issues)}"
+            )
+            draft = writer_chain.invoke({"input": retry_input}).content
+
+        # An unparseable draft can't be published: fail the stage so only the Writer is retried
+        if validate_newsletter(draft, WEEKLY_RULES)[0] is None:
+            raise ValueError("Writer output is not valid JSON")
+        return {"draft": draft}
+
+    draft = checkpoint.run_stage("write", write_stage)['draft']
+    output_json, validation_issues = validate_newsletter(draft, WEEKLY_RULES)
+
+    def edit_stage():
+        if validation_issues:
+            print("\n⚠️ Draft still fails validation, skipping Editor review:")
+            print(format_issues_for_prompt(validation_issues))
+            return {"verdict": None}
+
+        print("\n✅ Draft passed validation")
+        if out_of_time():
+            print("\n⏱️ Out of time, skipping Editor review")
+            return {"verdict": None}
+        print("\n--- Starting Editor Review ---")
+        editor_result = editor_chain.invoke({"input": draft})
+        print(f"Editor verdict: {editor_result.content}")
+        return {"verdict": editor_result.content}
+
+    editor_verdict = checkpoint.run_stage("edit", edit_stage)['verdict']
+
+    if editor_verdict and "NEEDS_REVISION" in editor_verdict:
         print("\n⚠️ Editor flagged issues but proceeding with publication:")
-        print(editor_result.content)
+        print(editor_verdict)
+
+    write_run_stats(checkpoint, llm_cache)
 
     # 7. Save the output
     try:
-        output_text = writer_result.content.strip().replace("```json", "").replace("```", "").strip()
-        output_json = json.loads(output_text)
+        if output_json is None:
+            raise ValueError(validation_issues[0])
 
         # Two-stage deduplication approach (same as daily newsletter)
         if 'news' in output_json and isinstance(output_json['news'], list):
@@ -419,27 +523,52 @@ Be thorough but fair."""),
                     print(f"⚠️ Stage 1: Removed {original_count - stage1_count} duplicate stories from this week")
 
             # STAGE 2: Deduplicate within today's stories only
-            # Using a very high threshold (0.9) to only catch nearly identical copies within today
+            # Using a very high threshold (dedup.safety_net_threshold, 0.9 by default) to only catch nearly identical copies within today
             stage2_input_count = len(output_json['news'])
-            output_json['news'] = deduplicate_stories(output_json['news'], similarity_threshold=0.9)
+            output_json['news'] = deduplicate_stories(output_json['news'], similarity_threshold=dedup_settings()['safety_net_threshold'])
             stage2_count = len(output_json['news'])
 
             if stage2_input_count != stage2_count:
                 print(f"⚠️ Stage 2: Removed {stage2_input_count - stage2_count} exact duplicate stories from today's output")
 
-        output_path = "web/public/newsletter.json"
-        with open(output_path, 'w') as f:
-            json.dump(output_json, f, indent=2)
+        published = publish_edition(output_json, edition="weekly")
+        checkpoint.write_report("publish", published)
 
-        print(f"\n--- Weekly recap successfully saved to {output_path} ---")
-        print("Final JSON output:")
-        print(json.dumps(output_json, indent=2))
+        # Published stories become searchable history for archive_search_tool and dedup
+        index_published_stories(output_json.get('news', []))
+        add_published_stories(output_json.get('news', []))
+        mark_published_stories(output_json.get('news', []), get_feed_entries())
 
-    except (json.JSONDecodeError, AttributeError, KeyError) as e:
+        print(f"\n--- Weekly recap successfully saved to web/public/newsletter.json ---")
+        print("Stories: " + "; ".join(published['titles']))
+
+    except (ValueError, AttributeError, KeyError) as e:
         print(f"\n--- FAILED to parse or save the final JSON. ---")
         print(f"Error: {e}")
         print("Raw AI Output:")
-        print(writer_result.content if hasattr(writer_result, 'content') else writer_result)
+        print(draft)
+        print(f"\nResearch output is checkpointed in {checkpoint.run_dir}")
+        print("Re-run with --resume-from write to regenerate only the draft")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate the weekly recap newsletter.")
+    parser.add_argument(
+        "--resume-from",
+        choices=WEEKLY_STAGES,
+        help="Reload earlier stages from today's checkpoints and re-run from this stage"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Save per-stage cProfile, tracemalloc and stack samples to the run directory"
+    )
+    parser.add_argument(
+        "--ready-by",
+        metavar="HH:MM",
+        help="Time the recap must be ready by (overrides deadline.ready_by in config.yml)"
+    )
+    args = parser.parse_args()
+    try:
+        main(resume_from=args.resume_from, profile=args.profile, ready_by=args.ready_by)
+    finally:
+        finish_profiling()
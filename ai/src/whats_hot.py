@@ -0,0 +1,464 @@
+# ai/src/whats_hot.py
+# Deterministic What's Hot extraction from the feed entries read during a run.
+#
+# Funding rounds, M&A, launches and expansions announce themselves in headlines with very
+# regular language ("Acme raises $45M Series B", "Stripe to acquire Bridge for $1.1bn").
+# This module scans every fetched entry with regexes (the event patterns and company list
+# from hybrid dedup, plus amount, round, acquirer/target and HQ patterns), ranks candidates
+# by deal size and recency and merges the same deal reported by several feeds. The
+# researcher only verifies the resulting list; the parser falls back to it when the
+# researcher reports no What's Hot items.
+
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+
+from .replay import current_time
+from .tools import EVENT_PATTERNS, KNOWN_COMPANIES
+
+# Defaults used when config.yml has no 'whats_hot' section
+DEFAULT_WHATS_HOT = {
+    "enabled": True,
+    "min_amount_usd": 10_000_000,       # smaller rounds are left out
+    "unpriced_value_usd": 25_000_000,   # ranking weight of known-company items without an amount
+    "half_life_hours": 48,              # a day-old item ranks at ~70% of a fresh one
+    "max_candidates": 10,
+}
+
+# Fields of a What's Hot item in newsletter.json
+WHATS_HOT_FIELDS = ("flag", "type", "company", "description", "source_url")
+
+# Rough USD rates; amounts are only converted to rank deals against each other
+USD_RATES = {
+    "USD": 1.0, "EUR": 1.08, "GBP": 1.27, "CHF": 1.12, "CAD": 0.73, "AUD": 0.66, "SGD": 0.74,
+    "BRL": 0.18, "INR": 0.012, "JPY": 0.0067, "SEK": 0.095, "AED": 0.27,
+}
+_CURRENCIES = {
+    "$": "USD", "us$": "USD", "usd": "USD", "dollars": "USD", "€": "EUR", "eur": "EUR", "euros": "EUR",
+    "£": "GBP", "gbp": "GBP", "pounds": "GBP", "chf": "CHF", "c$": "CAD", "cad": "CAD",
+    "a$": "AUD", "aud": "AUD", "s$": "SGD", "sgd": "SGD", "r$": "BRL", "brl": "BRL",
+    "₹": "INR", "inr": "INR", "rupees": "INR", "¥": "JPY", "jpy": "JPY", "sek": "SEK", "aed": "AED",
+}
+_SYMBOLS = {"USD": "$", "EUR": "€", "GBP": "£"}
+_MULTIPLIERS = {
+    "k": 1e3, "thousand": 1e3, "m": 1e6, "mn": 1e6, "mln": 1e6, "million": 1e6,
+    "b": 1e9, "bn": 1e9, "billion": 1e9,
+}
+
+_NUMBER = r"(?P<number>\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)"
+_UNIT = r"(?P<unit>thousand|million|billion|mln|mn|bn|k|m|b)"
+_AMOUNT_RES = [
+    # "$45M", "€1.2bn", "US$ 300 million", "GBP 20m"
+    re.compile(
+        r"(?P<currency>us\$|[acsr]\$|[$€£₹¥]|\b(?:usd|eur|gbp|chf|cad|aud|sgd|brl|inr|jpy|sek|aed)\b)\s?"
+        + _NUMBER + r"\s?" + _UNIT + r"?\b",
+        re.IGNORECASE,
+    ),
+    # "45 million euros"
+    re.compile(_NUMBER + r"\s?" + _UNIT + r"\s+(?P<currency>dollars|euros|pounds|rupees)\b", re.IGNORECASE),
+]
+
+# Context around an amount: valuations are skipped, amounts attached to the deal are preferred
+_VALUATION_BEFORE_RE = re.compile(
+    r"\b(?:valu(?:ed|ing\s+\S+)\s+at|valuation\s+(?:of|to|at)|valuation\s+\w+\s+to|worth)\s*"
+    r"(?:about\s+|around\s+|over\s+|nearly\s+)?$",
+    re.IGNORECASE,
+)
+_VALUATION_AFTER_RE = re.compile(r"\s*(?:pre-money\s+|post-money\s+)?valuation", re.IGNORECASE)
+_DEAL_BEFORE_RE = re.compile(
+    r"\b(?:rais(?:es|ed|ing)|secur(?:es|ed|ing)|clos(?:es|ed|ing)|lands?|landed|bags?|bagged|nets?|netted|"
+    r"gets?|got|receives?|received|for)\s+(?:a\s+|an\s+|about\s+|around\s+|over\s+|nearly\s+|up\s+to\s+)?$",
+    re.IGNORECASE,
+)
+_DEAL_AFTER_RE = re.compile(
+    r"\s*(?:(?:pre-seed|seed|series\s+\w+|growth|funding|equity|debt)\s+)?"
+    r"(?:round|funding|raise|investment|financing|deal|acquisition)\b",
+    re.IGNORECASE,
+)
+
+_ROUND_RE = re.compile(
+    r"\b(pre-seed|seed|series\s+[a-h]\d?\+?|growth(?:\s+equity)?|pre-ipo|debt|bridge)\s+(?:round|funding|financing|raise)"
+    r"|\b(series\s+[a-h]\d?\+?|pre-seed)\b",
+    re.IGNORECASE,
+)
+
+# A company name: a run of capitalised words, e.g. "Checkout.com", "Modern Treasury", "N26"
+_NAME = r"\b[A-Z0-9][\w.&'’-]*(?:\s+(?:[A-Z0-9][\w.&'’-]*|&)){0,4}"
+# Lowercase descriptors between a verb and a name ("acquires payments startup Bridge")
+_DESCRIPTORS = r"(?:[a-z][\w-]*\s+){0,3}?"
+
+_ACQUIRES_RE = re.compile(
+    rf"(?P<acquirer>{_NAME})\s+(?i:(?:to|will|agrees\s+to|set\s+to|moves\s+to)\s+)?"
+    rf"(?i:acquires?|buys?|snaps\s+up|takes\s+over|purchases?|completes\s+(?:its\s+)?acquisition\s+of|merges\s+with)\s+"
+    rf"{_DESCRIPTORS}(?P<target>{_NAME})"
+)
+_ACQUIRED_BY_RE = re.compile(
+    rf"(?P<target>{_NAME})\s+(?i:(?:is\s+|to\s+be\s+|gets\s+)?(?:acquired|bought|snapped\s+up)\s+by)\s+"
+    rf"{_DESCRIPTORS}(?P<acquirer>{_NAME})"
+)
+_RAISES_RE = re.compile(
+    rf"(?P<company>{_NAME})\s+(?i:raises|secures|lands|bags|closes|nabs|snags|gets|completes|announces)\b"
+)
+_LED_BY_RE = re.compile(rf"(?i:led\s+by)\s+(?P<investor>{_NAME})")
+
+# Borrowing rather than a funding round ("secures $1bn credit facility"), unless equity is also raised
+_DEBT_RE = re.compile(
+    r"\b(?:credit\s+(?:facility|facilities|line)|lines?\s+of\s+credit|debt|loans?|warehouse\s+facility|"
+    r"notes?\s+offering|bonds?|securiti[sz]ation)\b",
+    re.IGNORECASE,
+)
+_EQUITY_RE = re.compile(r"\bequity\b", re.IGNORECASE)
+
+# Name tokens that end a company name ("Bridge For $1.1B", "Acme In Talks")
+_NAME_STOP = {
+    "a", "after", "amid", "and", "as", "at", "deal", "for", "from", "in", "into", "of", "on", "the",
+    "to", "with", "its", "reportedly", "report", "says",
+}
+# Leading name tokens that describe rather than name a company
+_NAME_DESCRIPTORS = {
+    "bank", "challenger", "company", "crypto", "fintech", "firm", "giant", "lender", "neobank",
+    "payments", "platform", "processor", "provider", "rival", "specialist", "startup", "unicorn",
+}
+
+# Place and demonym hints -> ISO country code
+COUNTRIES = {
+    "us": "US", "u.s.": "US", "usa": "US", "american": "US", "united states": "US", "new york": "US",
+    "san francisco": "US", "silicon valley": "US", "chicago": "US", "boston": "US", "miami": "US",
+    "austin": "US", "uk": "GB", "u.k.": "GB", "british": "GB", "britain": "GB", "united kingdom": "GB",
+    "london": "GB", "manchester": "GB", "edinburgh": "GB", "germany": "DE", "german": "DE",
+    "berlin": "DE", "munich": "DE", "frankfurt": "DE", "france": "FR", "french": "FR", "paris": "FR",
+    "netherlands": "NL", "dutch": "NL", "amsterdam": "NL", "sweden": "SE", "swedish": "SE",
+    "stockholm": "SE", "ireland": "IE", "irish": "IE", "dublin": "IE", "singapore": "SG",
+    "singaporean": "SG", "brazil": "BR", "brazilian": "BR", "são paulo": "BR", "sao paulo": "BR",
+    "argentina": "AR", "argentine": "AR", "argentinian": "AR", "buenos aires": "AR", "mexico": "MX",
+    "mexican": "MX", "mexico city": "MX", "india": "IN", "indian": "IN", "mumbai": "IN",
+    "bengaluru": "IN", "bangalore": "IN", "delhi": "IN", "australia": "AU", "australian": "AU",
+    "sydney": "AU", "melbourne": "AU", "canada": "CA", "canadian": "CA", "toronto": "CA",
+    "japan": "JP", "japanese": "JP", "tokyo": "JP", "china": "CN", "chinese": "CN", "shanghai": "CN",
+    "hong kong": "HK", "israel": "IL", "israeli": "IL", "tel aviv": "IL", "uae": "AE", "emirati": "AE",
+    "dubai": "AE", "abu dhabi": "AE", "czech": "CZ", "czech republic": "CZ", "prague": "CZ",
+    "estonia": "EE", "estonian": "EE", "tallinn": "EE", "lithuania": "LT", "lithuanian": "LT",
+    "vilnius": "LT", "nigeria": "NG", "nigerian": "NG", "lagos": "NG", "kenya": "KE", "kenyan": "KE",
+    "nairobi": "KE", "south africa": "ZA", "south african": "ZA", "cape town": "ZA",
+    "johannesburg": "ZA", "indonesia": "ID", "indonesian": "ID", "jakarta": "ID",
+    "south korea": "KR", "korean": "KR", "seoul": "KR", "spain": "ES", "spanish": "ES",
+    "madrid": "ES", "barcelona": "ES", "italy": "IT", "italian": "IT", "milan": "IT",
+    "switzerland": "CH", "swiss": "CH", "zurich": "CH", "geneva": "CH",
+}
+_PLACE = r"([A-Z][\w.ã]+(?:\s[A-Z][\w.ã]+)?)"
+_HQ_RES = [
+    re.compile(_PLACE + r"-based\b"),
+    re.compile(r"\b(?:based|headquartered)\s+in\s+" + _PLACE),
+    re.compile(
+        r"\b" + _PLACE + r"\s+(?i:fintech|startup|neobank|bank|payments?\s+(?:firm|company|startup|provider)|"
+        r"lender|challenger|unicorn|processor|scale-?up)\b"
+    ),
+]
+UNKNOWN_FLAG = "🌐"
+
+# Expansion targets: a country/city from COUNTRIES or one of these regions
+_REGIONS = {"africa", "apac", "asia", "emea", "europe", "gulf", "latam", "latin america", "middle east", "north america"}
+_MARKET_RE = re.compile(r"\b(?:into|in|to|across)\s+(?:the\s+)?([A-Z][\w.ã]+(?:\s[A-Z][\w.ã]+)?)")
+
+_BNPL_RE = re.compile(r"buy[\s-]+now,?[\s-]+pay[\s-]+later", re.IGNORECASE)
+_KNOWN_RE = {company: re.compile(r"\b" + re.escape(company) + r"\b", re.IGNORECASE) for company in KNOWN_COMPANIES}
+
+_settings = dict(DEFAULT_WHATS_HOT)
+_stats = {"entries_scanned": 0, "candidates": 0, "fallback_used": False}
+
+
+def configure_whats_hot(config: Dict) -> None:
+    """Apply the 'whats_hot' section of config.yml."""
+    _settings.update(config.get("whats_hot") or {})
+
+
+def whats_hot_enabled() -> bool:
+    return bool(_settings["enabled"])
+
+
+def parse_amount(text: str) -> Optional[Tuple[float, str]]:
+    """
+    The deal size mentioned in text, as (value, ISO currency), or None.
+
+    Valuations are never the deal size. The first amount attached to a deal verb or noun
+    ("raises $X", "for $X", "a $X round") wins; otherwise the largest remaining amount.
+
+    >>> parse_amount("Fintech startup Ramp raises $200 million at $13bn valuation")
+    (200000000.0, 'USD')
+    >>> parse_amount("Klarna, valued at $6.7bn, buys Close for €50m")
+    (50000000.0, 'EUR')
+    >>> parse_amount("Stripe's valuation rises to $91.5bn") is None
+    True
+    """
+    amounts, attached = [], []
+    for pattern in _AMOUNT_RES:
+        for match in pattern.finditer(text):
+            value = float(match.group("number").replace(",", ""))
+            unit = (match.group("unit") or "").lower()
+            currency = _CURRENCIES[match.group("currency").lower()]
+            value *= _MULTIPLIERS.get(unit, 1)
+            if value < 1e5:  # "$5" or "Series B $2" are not deal sizes
+                continue
+            before = text[max(0, match.start() - 40):match.start()]
+            after = text[match.end():match.end() + 40]
+            if _VALUATION_BEFORE_RE.search(before) or _VALUATION_AFTER_RE.match(after):
+                continue
+            amounts.append((value, currency))
+            if _DEAL_BEFORE_RE.search(before) or _DEAL_AFTER_RE.match(after):
+                attached.append((match.start(), value, currency))
+    if attached:
+        _, value, currency = min(attached)
+        return value, currency
+    return max(amounts, key=lambda a: a[0] * USD_RATES[a[1]], default=None)
+
+
+def format_amount(value: float, currency: str) -> str:
+    """Short display form: 45000000 USD -> "$45M", 1.2e9 EUR -> "€1.2B"."""
+    for threshold, suffix in ((1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if value >= threshold:
+            number = f"{round(value / threshold, 2):g}{suffix}"
+            break
+    else:
+        number = f"{value:g}"
+    symbol = _SYMBOLS.get(currency)
+    return f"{symbol}{number}" if symbol else f"{currency} {number}"
+
+
+def parse_round(text: str) -> Optional[str]:
+    """Round type mentioned in text ("Series B", "Seed", "Growth", ...), or None."""
+    match = _ROUND_RE.search(text)
+    if not match:
+        return None
+    name = re.sub(r"\s+", " ", (match.group(1) or match.group(2)).lower())
+    if name.startswith("series"):
+        return "Series " + name.split()[1].upper()
+    return {"pre-ipo": "Pre-IPO"}.get(name, name.capitalize())
+
+
+def _clean_name(name: str) -> Tuple[str, Optional[str]]:
+    """Trim a matched name to the company itself. Returns (name, HQ place from an "X-based"/"X's" prefix)."""
+    place = None
+    tokens = name.split()
+    for i, token in enumerate(tokens):
+        if token.lower() in _NAME_STOP:
+            tokens = tokens[:i]
+            break
+    while tokens:
+        first = tokens[0].lower()
+        possessive = re.sub(r"['’]s$", "", first)
+        if first.endswith("-based"):
+            place = tokens[0][:-len("-based")]
+        elif possessive != first and possessive in COUNTRIES:  # "Berlin's Moss"
+            place = possessive
+        elif first not in _NAME_DESCRIPTORS:
+            break
+        tokens = tokens[1:]
+    return " ".join(tokens).strip(" .,:;'’-"), place
+
+
+def country_flag(code: str) -> str:
+    """Emoji flag for an ISO country code."""
+    code = "GB" if code == "UK" else code
+    return "".join(chr(0x1F1E6 + ord(c) - ord("A")) for c in code.upper())
+
+
+def hq_country(*texts: str) -> Optional[str]:
+    """ISO code of the first HQ hint ("London-based", "based in Berlin", "Brazilian fintech") in the texts."""
+    for text in texts:
+        for pattern in _HQ_RES:
+            for match in pattern.finditer(text):
+                code = COUNTRIES.get(match.group(1).lower())
+                if code:
+                    return code
+    return None
+
+
+def _known_company(text: str) -> Optional[str]:
+    """The longest known company mentioned (capitalised) in text, with the text's own casing."""
+    matches = [
+        m for pattern in _KNOWN_RE.values()
+        if (m := pattern.search(text)) and m.group(0)[0].isupper()
+    ]
+    if not matches:
+        return None
+    return max(matches, key=lambda m: len(m.group(0))).group(0)
+
+
+def _deal_type(title: str, text: str, amount, round_type) -> Optional[str]:
+    title = _BNPL_RE.sub("BNPL", title)
+    if re.search(EVENT_PATTERNS["acquisition"], title, re.IGNORECASE) or re.search(EVENT_PATTERNS["merger"], title, re.IGNORECASE):
+        if _ACQUIRES_RE.search(title) or _ACQUIRED_BY_RE.search(title):
+            return "M&A"
+    if re.search(EVENT_PATTERNS["funding"], text, re.IGNORECASE) and (amount or round_type) and _RAISES_RE.search(title):
+        if not _DEBT_RE.search(title) or _EQUITY_RE.search(title):
+            return "fundraising"
+    if re.search(EVENT_PATTERNS["expansion"], title, re.IGNORECASE) and _expansion_market(title):
+        return "expansion"
+    if re.search(EVENT_PATTERNS["launch"], title, re.IGNORECASE):
+        return "product"
+    return None
+
+
+def _expansion_market(title: str) -> Optional[str]:
+    """The market a headline says a company is entering ("expands into Brazil"), or None."""
+    for match in _MARKET_RE.finditer(title):
+        place = match.group(1).lower()
+        if place in COUNTRIES or place in _REGIONS or place.split()[0] in COUNTRIES or place.split()[0] in _REGIONS:
+            return match.group(1)
+    return None
+
+
+def _words(text: str, limit: int) -> str:
+    words = text.split()
+    return " ".join(words[:limit]) + ("…" if len(words) > limit else "")
+
+
+def extract_candidate(entry: Dict) -> Optional[Dict]:
+    """
+    What's Hot candidate for one feed entry, or None if it isn't a deal, launch or expansion.
+
+    Args:
+        entry: Feed entry dict ({'title', 'summary', 'link', 'published'}) as recorded by rss_tool
+
+    Returns:
+        Candidate with the What's Hot fields plus ranking details (amount_usd, round,
+        published, headline), or None
+    """
+    title = re.sub(r"\s+", " ", entry.get("title", "")).strip()
+    summary = entry.get("summary", "")
+    text = f"{title} {summary}"
+    amount = parse_amount(title) or parse_amount(summary)
+    round_type = parse_round(text)
+    deal_type = _deal_type(title, text, amount, round_type)
+    if deal_type is None:
+        return None
+
+    place = None
+    if deal_type == "M&A":
+        match = _ACQUIRES_RE.search(title) or _ACQUIRED_BY_RE.search(title)
+        company, place = _clean_name(match.group("acquirer"))
+        target, _ = _clean_name(match.group("target"))
+        if not company or not target:
+            return None
+        description = f"acquires {target}" + (f" for {format_amount(*amount)}" if amount else "")
+        known = _known_company(f"{company} {target}")
+    elif deal_type == "fundraising":
+        company, place = _clean_name(_RAISES_RE.search(title).group("company"))
+        if not company:
+            return None
+        investor = _LED_BY_RE.search(text)
+        description = "raises " + " ".join(filter(None, [
+            format_amount(*amount) if amount else None,
+            round_type,
+        ]))
+        if investor:
+            description += f" led by {_clean_name(investor.group('investor'))[0]}"
+        known = _known_company(company)
+    else:
+        # Launches and expansions are only notable from companies we track
+        company = known = _known_company(title)
+        if not company:
+            return None
+        position = title.lower().find(company.lower())
+        # "PayPal's Venmo rolls out..." describes Venmo, not "'s Venmo"
+        rest = re.sub(r"^['’]s\b", "", title[position + len(company):])
+        description = rest.strip(" :,-–—") or title
+    if not known and not amount:
+        return None
+
+    amount_usd = amount[0] * USD_RATES[amount[1]] if amount else None
+    if deal_type == "fundraising" and amount_usd is not None and amount_usd < _settings["min_amount_usd"]:
+        return None
+
+    country = COUNTRIES.get(place.lower()) if place else None
+    country = country or hq_country(title, summary)
+    return {
+        "flag": country_flag(country) if country else UNKNOWN_FLAG,
+        "type": deal_type,
+        "company": company,
+        "description": _words(description, 14),
+        "source_url": entry.get("link", ""),
+        "amount_usd": amount_usd,
+        "round": round_type,
+        "published": entry.get("published"),
+        "headline": title,
+    }
+
+
+def _rank_score(candidate: Dict, now: float) -> float:
+    value = candidate["amount_usd"] or _settings["unpriced_value_usd"]
+    if candidate["published"] is None:
+        return value * 0.5
+    age_hours = max(0.0, (now - candidate["published"]) / 3600)
+    return value * math.pow(0.5, age_hours / _settings["half_life_hours"])
+
+
+def extract_whats_hot(entries: List[Dict], now: Optional[float] = None) -> List[Dict]:
+    """
+    Ranked What's Hot candidates from feed entries.
+
+    The same deal from several feeds (same type and company) is merged into one candidate
+    that keeps every source URL. Candidates are ranked by USD amount decayed by age.
+
+    Args:
+        entries: Feed entries read during the run (see tools.get_feed_entries)
+        now: Reference time for recency (defaults to now)
+
+    Returns:
+        Up to max_candidates candidates, best first
+    """
+    now = now or current_time()
+    merged: Dict[Tuple[str, str], Dict] = {}
+    for entry in entries:
+        candidate = extract_candidate(entry)
+        if candidate is None:
+            continue
+        candidate["score"] = _rank_score(candidate, now)
+        key = (candidate["type"], candidate["company"].lower())
+        existing = merged.get(key)
+        if existing is None:
+            candidate["sources"] = [candidate["source_url"]]
+            merged[key] = candidate
+            continue
+        if candidate["source_url"] not in existing["sources"]:
+            existing["sources"].append(candidate["source_url"])
+        if candidate["score"] > existing["score"]:
+            candidate["sources"] = existing["sources"]
+            if candidate["flag"] == UNKNOWN_FLAG:
+                candidate["flag"] = existing["flag"]
+            merged[key] = candidate
+        elif existing["flag"] == UNKNOWN_FLAG:
+            existing["flag"] = candidate["flag"]
+
+    ranked = sorted(merged.values(), key=lambda c: c["score"], reverse=True)[:_settings["max_candidates"]]
+    _stats["entries_scanned"] += len(entries)
+    _stats["candidates"] = len(ranked)
+    return ranked
+
+
+def as_whats_hot_items(candidates: List[Dict]) -> List[Dict]:
+    """Candidates reduced to the What's Hot fields used in newsletter.json."""
+    return [{field: candidate[field] for field in WHATS_HOT_FIELDS} for candidate in candidates]
+
+
+def format_candidates_for_prompt(candidates: List[Dict]) -> str:
+    """Candidate list for the researcher to verify."""
+    if not candidates:
+        return ""
+    lines = [
+        "WHAT'S HOT CANDIDATES (extracted automatically from today's feed entries; verify each against its "
+        "source, correct or drop it, and add only notable items this list misses):"
+    ]
+    for i, c in enumerate(candidates, 1):
+        extra = f" (+{len(c['sources']) - 1} more sources)" if len(c.get("sources", [])) > 1 else ""
+        lines.append(f"{i}. [{c['type']}] {c['flag']} {c['company']} - {c['description']} - {c['source_url']}{extra}")
+    return "\n".join(lines)
+
+
+def record_fallback() -> None:
+    _stats["fallback_used"] = True
+
+
+def whats_hot_stats() -> Dict:
+    """Entries scanned and candidates extracted during this run (for the run report)."""
+    return dict(_stats)